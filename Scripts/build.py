@@ -3,7 +3,7 @@
 
 Tasks:
   adblock       Build adblock filter list
-  hosts         Build hosts file
+  hosts         Build hosts file(s) in the formats given by --formats
   hostlist      Compile hostlist configs
   lint          Lint filter lists with AGLint
   download      Download userscripts from list
@@ -15,22 +15,22 @@ import argparse
 import os
 import re
 import shutil
-import subprocess
 import sys
-import urllib.error
-import urllib.request
-from collections.abc import Callable
-from concurrent.futures import ThreadPoolExecutor
+from collections.abc import Callable, Sequence
+from functools import partial
 from pathlib import Path
+from typing import TYPE_CHECKING
 
 _root = Path(__file__).parent.parent
 if str(_root) not in sys.path:
     sys.path.insert(0, str(_root))
 
+from Scripts import profiling
 from Scripts.common import (
     dbg,
     die,
     err,
+    fetch,
     has,
     log,
     ncpu,
@@ -39,6 +39,22 @@ from Scripts.common import (
     ts_short,
     warn,
 )
+from Scripts.exclusions import EXCLUSIONS_CONFIG, load_exclusions
+from Scripts.hostlist_compiler import compile_file
+from Scripts.hosts_formats import (
+    DEFAULT_HOSTS_PER_LINE,
+    FORMATS,
+    parse_formats,
+    write_formats,
+)
+from Scripts.merge import merge_files
+from Scripts.release import ReleasePublisher
+from Scripts.rules import blocked_hostnames, parse_file
+
+# subprocess, urllib and concurrent.futures are imported by the tasks that
+# need them so that light tasks such as ``hosts`` start quickly.
+if TYPE_CHECKING:
+    import subprocess
 
 REPO = os.environ.get("GITHUB_REPOSITORY", "Ven0m0/Ven0m0-Adblock")
 FILTER_SRC = Path("lists/adblock")
@@ -48,10 +64,6 @@ SCRIPT_OUT = Path("userscripts/dist")
 SCRIPT_LIST = Path("userscripts/list.txt")
 
 _FILTER_RE = re.compile(r"^\s*!|\[Adblock|^\s*$")
-_DOMAIN_RE = re.compile(
-    r"[a-z0-9][-a-z0-9]{0,61}(?:\.[a-z0-9][-a-z0-9]{0,61})+\.[a-z]{2,}",
-    re.IGNORECASE,
-)
 _URL_RE = re.compile(r"https://[^\s]+\.user\.js")
 
 
@@ -63,7 +75,9 @@ def _js_runner() -> list[str] | None:
     return None
 
 
-def _run_js(*args: str, **kwargs) -> subprocess.CompletedProcess:
+def _run_js(*args: str, **kwargs) -> "subprocess.CompletedProcess":
+    import subprocess
+
     runner = _js_runner()
     cmd = [*runner, *args] if runner else list(args)
     check = kwargs.pop("check", False)
@@ -71,23 +85,15 @@ def _run_js(*args: str, **kwargs) -> subprocess.CompletedProcess:
 
 
 def _fetch(url: str, dest: Path) -> bool:
-    req = urllib.request.Request(
-        url,
-        headers={
-            "User-Agent": "Mozilla/5.0 (Android 14; Mobile; rv:138.0) Gecko/138.0 Firefox/138.0",
-            "Accept-Language": "en-US,en;q=0.9",
-        },
-    )
     try:
-        with urllib.request.urlopen(req, timeout=30) as resp:
-            dest.write_bytes(resp.read())
+        shutil.copyfile(fetch(url, headers={"Accept-Language": "en-US,en;q=0.9"}), dest)
         return True
-    except (OSError, urllib.error.URLError) as e:
+    except OSError as e:  # includes urllib.error.URLError
         warn(f"Failed to download {url}: {e}")
         return False
 
 
-def build_adblock() -> None:
+def build_adblock() -> list[Path]:
     src_patterns = [
         "Combination*.txt",
         "Other.txt",
@@ -109,12 +115,6 @@ def build_adblock() -> None:
     if not files:
         die("No filter source files found")
 
-    rules: set[str] = set()
-    for f in files:
-        for line in f.read_text(encoding="utf-8").splitlines():
-            if not _FILTER_RE.search(line):
-                rules.add(line)
-
     header = (
         "[uBlock Origin]\n"
         f"!  Title:  Ven0m0's Adblock List\n"
@@ -123,76 +123,83 @@ def build_adblock() -> None:
         f"! Homepage: https://github.com/{REPO}\n"
         f"! Syntax: uBlock Origin\n"
     )
-    out.write_text(header + "\n".join(sorted(rules)) + "\n", encoding="utf-8")
-    ok(f"{out} ({len(rules)} rules)")
-
-
-def build_hosts() -> None:
+    count = 0
+    with profiling.span("adblock.merge", sources=len(files)):
+        with out.open("w", encoding="utf-8", newline="\n") as fh:
+            fh.write(header)
+            for rule in merge_files(files, _is_rule, tag="adblock"):
+                fh.write(rule + "\n")
+                count += 1
+    profiling.count("adblock.rules", count)
+    ok(f"{out} ({count} rules)")
+    return [out]
+
+
+def _is_rule(line: str) -> bool:
+    return not _FILTER_RE.search(line)
+
+
+def build_hosts(
+    formats: Sequence[str] = ("hosts",),
+    hosts_per_line: int = DEFAULT_HOSTS_PER_LINE,
+    exclusions_config: Path | None = EXCLUSIONS_CONFIG,
+) -> list[Path]:
     src = FILTER_SRC / "Other.txt"
-    out = FILTER_OUT / "hosts.txt"
-    log("hosts", "Building hosts file")
+    log("hosts", f"Building {', '.join(formats)}")
     FILTER_OUT.mkdir(parents=True, exist_ok=True)
 
     if not src.exists():
         die(f"No host source file found: {src}")
 
-    entries: set[str] = set()
-    for line in src.read_text(encoding="utf-8").splitlines():
-        m = _DOMAIN_RE.search(line)
-        if m:
-            entries.add(f"0.0.0.0 {m.group(0).lower()}")
+    with profiling.span("hosts.parse"):
+        domains = blocked_hostnames(parse_file(src))
+    if exclusions_config is not None:
+        with profiling.span("hosts.exclude"):
+            exclusions = load_exclusions(exclusions_config)
+            domains = set(exclusions.filter(domains))
+        exclusions.report()
+    profiling.count("hosts.domains", len(domains))
 
-    header = f"# Hostlist by {REPO}\n# Updated: {ts_read()}\n"
-    out.write_text(header + "\n".join(sorted(entries)) + "\n", encoding="utf-8")
-    ok(f"{out} ({len(entries)} entries)")
+    header = (f"Hostlist by {REPO}", f"Updated: {ts_read()}")
+    with profiling.span("hosts.write", formats=len(formats)):
+        paths = write_formats(sorted(domains), FILTER_OUT, formats, header, hosts_per_line)
+    for path in paths.values():
+        ok(f"{path} ({len(domains)} entries)")
+    return list(paths.values())
 
 
-def build_hostlist() -> None:
-    has_compiler = Path("node_modules/.bin/hostlist-compiler").exists() or has(
-        "hostlist-compiler"
-    )
-    if not has_compiler:
-        warn("hostlist-compiler missing")
-        return
-
+def build_hostlist() -> list[Path]:
     log("hostlist", "Compiling hostlist")
     FILTER_OUT.mkdir(parents=True, exist_ok=True)
+    built: list[Path] = []
 
+    out = FILTER_OUT / "hostlist.txt"
     if Path("hostlist-config.json").exists():
-        r = _run_js(
-            "hostlist-compiler",
-            "-c",
-            "hostlist-config.json",
-            "-o",
-            str(FILTER_OUT / "hostlist.txt"),
-            "--verbose",
-            check=False,
-        )
-        if r.returncode != 0:
+        if compile_file(Path("hostlist-config.json"), out):
+            ok(str(out))
+            built.append(out)
+        else:
             warn("Hostlist compilation failed")
 
     if Path("configuration_popup_filter.json").exists():
-        r = _run_js(
-            "hostlist-compiler",
-            "-c",
-            "configuration_popup_filter.json",
-            "-o",
-            str(FILTER_OUT / "adguard_popup_filter.txt"),
-            "--verbose",
-            check=False,
-        )
-        if r.returncode != 0:
+        popup = FILTER_OUT / "adguard_popup_filter.txt"
+        if compile_file(Path("configuration_popup_filter.json"), popup):
+            built.append(popup)
+        else:
             warn("Popup filter compilation failed")
         popup_build = Path("scripts/popup_filter_build.js")
         if popup_build.exists():
+            import subprocess
+
             subprocess.run(
                 [
                     "node",
                     str(popup_build),
-                    str(FILTER_OUT / "adguard_popup_filter.txt"),
+                    str(popup),
                 ],
                 check=False,
             )
+    return built
 
 
 def lint_filters() -> None:
@@ -201,6 +208,8 @@ def lint_filters() -> None:
         warn("No JS runtime available, skipping lint")
         return
 
+    import subprocess
+
     log("lint", "Setting up AGLint")
     if not Path("package.json").exists():
         subprocess.run(["npm", "init", "-y"], capture_output=True, check=False)
@@ -339,6 +348,9 @@ def build_userscripts() -> None:
         log("userscripts", f"No files in {SCRIPT_SRC}")
         return
 
+    import subprocess
+    from concurrent.futures import ThreadPoolExecutor
+
     log("userscripts", f"Processing {len(files)} files")
 
     str_files = [str(f) for f in files]
@@ -377,23 +389,16 @@ def _task_userscripts() -> None:
     build_userscripts()
 
 
-def _task_all() -> None:
-    build_adblock()
-    build_hosts()
-    build_hostlist()
-    download_userscripts()
-    build_userscripts()
-
-
-_TASKS: dict[str, Callable[[], None]] = {
+# Tasks that produce release files return their paths for publishing.
+_TASKS: dict[str, Callable[[], list[Path] | None]] = {
     "adblock": build_adblock,
     "hosts": build_hosts,
     "hostlist": build_hostlist,
     "lint": lint_filters,
     "download": download_userscripts,
     "userscripts": _task_userscripts,
-    "all": _task_all,
 }
+_ALL_TASKS: tuple[str, ...] = ("adblock", "hosts", "hostlist", "userscripts")
 
 
 def main() -> None:
@@ -403,7 +408,7 @@ def main() -> None:
         epilog=(
             "Tasks:\n"
             "  adblock       Build adblock filter list\n"
-            "  hosts         Build hosts file\n"
+            "  hosts         Build hosts file (see --formats)\n"
             "  hostlist      Compile hostlist configs\n"
             "  lint          Lint filter lists with AGLint\n"
             "  download      Download userscripts from list\n"
@@ -412,15 +417,51 @@ def main() -> None:
         ),
     )
     parser.add_argument("tasks", nargs="*", default=["all"])
+    parser.add_argument(
+        "--formats",
+        default="hosts",
+        help=f"Comma separated hosts outputs: {', '.join(FORMATS)} (default: hosts)",
+    )
+    parser.add_argument(
+        "--hosts-per-line",
+        type=int,
+        default=DEFAULT_HOSTS_PER_LINE,
+        help="Domains per line in the compressed hosts output",
+    )
+    parser.add_argument(
+        "--exclusions",
+        default=str(EXCLUSIONS_CONFIG),
+        help="Config whose exclusions and exclusions_sources filter the hosts outputs ('' to disable)",
+    )
     args = parser.parse_args()
 
+    try:
+        formats = parse_formats(args.formats)
+    except ValueError as e:
+        parser.error(str(e))
+
+    tasks = dict(_TASKS)
+    exclusions = Path(args.exclusions) if args.exclusions else None
+    tasks["hosts"] = partial(build_hosts, formats, args.hosts_per_line, exclusions)
+    for task in args.tasks:
+        if task != "all" and task not in tasks:
+            parser.error(f"Unknown task: {task}. Choose from: {', '.join([*tasks, 'all'])}")
+
+    publisher = ReleasePublisher(FILTER_OUT)
     for task in args.tasks:
-        if task not in _TASKS:
-            parser.error(f"Unknown task: {task}. Choose from: {', '.join(_TASKS)}")
-        _TASKS[task]()
+        for name in _ALL_TASKS if task == "all" else (task,):
+            with profiling.span(f"task.{name}"):
+                built = tasks[name]() or ()
+            with profiling.span("release.submit"):
+                for path in built:
+                    publisher.submit(path)
+    with profiling.span("release.close"):
+        manifest = publisher.close()
+    if manifest:
+        ok(f"{manifest}")
 
     ok("Build complete")
 
 
 if __name__ == "__main__":
-    main()
+    profiling.run("build", main)
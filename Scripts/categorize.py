@@ -0,0 +1,124 @@
+"""
+Rule-driven hostlist categorization.
+Rules come from a JSON config: source-file keywords, domain suffixes matched
+through a reversed-label trie, and keywords matched as whole labels or label
+parts by one combined pattern, so ``ad`` no longer hits ``adobe.com``.
+"""
+
+import json
+import re
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+from Scripts.suffix_trie import SuffixTrie
+
+CATEGORIES_CONFIG: Final[Path] = Path(__file__).parent.parent / "lists" / "hostlist" / "categories.json"
+
+
+@dataclass(frozen=True, slots=True)
+class Categorizer:
+    default: str
+    # (filename keywords, target) in priority order.
+    sources: tuple[tuple[tuple[str, ...], str], ...]
+    suffixes: SuffixTrie[str]
+    # Matches keywords at label-part boundaries; group 1 whole parts, group 2 prefixes.
+    keywords: re.Pattern | None
+    exact: dict[str, tuple[int, str]]
+    prefixes: dict[str, tuple[int, str]]
+
+    def for_source(self, source_file: str) -> str | None:
+        """Target implied by the source file name alone, if any."""
+        name = source_file.lower()
+        for words, target in self.sources:
+            if any(word in name for word in words):
+                return target
+        return None
+
+    def _keyword(self, text: str) -> str | None:
+        if self.keywords is None or not text:
+            return None
+        m = self.keywords.search(text)
+        if m is None:
+            return None
+        best = self.exact[m.group(1)] if m.group(1) else self.prefixes[m.group(2)]
+        if best[0] == 0:
+            return best[1]
+        # A later keyword may belong to a higher priority category.
+        for match in self.keywords.finditer(text, m.end()):
+            hit = self.exact[match.group(1)] if match.group(1) else self.prefixes[match.group(2)]
+            if hit[0] < best[0]:
+                best = hit
+        return best[1]
+
+    def categorize(self, domain: str, source_file: str = "") -> str:
+        """Target hostlist for domain.
+
+        A source-file rule wins; then keywords in the labels left of a known
+        suffix, then the suffix's category, then keywords anywhere but the TLD.
+        """
+        target = self.for_source(source_file) if source_file else None
+        if target:
+            return target
+        d = domain.lower()
+        hit = self.suffixes.longest(d)
+        if hit is not None:
+            suffix, target = hit
+            return self._keyword(d[: -len(suffix)]) or target
+        dot = d.rfind(".")
+        return self._keyword(d[:dot] if dot != -1 else d) or self.default
+
+    def categorize_many(self, domains: Iterable[str], source_file: str = "") -> dict[str, list[str]]:
+        """Group domains by target, keeping their order."""
+        groups: dict[str, list[str]] = {}
+        target = self.for_source(source_file) if source_file else None
+        if target:
+            groups[target] = list(domains)
+            return groups
+        categorize = self.categorize
+        for domain in domains:
+            groups.setdefault(categorize(domain), []).append(domain)
+        return groups
+
+
+def _alternation(words: Iterable[str]) -> str:
+    # Longest first so "ads" is tried before "ad" at the same position.
+    return "|".join(re.escape(w) for w in sorted(words, key=lambda w: (-len(w), w)))
+
+
+def build_categorizer(config: dict) -> Categorizer:
+    """Compile a categories config. Raises ValueError on malformed input."""
+    try:
+        default = config.get("default", "Other.txt")
+        sources = tuple(
+            (tuple(w.lower() for w in rule["contains"]), rule["target"]) for rule in config.get("sources", [])
+        )
+        suffixes: SuffixTrie[str] = SuffixTrie()
+        exact: dict[str, tuple[int, str]] = {}
+        prefixes: dict[str, tuple[int, str]] = {}
+        for priority, category in enumerate(config.get("categories", [])):
+            target = category["target"]
+            for domain in category.get("domains", []):
+                suffixes.insert(domain, target)
+            for keyword in category.get("keywords", []):
+                keyword = keyword.lower()
+                table, word = (prefixes, keyword[:-1]) if keyword.endswith("*") else (exact, keyword)
+                if not word.isalpha():
+                    raise ValueError(f"keyword must be letters with an optional trailing '*': {keyword!r}")
+                table.setdefault(word, (priority, target))
+    except (AttributeError, KeyError, TypeError) as e:
+        raise ValueError(f"invalid categories config: {e!r}") from e
+
+    keywords = None
+    if exact or prefixes:
+        # "(?!)" never matches, keeping the group numbers fixed when a table is empty.
+        whole = _alternation(exact) or "(?!)"
+        start = _alternation(prefixes) or "(?!)"
+        keywords = re.compile(f"(?<![a-z])(?:({whole})(?![a-z])|({start}))")
+    return Categorizer(default, sources, suffixes, keywords, exact, prefixes)
+
+
+def load_categorizer(path: Path = CATEGORIES_CONFIG) -> Categorizer:
+    """Load and compile a categories config file. Raises OSError or ValueError."""
+    return build_categorizer(json.loads(path.read_text(encoding="utf-8")))
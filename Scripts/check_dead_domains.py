@@ -1,9 +1,17 @@
 #!/usr/bin/env python3
-import asyncio
 import re
 import sys
 import os
-import aiohttp
+from pathlib import Path
+
+# asyncio and aiohttp are imported where they are used; hostname extraction
+# needs neither.
+_root = Path(__file__).parent.parent
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from Scripts import profiling
+from Scripts.rules import COSMETIC, NETWORK, SCRIPTLET, parse_line
 
 DNS_QUERIES = [
     "https://cloudflare-dns.com/dns-query?name={hn}&type=A",
@@ -22,6 +30,10 @@ dns_cache = {}
 
 
 async def validate_hostname(session, hn):
+    import asyncio
+
+    import aiohttp
+
     await asyncio.sleep(THROTTLE)
     for url_tpl in DNS_QUERIES:
         url = url_tpl.format(hn=hn)
@@ -63,21 +75,12 @@ async def is_dead(session, hn):
     result = await validate_hostname(session, hn)
     dead = check_hostname(result) is not None
     dns_cache[hn] = dead
+    profiling.count("dead.lookups")
+    if dead:
+        profiling.count("dead.dead")
     return dead
 
 
-# Cosmetic rules: domain-list##selector
-RULE_RE = re.compile(
-    r'^((?:~?[a-zA-Z0-9\-\*]+(?:\.[a-zA-Z0-9\-\*]+)*)(?:,(?:~?[a-zA-Z0-9\-\*]+(?:\.[a-zA-Z0-9\-\*]+)*))*)(##.+)$'
-)
-
-# Network filters: domain= or from= pipe-separated list in options
-NET_OPT_RE = re.compile(r'(?<=[,$])(domain|from)=([^,\s\n]+)')
-
-# Basic blocking rules: ||hostname^ or @@||hostname^
-HOSTNAME_RE = re.compile(r'^(@@)?\|\|([a-zA-Z0-9\-\.]+)\^')
-
-
 def should_skip(hn):
     if hn.endswith('.onion'):
         return True
@@ -88,98 +91,102 @@ def should_skip(hn):
     return False
 
 
-async def check_pipe_domains(session, domains_str):
-    domains = domains_str.split("|")
-    checked = []
-    for d in domains:
-        bare = d.lstrip("~")
-        if d.startswith("~") or should_skip(bare):
-            checked.append((d, False))
+def _domain_targets(rule):
+    """(field, domains) a rule is checked for: "domains", "domain"/"from" or "host"; None if none."""
+    if rule.kind in (COSMETIC, SCRIPTLET):
+        return ("domains", rule.domains) if rule.domains else None
+    if rule.kind != NETWORK:
+        return None
+    domains = rule.option_domains()
+    if domains:
+        return ("domain" if rule.option("domain") else "from"), domains
+    if rule.hostname is not None:
+        return "host", (rule.hostname,)
+    return None
+
+
+def _lookup_name(field, d):
+    """Hostname to resolve for a listed domain, None if it is not checked."""
+    # Negated modifier domains only narrow a rule; a dead one changes nothing.
+    if d.startswith("~") and field != "domains":
+        return None
+    bare = d.lstrip("~")
+    return None if should_skip(bare) else bare
+
+
+def extract_hostnames(lines):
+    """Hostnames process() will look up, in first-seen order."""
+    found = {}
+    for line in lines:
+        targets = _domain_targets(parse_line(line))
+        if targets is None:
             continue
-        dead = await is_dead(session, bare)
-        checked.append((d, dead))
-    alive = [d for d, dead in checked if not dead]
-    return domains, alive
+        field, domains = targets
+        for d in domains:
+            hn = _lookup_name(field, d)
+            if hn is not None:
+                found[hn] = None
+    return list(found)
+
+
+def rewrite(lines, dead):
+    """Drop dead domains from each rule's domain list; a rule left with none keeps its first one."""
+    out = []
+    backup_commented = set()
+    for line in lines:
+        rule = parse_line(line)
+        targets = _domain_targets(rule)
+        if targets is None:
+            out.append(line)
+            continue
+        field, domains = targets
+        alive = [d for d in domains if _lookup_name(field, d) not in dead]
+        if len(alive) == len(domains):
+            out.append(line)
+            continue
+
+        # --- Basic ||hostname^ rules are only flagged ---
+        if field == "host":
+            out.append("! All Dead Kept One Backup\n")
+            out.append(line)
+            continue
+
+        if not alive:
+            first = domains[0]
+            if first not in backup_commented:
+                out.append("! All Dead Kept One Backup\n")
+                backup_commented.add(first)
+            alive = [first]
+
+        # --- Cosmetic and scriptlet rules (domain,list##selector) ---
+        if field == "domains":
+            out.append(",".join(alive) + rule.marker + rule.selector + "\n")
+            continue
+
+        # --- Network filters with domain= or from= ---
+        value = f"{field}={'|'.join(alive)}"
+        options = [value if opt.startswith(field + "=") else opt for opt in rule.options]
+        out.append(rule.text[: rule.text.rfind("$") + 1] + ",".join(options) + "\n")
+    return out
 
 
 async def process(input_path):
     with open(input_path, encoding="utf-8") as f:
         lines = f.readlines()
 
-    out = []
-    backup_commented = set()
+    with profiling.span("dead.extract"):
+        hostnames = extract_hostnames(lines)
+    profiling.count("dead.hostnames", len(hostnames))
+
+    import aiohttp
+
     connector = aiohttp.TCPConnector(limit=5)
     async with aiohttp.ClientSession(connector=connector) as session:
-        for line in lines:
-            raw = line.rstrip("\n")
-
-            if not raw or raw.startswith("!") or raw.startswith("["):
-                out.append(line)
-                continue
-
-            # --- Cosmetic rules (domain,list##selector) ---
-            m = RULE_RE.match(raw)
-            if m:
-                domains_str, rule = m.group(1), m.group(2)
-                domains = [d for d in domains_str.split(",") if d]
-                checked = []
-                for d in domains:
-                    bare = d.lstrip("~")
-                    if should_skip(bare):
-                        checked.append((d, False))
-                        continue
-                    dead = await is_dead(session, bare)
-                    checked.append((d, dead))
-                alive_domains = [d for d, dead in checked if not dead]
-                if alive_domains:
-                    if len(alive_domains) == len(domains):
-                        out.append(line)
-                    else:
-                        out.append(",".join(alive_domains) + rule + "\n")
-                else:
-                    if domains[0] not in backup_commented:
-                        out.append("! All Dead Kept One Backup\n")
-                        backup_commented.add(domains[0])
-                    out.append(domains[0] + rule + "\n")
-                continue
-
-            # --- Network filters with domain= or from= ---
-            m2 = NET_OPT_RE.search(raw)
-            if m2:
-                domains_str = m2.group(2)
-                domains, alive = await check_pipe_domains(session, domains_str)
-                if len(alive) == len(domains):
-                    out.append(line)
-                elif alive:
-                    new_raw = raw[:m2.start(2)] + "|".join(alive) + raw[m2.end(2):]
-                    out.append(new_raw + "\n")
-                else:
-                    first = domains[0]
-                    if first not in backup_commented:
-                        out.append("! All Dead Kept One Backup\n")
-                        backup_commented.add(first)
-                    new_raw = raw[:m2.start(2)] + first + raw[m2.end(2):]
-                    out.append(new_raw + "\n")
-                continue
-
-            # --- Basic ||hostname^ rules ---
-            m3 = HOSTNAME_RE.match(raw)
-            if m3:
-                hn = m3.group(2)
-                if should_skip(hn):
-                    out.append(line)
-                    continue
-                dead = await is_dead(session, hn)
-                if dead:
-                    out.append("! All Dead Kept One Backup\n")
-                    out.append(line)
-                else:
-                    out.append(line)
-                continue
+        with profiling.span("dead.resolve"):
+            dead = {hn for hn in hostnames if await is_dead(session, hn)}
 
-            out.append(line)
-
-    return out
+    with profiling.span("dead.rewrite"):
+        return rewrite(lines, dead)
 
 
 def main():
@@ -191,13 +198,17 @@ def main():
     base, ext = os.path.splitext(inp)
     out_path = f"{base}_Dead Domain Cleaned{ext}"
 
-    result = asyncio.run(process(inp))
+    import asyncio
+
+    with profiling.span("dead.check"):
+        result = asyncio.run(process(inp))
 
-    with open(out_path, "w", encoding="utf-8") as f:
-        f.writelines(result)
+    with profiling.span("dead.write"):
+        with open(out_path, "w", encoding="utf-8") as f:
+            f.writelines(result)
 
     print(f"Done → {out_path}")
 
 
 if __name__ == "__main__":
-    main()
+    profiling.run("check_dead_domains", main)
@@ -3,14 +3,21 @@ Common utilities and constants for Ven0m0-Adblock scripts.
 """
 
 import hashlib
+import mmap
 import os
 import re
-import shutil
+import string
 import sys
-import tempfile
+import time
+from collections.abc import Iterable, Iterator, Mapping
 from datetime import UTC, datetime
+from functools import cache
+from itertools import islice
 from pathlib import Path
-from typing import Final
+from typing import TYPE_CHECKING, Final
+
+if TYPE_CHECKING:
+    import aiohttp
 
 # ============================================================================
 # ANSI COLORS
@@ -62,6 +69,8 @@ def die(msg: str, code: int = 1) -> None:
 
 
 def has(cmd: str) -> bool:
+    import shutil
+
     return shutil.which(cmd) is not None
 
 
@@ -77,10 +86,15 @@ def ts_read() -> str:
     return datetime.now(UTC).strftime("%Y-%m-%d %H:%M:%S UTC")
 
 
+# Scratch space for derived data (sorted sources, parse results, downloads).
+CACHE_DIR: Final[Path] = Path(os.environ.get("ADBLOCK_CACHE_DIR", ".cache"))
+
+
 # ============================================================================
 # DOMAIN / FILTER UTILITIES
 # ============================================================================
 
+# Reference definition of a valid domain; is_valid_domain must agree with it.
 DOMAIN_PATTERN: Final[re.Pattern] = re.compile(
     r"^[a-z0-9](?:[-a-z0-9]*[a-z0-9])?(?:\.[a-z0-9](?:[-a-z0-9]*[a-z0-9])?)*\.[a-z]{2,}$",
     re.IGNORECASE,
@@ -106,9 +120,38 @@ ADGUARD_INDICATORS: Final[list[str]] = [
 ]
 
 
+# Characters DOMAIN_PATTERN accepts; IGNORECASE folding adds four non-ASCII letters.
+_LETTERS: Final[str] = string.ascii_letters + "\u0130\u0131\u017f\u212a"
+_DOMAIN_CHARS: Final[frozenset[str]] = frozenset(_LETTERS + string.digits + "-.")
+_LABEL_START: Final[frozenset[str]] = frozenset(_LETTERS + string.digits)
+
+
 def is_valid_domain(domain: str) -> bool:
-    """Check if a string is a valid domain name."""
-    return bool(DOMAIN_PATTERN.match(domain))
+    """Check if a string is a valid domain name.
+
+    Equivalent to ``DOMAIN_PATTERN.match`` but built on str methods instead of
+    a backtracking regex.
+    """
+    # Most non-domains (rules, comments) are rejected by their first character;
+    # once the characters are known to be valid, isalpha() means a letter TLD.
+    if (
+        domain[:1] in _LABEL_START
+        and (dot := domain.rfind(".")) > 0
+        and len(domain) - dot > 2
+        and domain[dot + 1 :].isalpha()
+        and _DOMAIN_CHARS.issuperset(domain)
+        and ".." not in domain
+        and ".-" not in domain
+        and "-." not in domain
+    ):
+        return True
+    # "$" also matches right before a single trailing newline.
+    return domain[-1:] == "\n" and domain[-2:-1] != "\n" and is_valid_domain(domain[:-1])
+
+
+def validate_domains(domains: Iterable[str]) -> list[str]:
+    """Return the valid domains from an iterable, in order."""
+    return list(filter(is_valid_domain, domains))
 
 
 def sanitize_filename(url: str, name: str | None = None) -> str:
@@ -136,22 +179,101 @@ def read_lines(filepath: Path) -> list[str] | None:
         return None
 
 
-def write_lines(filepath: Path, lines: list[str], mode: str = "w") -> bool:
-    """Write lines to file. Returns True on success."""
+_MMAP_BLOCK: Final[int] = 1 << 20
+
+
+def iter_lines(
+    filepath: Path, skip_prefixes: str = "", skip_empty: bool = False
+) -> Iterator[str]:
+    """Yield lines of a memory-mapped file one block at a time.
+
+    Only one block of the file is decoded at once, so memory stays flat no
+    matter the file size. Lines starting with a character in skip_prefixes
+    (and empty lines when skip_empty) are dropped before reaching the caller.
+    """
+    with filepath.open("rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            size = len(mm)
+            pos = 0
+            while pos < size:
+                # Cut blocks at a newline so no UTF-8 sequence is split.
+                stop = min(pos + _MMAP_BLOCK, size)
+                if stop < size:
+                    nl = mm.rfind(b"\n", pos, stop)
+                    stop = nl + 1 if nl != -1 else (mm.find(b"\n", stop) + 1 or size)
+                text = mm[pos:stop].decode("utf-8")
+                pos = stop
+                for line in text.splitlines():
+                    if not line:
+                        if not skip_empty:
+                            yield line
+                    elif line[0] not in skip_prefixes:
+                        yield line
+
+
+_WRITE_CHUNK: Final[int] = 4096
+
+
+def _write_chunks(f, lines: Iterable[str], digest=None, final_newline: bool = True) -> None:
+    it = iter(lines)
+    sep = b""
+    while chunk := list(islice(it, _WRITE_CHUNK)):
+        data = sep + "\n".join(chunk).encode("utf-8")
+        sep = b"\n"
+        if digest is not None:
+            digest.update(data)
+        f.write(data)
+    if final_newline and sep:
+        if digest is not None:
+            digest.update(sep)
+        f.write(sep)
+
+
+def _same_content(filepath: Path, size: int, digest) -> bool:
+    try:
+        if filepath.stat().st_size != size:
+            return False
+        with filepath.open("rb") as f:
+            return hashlib.file_digest(f, "sha256").digest() == digest.digest()
+    except OSError:
+        return False
+
+
+def write_lines(
+    filepath: Path, lines: Iterable[str], mode: str = "w", fsync: bool = False, final_newline: bool = True
+) -> bool:
+    """Stream lines to file in chunks. Returns True on success.
+
+    Overwrites go through a temp file and os.replace; the replace is skipped
+    when the new content is identical to the existing file.
+    """
     try:
         if mode == "a":
-            with filepath.open(mode, encoding="utf-8", newline="\n") as f:
-                if lines:
-                    f.write("\n".join(lines) + "\n")
+            with filepath.open("ab") as f:
+                _write_chunks(f, lines, final_newline=final_newline)
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
             return True
 
+        import tempfile
+
         # Atomic replace via temp file in same directory.
-        fd, temp_path = tempfile.mkstemp(dir=filepath.parent, text=True)
+        fd, temp_path = tempfile.mkstemp(dir=filepath.parent)
         try:
-            with open(fd, "w", encoding="utf-8", newline="\n") as f:
-                if lines:
-                    f.write("\n".join(lines) + "\n")
-            os.replace(temp_path, filepath)
+            digest = hashlib.sha256()
+            with open(fd, "wb") as f:
+                _write_chunks(f, lines, digest, final_newline)
+                size = f.tell()
+                if fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            if _same_content(filepath, size, digest):
+                os.unlink(temp_path)
+            else:
+                os.replace(temp_path, filepath)
             return True
         except Exception:
             os.unlink(temp_path)
@@ -159,3 +281,308 @@ def write_lines(filepath: Path, lines: list[str], mode: str = "w") -> bool:
     except (OSError, UnicodeError) as e:
         print(f"  Error writing {filepath}: {e}", file=sys.stderr)
         return False
+
+
+# ============================================================================
+# HTTP FETCH
+# ============================================================================
+
+USER_AGENT: Final[str] = "Mozilla/5.0 (X11; Linux x86_64; rv:138.0) Gecko/138.0 Firefox/138.0"
+HTTP_TIMEOUT: Final[int] = 60
+HTTP_CHUNK: Final[int] = 65536
+HTTP_CACHE_DIR: Final[Path] = CACHE_DIR / "http"
+HTTP_CACHE_MAX: Final[int] = int(os.environ.get("ADBLOCK_HTTP_CACHE_MB", "512")) << 20
+# Margin for file mtimes lagging time.time() when deciding what is in use, in seconds.
+HTTP_CACHE_SLACK: Final[float] = 1.0
+# Freshness for responses that state none (no max-age or Expires), in seconds.
+HTTP_MIN_FRESH: Final[int] = int(os.environ.get("ADBLOCK_HTTP_MIN_FRESH", "0"))
+# Cap on the Last-Modified heuristic (a tenth of the document's age).
+HTTP_HEURISTIC_MAX: Final[int] = 3600
+
+
+def _cache_control(value: str) -> dict[str, str]:
+    directives: dict[str, str] = {}
+    for part in value.split(","):
+        name, _, arg = part.strip().partition("=")
+        if name:
+            directives[name.lower()] = arg.strip('"')
+    return directives
+
+
+def _seconds(value: str | None) -> int | None:
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        return None
+
+
+def _http_date(value: str | None) -> float | None:
+    from email.utils import parsedate_to_datetime
+
+    try:
+        return parsedate_to_datetime(value).timestamp() if value else None
+    except (TypeError, ValueError):
+        return None
+
+
+def _expiry(headers: Mapping[str, str], now: float) -> tuple[float, bool]:
+    """Time a response stays fresh until, and whether it may be stored."""
+    directives = _cache_control(headers.get("Cache-Control") or "")
+    if "no-store" in directives:
+        return now, False
+    if "no-cache" in directives:
+        return now, True
+    max_age = _seconds(directives.get("max-age"))
+    if max_age is not None:
+        return now + max_age - (_seconds(headers.get("Age")) or 0), True
+    date = _http_date(headers.get("Date")) or now
+    if headers.get("Expires") is not None:
+        # An unparsable Expires means already expired.
+        expires = _http_date(headers.get("Expires"))
+        return (now + expires - date if expires is not None else now), True
+    modified = _http_date(headers.get("Last-Modified"))
+    heuristic = min((date - modified) / 10, HTTP_HEURISTIC_MAX) if modified is not None else 0
+    return now + max(heuristic, HTTP_MIN_FRESH), True
+
+
+class HttpCache:
+    """On-disk HTTP cache: a body file and a JSON metadata file per URL.
+
+    Entries are fresh per Cache-Control/Expires (or a Last-Modified heuristic)
+    and revalidated with If-None-Match/If-Modified-Since once stale. A URL
+    fetched or revalidated by this process is served from disk from then on.
+    Least recently used bodies are evicted beyond max_bytes, except those
+    written or used since the cache was opened.
+    """
+
+    def __init__(self, root: Path = HTTP_CACHE_DIR, max_bytes: int = HTTP_CACHE_MAX) -> None:
+        import threading
+
+        self.root = root
+        self.max_bytes = max_bytes
+        self._current: set[str] = set()
+        # Serializes moving bodies into place or touching them with evict().
+        self._lock = threading.Lock()
+        # File mtimes come from a coarser clock than time.time().
+        self._opened = time.time() - HTTP_CACHE_SLACK
+
+    def _paths(self, url: str) -> tuple[Path, Path]:
+        key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:32]
+        return self.root / f"{key}.body", self.root / f"{key}.json"
+
+    def meta(self, url: str) -> dict | None:
+        """Metadata of the cached response for url, or None."""
+        import json
+
+        body, meta_path = self._paths(url)
+        try:
+            meta = json.loads(meta_path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        return meta if meta.get("url") == url and body.exists() else None
+
+    def fresh(self, url: str) -> Path | None:
+        """Cached body of url if it can be used without asking the server."""
+        body, _ = self._paths(url)
+        if url not in self._current:
+            meta = self.meta(url)
+            if meta is None or meta["expires"] <= time.time():
+                return None
+        try:
+            with self._lock:
+                os.utime(body)  # the eviction order
+        except OSError:
+            return None
+        return body
+
+    def request_headers(self, meta: dict | None, extra: Mapping[str, str] | None = None) -> dict[str, str]:
+        """Request headers, conditional on the cached response when there is one."""
+        headers = {"User-Agent": USER_AGENT, **(extra or {})}
+        if meta is not None:
+            if meta.get("etag"):
+                headers["If-None-Match"] = meta["etag"]
+            if meta.get("last_modified"):
+                headers["If-Modified-Since"] = meta["last_modified"]
+        return headers
+
+    def temp_file(self) -> tuple[int, str]:
+        """Open a temp file in the cache directory for a body being downloaded."""
+        import tempfile
+
+        self.root.mkdir(parents=True, exist_ok=True)
+        return tempfile.mkstemp(dir=self.root, suffix=".part")
+
+    def _write_meta(self, url: str, meta_path: Path, meta: dict) -> None:
+        import json
+
+        if write_lines(meta_path, [json.dumps(meta)]):
+            self._current.add(url)
+
+    def store(self, url: str, temp_path: str, headers: Mapping[str, str]) -> Path:
+        """Move a downloaded body into place and record its response headers."""
+        body, meta_path = self._paths(url)
+        with self._lock:
+            os.replace(temp_path, body)
+        expires, storable = _expiry(headers, time.time())
+        if storable:
+            directives = _cache_control(headers.get("Cache-Control") or "")
+            meta = {
+                "url": url,
+                "etag": headers.get("ETag"),
+                "last_modified": headers.get("Last-Modified"),
+                "expires": expires,
+                "must_revalidate": "must-revalidate" in directives,
+            }
+            self._write_meta(url, meta_path, meta)
+        else:
+            # no-store: the body is handed to the caller but never served again.
+            meta_path.unlink(missing_ok=True)
+        self.evict(keep=body)
+        return body
+
+    def revalidated(self, url: str, meta: dict, headers: Mapping[str, str]) -> Path:
+        """Refresh an entry after a 304 Not Modified and return its body."""
+        body, meta_path = self._paths(url)
+        expires, _ = _expiry(headers, time.time())
+        meta = {
+            **meta,
+            "etag": headers.get("ETag") or meta.get("etag"),
+            "last_modified": headers.get("Last-Modified") or meta.get("last_modified"),
+            "expires": expires,
+        }
+        self._write_meta(url, meta_path, meta)
+        with self._lock:
+            os.utime(body)
+        return body
+
+    def stale(self, url: str, meta: dict | None) -> Path | None:
+        """Body to fall back on when the server cannot be reached, if allowed."""
+        if meta is None or meta.get("must_revalidate"):
+            return None
+        body, _ = self._paths(url)
+        return body if body.exists() else None
+
+    def evict(self, keep: Path | None = None) -> int:
+        """Delete least recently used entries until bodies fit max_bytes. Returns bytes freed.
+
+        Bodies written or touched since the cache was opened are kept: a fetch,
+        in this process or a concurrent one, is about to return them.
+        """
+        entries: list[tuple[float, int, str]] = []
+        try:
+            with os.scandir(self.root) as it:
+                for entry in it:
+                    if entry.name.endswith(".body"):
+                        st = entry.stat()
+                        entries.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            return 0
+        excess = sum(size for _, size, _ in entries) - self.max_bytes
+        freed = 0
+        for _, size, path in sorted(entries):
+            if freed >= excess:
+                break
+            if keep is not None and path == str(keep):
+                continue
+            body = Path(path)
+            with self._lock:
+                # Stat again: another fetch may have replaced or used it since the scan.
+                try:
+                    if body.stat().st_mtime >= self._opened:
+                        continue
+                except OSError:
+                    continue
+                body.unlink(missing_ok=True)
+                body.with_suffix(".json").unlink(missing_ok=True)
+            freed += size
+        return freed
+
+
+@cache
+def http_cache() -> HttpCache:
+    """The cache shared by every fetch in this process."""
+    return HttpCache()
+
+
+def fetch(
+    url: str,
+    headers: Mapping[str, str] | None = None,
+    timeout: float = HTTP_TIMEOUT,
+    cache: HttpCache | None = None,
+) -> Path:
+    """Local file holding the body of url, downloaded only when the cache cannot answer.
+
+    Raises OSError (urllib.error.URLError included) when the URL cannot be
+    fetched and no cached copy may stand in for it.
+    """
+    import urllib.error
+    import urllib.request
+
+    cache = cache or http_cache()
+    if (body := cache.fresh(url)) is not None:
+        return body
+    meta = cache.meta(url)
+    req = urllib.request.Request(url, headers=cache.request_headers(meta, headers))
+    try:
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                fd, temp_path = cache.temp_file()
+                try:
+                    with open(fd, "wb") as f:
+                        while chunk := resp.read(HTTP_CHUNK):
+                            f.write(chunk)
+                except BaseException:
+                    os.unlink(temp_path)
+                    raise
+                return cache.store(url, temp_path, resp.headers)
+        except urllib.error.HTTPError as e:
+            if e.code == 304 and meta is not None:
+                return cache.revalidated(url, meta, e.headers)
+            raise
+    except OSError as e:
+        if (body := cache.stale(url, meta)) is None:
+            raise
+        warn(f"Using cached copy of {url}: {e}")
+        return body
+
+
+async def fetch_async(
+    session: "aiohttp.ClientSession",
+    url: str,
+    headers: Mapping[str, str] | None = None,
+    timeout: float = HTTP_TIMEOUT,
+    cache: HttpCache | None = None,
+) -> Path:
+    """fetch() on an aiohttp session.
+
+    Raises OSError, TimeoutError or aiohttp.ClientError when the URL cannot be
+    fetched and no cached copy may stand in for it.
+    """
+    import aiohttp
+
+    cache = cache or http_cache()
+    if (body := cache.fresh(url)) is not None:
+        return body
+    meta = cache.meta(url)
+    try:
+        async with session.get(
+            url, timeout=aiohttp.ClientTimeout(total=timeout), headers=cache.request_headers(meta, headers)
+        ) as resp:
+            if resp.status == 304 and meta is not None:
+                return cache.revalidated(url, meta, resp.headers)
+            resp.raise_for_status()
+            fd, temp_path = cache.temp_file()
+            try:
+                # Plain writes: one chunk to the page cache does not stall the loop.
+                with open(fd, "wb") as f:
+                    async for chunk in resp.content.iter_chunked(HTTP_CHUNK):
+                        f.write(chunk)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+            return cache.store(url, temp_path, resp.headers)
+    except (OSError, aiohttp.ClientError) as e:
+        if (body := cache.stale(url, meta)) is None:
+            raise
+        warn(f"Using cached copy of {url}: {e}")
+        return body
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Find block and exception rules that cancel or repeat each other across lists.
+Hostname rules from the adblock, hostlist and external lists (``||host^``
+rules, plain domains and hosts entries, narrower ``||host...`` rules) go into
+one reversed-label trie. Each rule is then checked against the rules stored at
+its own hostname and its parents only, so the run is linear in the number of
+rules times their label count:
+
+  contradiction  a block and an exception for the same hostname
+  override       an exception for a parent domain neutralizes a block
+  duplicate      the same hostname is blocked (or excepted) again
+  shadowed       a block (or exception) for a parent domain already covers it
+
+Findings listed in the baseline (lists/conflicts-baseline.tsv, in the --output
+format; line numbers are ignored) are accepted and not reported.
+
+Usage: python -m Scripts.conflicts [--list FILE|DIR ...] [--limit N] [--fail-on KIND ...] [--output FILE]
+                                   [--baseline FILE]
+"""
+
+import argparse
+import sys
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+_root = Path(__file__).parent.parent
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from Scripts import profiling
+from Scripts.common import err, is_valid_domain, iter_lines, log, ok, warn, write_lines
+from Scripts.hosts_creator import SINKS, parse_hosts_line
+from Scripts.matcher import TYPE_ALIASES
+from Scripts.rules import HOSTNAME, NETWORK, Rule, parse_file
+from Scripts.suffix_trie import SuffixTrie
+
+DEFAULT_SOURCES: Final[tuple[Path, ...]] = (Path("lists/adblock"), Path("lists/hostlist"), Path("lists/external"))
+BASELINE: Final[Path] = Path(__file__).parent.parent / "lists" / "conflicts-baseline.tsv"
+REPORT_TOP: Final[int] = 20
+
+CONTRADICTION: Final[str] = "contradiction"
+OVERRIDE: Final[str] = "override"
+DUPLICATE: Final[str] = "duplicate"
+SHADOWED: Final[str] = "shadowed"
+KINDS: Final[tuple[str, ...]] = (CONTRADICTION, OVERRIDE, DUPLICATE, SHADOWED)
+
+# Modifiers that only narrow which requests a rule applies to; a rule with any
+# other modifier (redirect, csp, removeparam, ...) does more than block and is
+# never reported as covered by another rule.
+_NARROWING: Final[frozenset[str]] = frozenset(
+    {*TYPE_ALIASES, "third-party", "3p", "first-party", "1p", "strict1p", "strict3p", "match-case", "important"}
+)
+_NARROWING_VALUES: Final[tuple[str, ...]] = ("domain=", "from=", "method=", "denyallow=")
+
+
+@dataclass(slots=True)
+class Entry:
+    host: str
+    origin: str
+    text: str
+    exception: bool
+    important: bool
+    # Applies to every request to host, not just some of them.
+    full: bool
+    # Also applies to subdomains: ``||host^`` does, plain domains and hosts entries do not.
+    subdomains: bool = True
+
+
+@dataclass(slots=True)
+class _Node:
+    """First full block and exception seen for one hostname, plain and $important."""
+
+    # Plain domain or hosts entry, covering the hostname only.
+    exact: Entry | None = None
+    block: Entry | None = None
+    important_block: Entry | None = None
+    exception: Entry | None = None
+    important_exception: Entry | None = None
+
+
+@dataclass(slots=True)
+class Finding:
+    kind: str
+    rule: Entry
+    # The rule that cancels or covers it.
+    by: Entry
+
+    def __str__(self) -> str:
+        return f"{self.kind}\t{self.rule.origin}\t{self.rule.text}\t{self.by.origin}\t{self.by.text}"
+
+    def key(self) -> tuple[str, ...]:
+        """The finding without line numbers, which move whenever a list is edited."""
+        return _key(self.kind, self.rule.origin, self.rule.text, self.by.origin, self.by.text)
+
+
+def _key(kind: str, rule_origin: str, rule_text: str, by_origin: str, by_text: str) -> tuple[str, ...]:
+    return (kind, rule_origin.rpartition(":")[0], rule_text, by_origin.rpartition(":")[0], by_text)
+
+
+def _narrowing(option: str) -> bool:
+    return option.lstrip("~").lower() in _NARROWING or option.lower().startswith(_NARROWING_VALUES)
+
+
+def entry(rule: Rule, origin: str) -> Entry | None:
+    """Entry for a hostname rule, None for rules this analysis does not cover."""
+    if rule.kind == HOSTNAME:
+        return Entry(rule.hostname, origin, rule.text, False, False, True, False)  # type: ignore[arg-type]
+    if rule.kind != NETWORK:
+        return None
+    if rule.hostname is None:
+        # Hosts file lines parse as patterns: "0.0.0.0 host".
+        if " " not in rule.text and "\t" not in rule.text:
+            return None
+        ip, hostnames = parse_hosts_line(rule.text)
+        if ip not in SINKS or len(hostnames) != 1 or not is_valid_domain(hostnames[0]):
+            return None
+        return Entry(hostnames[0], origin, rule.text, False, False, True, False)
+    options = {opt.lower() for opt in rule.options}
+    if "badfilter" in options or not all(_narrowing(opt) for opt in rule.options):
+        return None
+    important = "important" in options
+    full = rule.host_level and options <= {"important"}
+    return Entry(rule.hostname, origin, rule.text, rule.exception, important, full)
+
+
+class ConflictIndex:
+    """Full hostname rules by hostname in a reversed-label trie."""
+
+    def __init__(self) -> None:
+        self._trie: SuffixTrie[_Node] = SuffixTrie()
+        self.entries: list[Entry] = []
+
+    def add(self, e: Entry) -> None:
+        self.entries.append(e)
+        if not e.full:
+            return
+        node = self._trie.get(e.host)
+        if node is None:
+            node = _Node()
+            self._trie.insert(e.host, node)
+        if not e.subdomains:
+            node.exact = node.exact or e
+        elif e.exception:
+            node.exception = node.exception or e
+            if e.important:
+                node.important_exception = node.important_exception or e
+        else:
+            node.block = node.block or e
+            if e.important:
+                node.important_block = node.important_block or e
+
+    def check(self, e: Entry) -> Finding | None:
+        """The most serious finding for e, caused by the broadest rule.
+
+        $important blocks only yield to $important exceptions and are only
+        covered by $important blocks.
+        """
+        covered: Finding | None = None
+        for suffix, node in self._trie.matches(e.host):
+            same = suffix == e.host
+            if not e.exception:
+                exception = node.important_exception if e.important else node.exception
+                if exception is not None:
+                    return Finding(CONTRADICTION if same and e.full else OVERRIDE, e, exception)
+            first = node.exception if e.exception else node.block
+            important = node.important_exception if e.exception else node.important_block
+            by = important if e.important else first
+            if by is None and same and not e.subdomains and node.exact is not e:
+                by = node.exact
+            if covered is None and by is not None and by is not e:
+                covered = Finding(DUPLICATE if same and e.full else SHADOWED, e, by)
+        return covered
+
+    def findings(self) -> Iterator[Finding]:
+        """Every finding in rule order."""
+        for e in self.entries:
+            finding = self.check(e)
+            if finding is not None:
+                yield finding
+
+
+def build_index(paths: Iterable[Path]) -> ConflictIndex:
+    """Index the hostname rules of filter list files. Raises OSError or UnicodeError."""
+    index = ConflictIndex()
+    for path in paths:
+        for lineno, rule in enumerate(parse_file(path), 1):
+            if rule.kind in (NETWORK, HOSTNAME):
+                e = entry(rule, f"{path.name}:{lineno}")
+                if e is not None:
+                    index.add(e)
+    return index
+
+
+def load_baseline(path: Path) -> set[tuple[str, ...]]:
+    """Keys of the accepted findings in path, one --output line each. Raises OSError or UnicodeError."""
+    keys: set[tuple[str, ...]] = set()
+    for lineno, line in enumerate(iter_lines(path, skip_prefixes="#", skip_empty=True), 1):
+        fields = line.split("\t")
+        if len(fields) != 5 or fields[0] not in KINDS:
+            warn(f"{path.name}:{lineno}: not a finding: {line}")
+            continue
+        keys.add(_key(*fields))
+    return keys
+
+
+def _list_files(sources: Iterable[Path]) -> list[Path]:
+    return [p for source in sources for p in (sorted(source.glob("*.txt")) if source.is_dir() else [source])]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Find exceptions that override blocks and rules covered by others")
+    parser.add_argument("-l", "--list", dest="lists", type=Path, action="append", help="Filter list or directory")
+    parser.add_argument("--limit", type=int, default=REPORT_TOP, help="Findings shown per kind (0: all)")
+    parser.add_argument("--fail-on", choices=KINDS, action="append", default=[], help="Exit 1 on findings of KIND")
+    parser.add_argument("-o", "--output", type=Path, help="Write all findings as tab-separated lines")
+    parser.add_argument("--baseline", type=Path, help=f"Accepted findings (default: {BASELINE.name} if present)")
+    args = parser.parse_args()
+
+    paths = _list_files(args.lists or DEFAULT_SOURCES)
+    if not paths:
+        err(f"No filter lists in {', '.join(map(str, args.lists or DEFAULT_SOURCES))}")
+        return 1
+    missing = [path for path in paths if not path.is_file()]
+    if missing:
+        err(f"Not found: {', '.join(map(str, missing))}")
+        return 1
+    try:
+        with profiling.span("conflicts.index", lists=len(paths)):
+            index = build_index(paths)
+    except (OSError, UnicodeError) as e:
+        err(f"Could not read filter lists: {e}")
+        return 1
+    baseline_path = args.baseline or BASELINE
+    try:
+        baseline = load_baseline(baseline_path) if args.baseline or BASELINE.is_file() else set()
+    except (OSError, UnicodeError) as e:
+        err(f"Could not read baseline {baseline_path}: {e}")
+        return 1
+    profiling.count("conflicts.rules", len(index.entries))
+
+    with profiling.span("conflicts.check"):
+        findings = list(index.findings())
+    accepted = len(findings)
+    findings = [f for f in findings if f.key() not in baseline]
+    accepted -= len(findings)
+    counts = Counter(f.kind for f in findings)
+    log("conflicts", f"Checked {len(index.entries)} hostname rules from {len(paths)} lists")
+    if baseline:
+        log("conflicts", f"Accepted {accepted} of {len(baseline)} findings in {baseline_path.name}")
+    for kind in KINDS:
+        profiling.count(f"conflicts.{kind}", counts[kind])
+        if not counts[kind]:
+            continue
+        print(f"  {counts[kind]:>8}  {kind}")
+        shown = [f for f in findings if f.kind == kind]
+        for f in shown[: args.limit or None]:
+            print(f"            {f.rule.origin} {f.rule.text}  <-  {f.by.origin} {f.by.text}")
+
+    if args.output:
+        if not write_lines(args.output, map(str, findings)):
+            return 1
+        ok(f"Wrote {args.output}")
+    failed = [kind for kind in args.fail_on if counts[kind]]
+    if failed:
+        err(f"Found {', '.join(f'{counts[kind]} {kind}' for kind in failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(profiling.run("conflicts", main))
@@ -0,0 +1,315 @@
+#!/usr/bin/env python3
+"""
+Cosmetic selector cost per hostname.
+Element hiding, CSS injection and procedural rules from the adblock sources
+are indexed by the domains they name: plain domains (with subdomains),
+``name.*`` entities, ``*.domain`` wildcards, ``*`` and ``~`` negations. For any
+hostname the index yields the selectors a blocker injects there, generic ones
+included, and the stylesheet bytes they add; the heaviest sites are ranked
+and can be held to a budget in CI.
+
+Usage: python -m Scripts.cosmetic_index [HOST ...] [--list FILE ...] [--top N]
+       [--max-bytes N] [--max-selectors N] [--json FILE] [--markdown]
+"""
+
+import argparse
+import re
+import sys
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Final
+
+_root = Path(__file__).parent.parent
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from Scripts import profiling
+from Scripts.common import err, log, ok, write_lines
+from Scripts.matcher import host_keys
+from Scripts.rules import COSMETIC, Rule, parse_file
+
+DEFAULT_SOURCES: Final[tuple[Path, ...]] = (Path("lists/adblock"), Path("lists/external"))
+REPORT_TOP: Final[int] = 20
+
+HIDE: Final[str] = "hide"
+STYLE: Final[str] = "style"
+PROCEDURAL: Final[str] = "procedural"
+
+# Declaration appended to every hidden selector, as blockers inject it.
+_HIDE_DECLARATION: Final[str] = "{display:none!important;}\n"
+# uBlock Origin operators that turn a ## selector into a script-evaluated one.
+_PROCEDURAL_RE = re.compile(
+    r":(?:has-text|xpath|upward|min-text-length|others|remove|remove-attr|remove-class|watch-attr|"
+    r"matches-(?:attr|css|css-after|css-before|media|path|prop)|contains|-abp-[a-z-]+)\("
+)
+_STYLE_RE = re.compile(r":style\(")
+
+# Selector identity: (type, selector text).
+Key = tuple[str, str]
+
+
+def selector_type(marker: str, selector: str) -> str:
+    """HIDE, STYLE or PROCEDURAL for a cosmetic rule body."""
+    if "$" in marker:
+        return PROCEDURAL if "?" in marker else STYLE
+    if "?" in marker or _PROCEDURAL_RE.search(selector):
+        return PROCEDURAL
+    return STYLE if _STYLE_RE.search(selector) else HIDE
+
+
+def css_bytes(kind: str, selector: str) -> int:
+    """Bytes a selector adds to the page: a hiding rule, an injected rule or a procedural payload."""
+    size = len(selector.encode()) + 1
+    return size + len(_HIDE_DECLARATION) if kind == HIDE else size
+
+
+@dataclass(slots=True)
+class Cost:
+    """Cosmetic payload injected on one hostname."""
+
+    host: str
+    selectors: int = 0
+    # Selectors only present because a rule names the host (or a parent/entity).
+    specific: int = 0
+    procedural: int = 0
+    css_bytes: int = 0
+    origins: list[str] = field(default_factory=list)
+
+    def add(self, key: Key, size: int, origin: str, specific: bool) -> None:
+        self.selectors += 1
+        self.css_bytes += size
+        if key[0] == PROCEDURAL:
+            self.procedural += 1
+        if specific:
+            self.specific += 1
+            self.origins.append(origin)
+
+    def as_dict(self) -> dict[str, int | str]:
+        return {
+            "host": self.host,
+            "selectors": self.selectors,
+            "specific": self.specific,
+            "procedural": self.procedural,
+            "css_bytes": self.css_bytes,
+        }
+
+
+def _domain_keys(domain: str) -> tuple[str, bool] | None:
+    """Index key of a rule domain and whether the domain itself matches (not only subdomains)."""
+    if domain.startswith("*."):
+        domain, itself = domain[2:], False
+    else:
+        itself = True
+    if not domain or "*" in domain.removesuffix(".*") or "/" in domain:
+        return None
+    return domain, itself
+
+
+class CosmeticIndex:
+    """Cosmetic rules by the hostname keys they apply to.
+
+    Lookups walk the hostname's own keys (host, parents, entity), so the cost
+    of a query does not grow with the number of rules. Generic selectors are
+    summed once and only adjusted per host for negations and exceptions.
+    """
+
+    def __init__(self) -> None:
+        # Specific rules: key -> [(selector key, origin, whether the key itself matches)].
+        self._specific: dict[str, list[tuple[Key, str, bool]]] = defaultdict(list)
+        # Negations of specific rules: (selector key, origin) pairs excluded per key.
+        self._negated: dict[str, set[tuple[Key, str]]] = defaultdict(set)
+        # Generic selectors (first origin), generic negations and exceptions.
+        self._generic: dict[Key, str] = {}
+        self._generic_negated: dict[str, set[Key]] = defaultdict(set)
+        self._everywhere: set[Key] = set()
+        self._exceptions: dict[str, set[Key]] = defaultdict(set)
+        self._generic_exceptions: set[Key] = set()
+        self._generic_bytes = 0
+        self._generic_procedural = 0
+        self.rules = 0
+        self.skipped: list[str] = []
+
+    def add(self, rule: Rule, origin: str) -> None:
+        """Index one COSMETIC rule; other kinds are ignored."""
+        if rule.kind != COSMETIC or not rule.selector:
+            return
+        key: Key = (selector_type(rule.marker, rule.selector), rule.selector)
+        included: list[tuple[str, bool]] = []
+        excluded: list[str] = []
+        for domain in rule.domains:
+            if domain == "*":
+                continue
+            negated = domain.startswith("~")
+            parsed = _domain_keys(domain[1:] if negated else domain)
+            if parsed is None:
+                self.skipped.append(origin)
+                return
+            if negated:
+                excluded.append(parsed[0])
+            else:
+                included.append(parsed)
+        self.rules += 1
+        if rule.exception:
+            if not included:
+                self._generic_exceptions.add(key)
+            for domain, _ in included:
+                self._exceptions[domain].add(key)
+        elif included:
+            for domain, itself in included:
+                self._specific[domain].append((key, origin, itself))
+            for domain in excluded:
+                self._negated[domain].add((key, origin))
+        else:
+            self._generic.setdefault(key, origin)
+            if not excluded:
+                self._everywhere.add(key)
+            for domain in excluded:
+                self._generic_negated[domain].add(key)
+
+    def finish(self) -> None:
+        """Apply generic exceptions and total the generic payload; call after the last add()."""
+        for key in self._generic_exceptions:
+            self._generic.pop(key, None)
+        # A negation does not lift a selector that another generic rule injects everywhere.
+        for keys in self._generic_negated.values():
+            keys -= self._everywhere
+        self._generic_bytes = sum(css_bytes(*key) for key in self._generic)
+        self._generic_procedural = sum(1 for kind, _ in self._generic if kind == PROCEDURAL)
+
+    @property
+    def generic(self) -> int:
+        return len(self._generic)
+
+    def domains(self) -> Iterator[str]:
+        """Hostnames worth ranking: every domain a specific rule names (entities as name.com)."""
+        for domain in self._specific:
+            yield domain.removesuffix(".*") + ".com" if domain.endswith(".*") else domain
+
+    def cost(self, host: str) -> Cost:
+        """Selectors and bytes injected on host."""
+        host = host.strip().lower().rstrip(".")
+        keys = host_keys(host)
+        exceptions = self._generic_exceptions.union(*(self._exceptions.get(k, ()) for k in keys))
+        negated = set().union(*(self._negated.get(k, ()) for k in keys))
+
+        cost = Cost(host, len(self._generic), 0, self._generic_procedural, self._generic_bytes)
+        removed = exceptions.intersection(self._generic)
+        removed.update(*(self._generic_negated.get(k, ()) for k in keys))
+        for key in removed:
+            if key in self._generic:
+                cost.selectors -= 1
+                cost.css_bytes -= css_bytes(*key)
+                if key[0] == PROCEDURAL:
+                    cost.procedural -= 1
+
+        seen: set[Key] = set()
+        for k in keys:
+            for key, origin, itself in self._specific.get(k, ()):
+                if not itself and k == host:
+                    continue
+                if key in seen or key in exceptions or (key, origin) in negated:
+                    continue
+                if key in self._generic and key not in removed:
+                    continue
+                seen.add(key)
+                cost.add(key, css_bytes(*key), origin, specific=True)
+        return cost
+
+    def worst(self, limit: int = REPORT_TOP) -> list[Cost]:
+        """The limit hostnames with the largest cosmetic payload."""
+        costs = [self.cost(host) for host in dict.fromkeys(self.domains())]
+        costs.sort(key=lambda c: (-c.css_bytes, -c.selectors, c.host))
+        return costs[:limit]
+
+
+def build_index(paths: Iterable[Path]) -> CosmeticIndex:
+    """Index the cosmetic rules of filter list files. Raises OSError or UnicodeError."""
+    index = CosmeticIndex()
+    for path in paths:
+        for lineno, rule in enumerate(parse_file(path), 1):
+            if rule.kind == COSMETIC:
+                index.add(rule, f"{path.name}:{lineno}")
+    index.finish()
+    return index
+
+
+def _list_files(sources: Iterable[Path]) -> list[Path]:
+    return [p for source in sources for p in (sorted(source.glob("*.txt")) if source.is_dir() else [source])]
+
+
+def _markdown(costs: list[Cost], index: CosmeticIndex) -> Iterator[str]:
+    yield "## Cosmetic selector cost"
+    yield ""
+    yield f"{index.rules} cosmetic rules, {index.generic} generic selectors on every site."
+    yield ""
+    yield "| Host | Selectors | Specific | Procedural | CSS bytes |"
+    yield "| --- | ---: | ---: | ---: | ---: |"
+    for c in costs:
+        yield f"| {c.host} | {c.selectors} | {c.specific} | {c.procedural} | {c.css_bytes} |"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Cosmetic selectors and CSS bytes injected per hostname")
+    parser.add_argument("hosts", nargs="*", help="Hostnames to report (default: the worst sites)")
+    parser.add_argument("-l", "--list", dest="lists", type=Path, action="append", help="Filter list or directory")
+    parser.add_argument("--top", type=int, default=REPORT_TOP, help=f"Sites to rank (default: {REPORT_TOP})")
+    parser.add_argument("--max-bytes", type=int, help="Fail if a reported site injects more CSS bytes")
+    parser.add_argument("--max-selectors", type=int, help="Fail if a reported site gets more selectors")
+    parser.add_argument("--json", dest="json_path", type=Path, help="Write the reported costs as JSON")
+    parser.add_argument("--markdown", action="store_true", help="Print a Markdown table (for CI summaries)")
+    args = parser.parse_args()
+
+    paths = _list_files(args.lists or DEFAULT_SOURCES)
+    if not paths:
+        err(f"No filter lists in {', '.join(map(str, args.lists or DEFAULT_SOURCES))}")
+        return 1
+    missing = [path for path in paths if not path.is_file()]
+    if missing:
+        err(f"Not found: {', '.join(map(str, missing))}")
+        return 1
+    try:
+        with profiling.span("cosmetic_index.build", lists=len(paths)):
+            index = build_index(paths)
+    except (OSError, UnicodeError) as e:
+        err(f"Could not read filter lists: {e}")
+        return 1
+    profiling.count("cosmetic_index.rules", index.rules)
+    if index.skipped:
+        print(f"  Skipped {len(index.skipped)} rules with unusable domains, e.g. {index.skipped[0]}", file=sys.stderr)
+
+    with profiling.span("cosmetic_index.cost"):
+        costs = [index.cost(host) for host in args.hosts] if args.hosts else index.worst(args.top)
+
+    if args.markdown:
+        for line in _markdown(costs, index):
+            print(line)
+    else:
+        log("cosmetic_index", f"{index.rules} cosmetic rules from {len(paths)} lists, {index.generic} generic")
+        for c in costs:
+            print(f"  {c.css_bytes:>8} B {c.selectors:>6} selectors ({c.specific} specific)  {c.host}")
+            if args.hosts:
+                for origin in c.origins:
+                    print(f"      {origin}")
+
+    if args.json_path:
+        import json
+
+        if not write_lines(args.json_path, [json.dumps([c.as_dict() for c in costs], indent=2)]):
+            return 1
+        ok(f"Wrote {args.json_path}")
+
+    over = [
+        c
+        for c in costs
+        if (args.max_bytes is not None and c.css_bytes > args.max_bytes)
+        or (args.max_selectors is not None and c.selectors > args.max_selectors)
+    ]
+    for c in over:
+        err(f"{c.host} is over budget: {c.css_bytes} bytes, {c.selectors} selectors")
+    return 1 if over else 0
+
+
+if __name__ == "__main__":
+    sys.exit(profiling.run("cosmetic_index", main))
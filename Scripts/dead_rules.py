@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Find network rules that never fire on a recorded request log.
+HAR and JSONL logs are streamed in batches through the indexed matcher of
+Scripts.matcher in worker processes. Every block rule matching a request and
+every exception overriding one counts as a hit; rules without hits over the
+whole log are listed as pruning candidates. Cosmetic rules are not judged.
+
+Usage: python -m Scripts.dead_rules LOG [LOG ...] [--list FILE ...] [--workers N] [--output FILE]
+"""
+
+import argparse
+import re
+import sys
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Final
+
+_root = Path(__file__).parent.parent
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from Scripts import profiling
+from Scripts.common import err, log, ncpu, ok, write_lines
+from Scripts.matcher import Matcher, Request, iter_corpus_fields, load_matcher
+
+DEFAULT_LISTS_DIR: Final[Path] = Path("lists/adblock")
+# Requests per task handed to a worker.
+BATCH_SIZE: Final[int] = 5000
+# Tasks in flight per worker; bounds memory however long the log is.
+BATCHES_PER_WORKER: Final[int] = 2
+HAR_CHUNK: Final[int] = 1 << 20
+
+Fields = tuple[str, str, str, str]
+
+_ENTRIES_RE = re.compile(r'"entries"\s*:\s*\[')
+_PAGES_RE = re.compile(r'"pages"\s*:\s*\[')
+_SKIP_RE = re.compile(r"[\s,]*")
+# Response MIME type fragments -> request type, for HARs without _resourceType.
+_MIME_TYPES: Final[tuple[tuple[str, str], ...]] = (
+    ("javascript", "script"),
+    ("ecmascript", "script"),
+    ("css", "stylesheet"),
+    ("image/", "image"),
+    ("font", "font"),
+    ("audio/", "media"),
+    ("video/", "media"),
+    ("html", "subdocument"),
+    ("json", "xmlhttprequest"),
+    ("xml", "xmlhttprequest"),
+)
+
+
+# ============================================================================
+# REQUEST LOGS
+# ============================================================================
+
+
+def _har_pages(prefix: str) -> dict[str, str]:
+    """pageref -> page URL from the part of a HAR before its entries."""
+    import json
+
+    m = _PAGES_RE.search(prefix)
+    if m is None:
+        return {}
+    try:
+        pages, _ = json.JSONDecoder().raw_decode(prefix, m.end() - 1)
+        # Chrome titles pages with their URL; other titles are no use as a source.
+        return {page["id"]: page["title"] for page in pages if "://" in page.get("title", "")}
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return {}
+
+
+def _har_fields(entry: dict, pages: dict[str, str]) -> Fields | None:
+    try:
+        request = entry["request"]
+        url = request["url"]
+        source = pages.get(entry.get("pageref", ""), "")
+        if not source:
+            source = next((h["value"] for h in request.get("headers", ()) if h["name"].lower() == "referer"), "")
+        kind = entry.get("_resourceType") or ""
+        if not kind:
+            mime = entry.get("response", {}).get("content", {}).get("mimeType", "").lower()
+            kind = next((t for fragment, t in _MIME_TYPES if fragment in mime), "other")
+            if kind == "subdocument" and (not source or source == url):
+                kind = "document"
+        fields = (url, source, kind, request.get("method") or "get")
+    except (KeyError, TypeError, AttributeError):
+        return None
+    return fields if all(isinstance(value, str) for value in fields) else None
+
+
+def iter_har_fields(path: Path) -> Iterator[Fields | None]:
+    """Stream (url, source, type, method) from a HAR file one entry at a time.
+
+    Only the entry being decoded is held in memory, so logs far larger than
+    RAM work. Unusable entries yield None; a truncated file ends the stream.
+    """
+    import json
+
+    decoder = json.JSONDecoder()
+    with path.open("r", encoding="utf-8", errors="replace") as f:
+        buf = ""
+        while (m := _ENTRIES_RE.search(buf)) is None:
+            chunk = f.read(HAR_CHUNK)
+            if not chunk:
+                return
+            buf += chunk
+        pages = _har_pages(buf[: m.start()])
+        buf = buf[m.end() :]
+        pos = 0
+        while True:
+            pos = _SKIP_RE.match(buf, pos).end()
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                entry, pos = decoder.raw_decode(buf, pos)
+            except ValueError:
+                # Grow geometrically so huge entries are not re-decoded per chunk.
+                chunk = f.read(max(HAR_CHUNK, len(buf) - pos))
+                if not chunk:
+                    return
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            yield _har_fields(entry, pages) if isinstance(entry, dict) else None
+            if pos > HAR_CHUNK:
+                buf = buf[pos:]
+                pos = 0
+
+
+def _is_har(path: Path) -> bool:
+    if path.suffix.lower() == ".har":
+        return True
+    with path.open("rb") as f:
+        head = f.read(256).lstrip()
+    return re.match(rb'\{\s*"log"\s*:', head) is not None
+
+
+def iter_log(path: Path) -> Iterator[Fields | None]:
+    """Request fields from a HAR or JSONL log."""
+    return iter_har_fields(path) if _is_har(path) else iter_corpus_fields(path)
+
+
+def _batches(items: Iterable[Fields | None], size: int, invalid: Counter[str]) -> Iterator[list[Fields]]:
+    batch: list[Fields] = []
+    for fields in items:
+        if fields is None:
+            invalid["entries"] += 1
+            continue
+        batch.append(fields)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ============================================================================
+# HIT COUNTING
+# ============================================================================
+
+
+def count_hits(matcher: Matcher, batch: Iterable[Fields]) -> Counter[str]:
+    """Hits per rule origin over a batch of request fields."""
+    hits: Counter[str] = Counter()
+    matching = matcher.matching
+    for fields in batch:
+        for rule in matching(Request(*fields)):
+            hits[rule.origin] += 1
+    return hits
+
+
+_worker_matcher: Matcher | None = None
+
+
+def _init_worker(paths: list[Path]) -> None:
+    global _worker_matcher
+    _worker_matcher = load_matcher(paths)
+
+
+def _count_batch(batch: list[Fields]) -> tuple[Counter[str], int]:
+    assert _worker_matcher is not None
+    return count_hits(_worker_matcher, batch), len(batch)
+
+
+def replay(
+    matcher: Matcher, paths: list[Path], batches: Iterable[list[Fields]], workers: int = 1
+) -> tuple[Counter[str], int]:
+    """Total hits per rule origin and number of requests replayed.
+
+    With several workers each process builds its own matcher from paths and
+    at most BATCHES_PER_WORKER batches per worker are queued at a time.
+    """
+    hits: Counter[str] = Counter()
+    requests = 0
+    if workers <= 1:
+        for batch in batches:
+            hits.update(count_hits(matcher, batch))
+            requests += len(batch)
+        return hits, requests
+
+    from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(paths,)) as pool:
+        pending = set()
+        for batch in batches:
+            if len(pending) >= workers * BATCHES_PER_WORKER:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    batch_hits, n = future.result()
+                    hits.update(batch_hits)
+                    requests += n
+            pending.add(pool.submit(_count_batch, batch))
+        for future in pending:
+            batch_hits, n = future.result()
+            hits.update(batch_hits)
+            requests += n
+    return hits, requests
+
+
+def dead_rules(matcher: Matcher, hits: Counter[str]) -> list[tuple[str, str]]:
+    """(origin, rule text) of every rule without hits, in list order."""
+    dead = [(f.origin, f.text) for f in matcher if not hits[f.origin]]
+
+    def order(item: tuple[str, str]) -> tuple[str, int]:
+        name, _, line = item[0].rpartition(":")
+        return name, int(line)
+
+    return sorted(dead, key=order)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="List network rules that never match a recorded request log")
+    parser.add_argument("logs", type=Path, nargs="+", help="HAR or JSONL request logs")
+    parser.add_argument("-l", "--list", dest="lists", type=Path, action="append", help="Filter list (repeatable)")
+    parser.add_argument("-j", "--workers", type=int, default=0, help="Worker processes (default: all cores)")
+    parser.add_argument("-o", "--output", type=Path, help="Write dead rules as origin<TAB>rule lines")
+    args = parser.parse_args()
+
+    lists: list[Path] = args.lists or sorted(DEFAULT_LISTS_DIR.glob("*.txt"))
+    if not lists:
+        err(f"No filter lists in {DEFAULT_LISTS_DIR}")
+        return 1
+    missing = [path for path in [*lists, *args.logs] if not path.is_file()]
+    if missing:
+        err(f"Not found: {', '.join(map(str, missing))}")
+        return 1
+
+    try:
+        with profiling.span("dead_rules.load", lists=len(lists)):
+            matcher = load_matcher(lists)
+    except (OSError, UnicodeError) as e:
+        err(f"Could not read filter lists: {e}")
+        return 1
+    log("dead_rules", f"Indexed {len(matcher)} network rules from {len(lists)} lists")
+
+    workers = args.workers or ncpu()
+    invalid: Counter[str] = Counter()
+    stream = (fields for path in args.logs for fields in iter_log(path))
+    try:
+        with profiling.span("dead_rules.replay", workers=workers):
+            hits, requests = replay(matcher, lists, _batches(stream, BATCH_SIZE, invalid), workers)
+    except (OSError, UnicodeError) as e:
+        err(f"Could not read request log: {e}")
+        return 1
+    profiling.count("dead_rules.requests", requests)
+    if invalid["entries"]:
+        print(f"  Skipped {invalid['entries']} unreadable log entries", file=sys.stderr)
+
+    dead = dead_rules(matcher, hits)
+    profiling.count("dead_rules.dead", len(dead))
+    log("dead_rules", f"{len(dead)} of {len(matcher)} rules never matched {requests} requests")
+    if args.output:
+        if not write_lines(args.output, (f"{origin}\t{text}" for origin, text in dead)):
+            return 1
+        ok(f"Wrote {args.output}")
+    else:
+        for origin, text in dead:
+            print(f"  {origin:<24} {text}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(profiling.run("dead_rules", main))
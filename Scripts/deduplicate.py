@@ -11,9 +11,12 @@ import sys
 from collections import defaultdict
 from collections.abc import Iterable
 from dataclasses import dataclass
+from itertools import chain
 from pathlib import Path
 
-from Scripts.common import is_valid_domain, write_lines
+from Scripts import profiling
+from Scripts.common import iter_lines, write_lines
+from Scripts.rules import parse_line
 
 HEADER_PREFIXES = ("! ", "#", "[", ";")
 
@@ -40,9 +43,8 @@ def is_valid_rule(line: str) -> bool:
     if not line or len(line) > 2048:
         return False
     if line.startswith(("||", "@@||")):
-        # Extract domain part: remove || or @@||, stop at ^ or $ or options separator
-        domain = line.split("^")[0].lstrip("|@")
-        return is_valid_domain(domain)
+        # The anchored hostname must be a valid domain; paths and options may follow.
+        return parse_line(line).hostname is not None
     return True
 
 
@@ -97,16 +99,12 @@ def deduplicate_file(filepath: Path) -> tuple[Stats, list[str]]:
     print(f"Processing: {filepath}")
 
     try:
-        with filepath.open("r", encoding="utf-8") as f:
-            lines_gen = (line.strip() for line in f)
-            headers, rules, stats = process_content(lines_gen)
+        headers, rules, stats = process_content(line.strip() for line in iter_lines(filepath))
     except OSError as e:
         print(f"  Error reading {filepath}: {e}", file=sys.stderr)
         return Stats(), []
 
-    final_content = headers + rules
-
-    if write_lines(filepath, final_content):
+    if write_lines(filepath, chain(headers, rules)):
         print(
             f"  {stats.original} → {stats.final} lines ({stats.removed} removed, {stats.compression_ratio:.1f}% reduction)"
         )
@@ -153,7 +151,8 @@ def main() -> int:
     total_stats = Stats()
     file_rules = {}
     for filepath in txt_files:
-        stats, rules = deduplicate_file(filepath)
+        with profiling.span("dedupe.file", file=filepath.name):
+            stats, rules = deduplicate_file(filepath)
         file_rules[filepath.name] = rules
         total_stats.original += stats.original
         total_stats.final += stats.final
@@ -167,7 +166,11 @@ def main() -> int:
 
     print(f"\n{'=' * 60}")
     print("Checking for cross-file duplicates...")
-    duplicates = find_cross_file_duplicates(file_rules)
+    with profiling.span("dedupe.cross_file"):
+        duplicates = find_cross_file_duplicates(file_rules)
+    profiling.count("dedupe.lines_in", total_stats.original)
+    profiling.count("dedupe.lines_out", total_stats.final)
+    profiling.count("dedupe.cross_file_duplicates", len(duplicates))
 
     if duplicates:
         file_groups = defaultdict(list)
@@ -188,4 +191,4 @@ def main() -> int:
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(profiling.run("deduplicate", main))
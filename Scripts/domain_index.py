@@ -0,0 +1,203 @@
+"""
+Persisted sorted domain index for the hostlist directory.
+Every valid domain in lists/hostlist/*.txt is mapped to the file listing it
+in one sorted base file that is binary searched through mmap, plus a small
+append-only delta, so membership and parent-coverage checks never re-read
+or re-validate the hostlists. The index is rebuilt only when a hostlist
+changed behind its back (size or mtime differ).
+"""
+
+import hashlib
+import json
+import mmap
+import os
+import sys
+from collections.abc import Iterable
+from pathlib import Path
+from typing import Final
+
+from Scripts.common import CACHE_DIR, iter_lines, validate_domains, write_lines
+from Scripts.merge import merge_unique
+
+# Bump when the on-disk layout changes so old indexes are rebuilt.
+INDEX_VERSION: Final[int] = 2
+INDEX_CACHE: Final[Path] = CACHE_DIR / "hostlist-index"
+# Fold the delta into the base once it exceeds this share of the base size.
+COMPACT_RATIO: Final[int] = 8
+COMPACT_MIN_BYTES: Final[int] = 64 * 1024
+# Files in the hostlist directory that are not block lists.
+UNINDEXED: Final[frozenset[str]] = frozenset({"exclusions.txt"})
+
+
+def sorted_lookup(mm: mmap.mmap | bytes, key: bytes) -> bytes | None:
+    """Binary search a sorted buffer of ``key<TAB>value`` lines for key.
+
+    Returns the value, or None if key is absent. Tab sorts before every
+    domain character, so sorting whole lines also sorts them by key, and
+    UTF-8 byte order matches code point order, so str-sorted files qualify.
+    """
+    lo, hi = 0, len(mm)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        nl = mm.rfind(b"\n", lo, mid)
+        start = nl + 1 if nl != -1 else lo
+        end = mm.find(b"\n", start, hi)
+        if end == -1:
+            end = hi
+        tab = mm.find(b"\t", start, end)
+        line_key = mm[start : tab if tab != -1 else end]
+        if line_key == key:
+            return mm[tab + 1 : end] if tab != -1 else b""
+        if line_key < key:
+            lo = end + 1
+        else:
+            hi = start
+    return None
+
+
+def parent_domains(domain: str) -> list[str]:
+    """Domain and each parent above the TLD, most specific first."""
+    labels = domain.split(".")
+    return [".".join(labels[i:]) for i in range(max(len(labels) - 1, 1))]
+
+
+class DomainIndex:
+    """Sorted on-disk map from every valid domain in a hostlist directory to its file."""
+
+    def __init__(self, hostlist_dir: Path, cache_dir: Path = INDEX_CACHE) -> None:
+        self.hostlist_dir = hostlist_dir
+        key = hashlib.sha256(str(hostlist_dir.resolve()).encode()).hexdigest()[:12]
+        stem = cache_dir / f"{hostlist_dir.name}-{key}"
+        self.base = stem.with_suffix(".idx")
+        self.delta_path = stem.with_suffix(".delta")
+        self.meta = stem.with_suffix(".json")
+        self.delta: dict[str, str] = {}
+        self.stats: dict[str, list[int]] = {}
+
+    @classmethod
+    def open(cls, hostlist_dir: Path, cache_dir: Path = INDEX_CACHE) -> "DomainIndex | None":
+        """Load the index for hostlist_dir, rebuilding it if stale. Returns None on error."""
+        index = cls(hostlist_dir, cache_dir)
+        try:
+            if not index._load():
+                index.rebuild()
+        except (OSError, UnicodeError) as e:
+            print(f"  Error reading {hostlist_dir}: {e}", file=sys.stderr)
+            return None
+        return index
+
+    def _hostlists(self) -> list[Path]:
+        return [p for p in sorted(self.hostlist_dir.glob("*.txt")) if p.name not in UNINDEXED]
+
+    @staticmethod
+    def _stat(path: Path) -> list[int]:
+        st = path.stat()
+        return [st.st_size, st.st_mtime_ns]
+
+    def _current_stats(self) -> dict[str, list[int]]:
+        return {p.name: self._stat(p) for p in self._hostlists()}
+
+    def _load(self) -> bool:
+        try:
+            meta = json.loads(self.meta.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return False
+        if meta.get("version") != INDEX_VERSION or not self.base.exists():
+            return False
+        self.stats = self._current_stats()
+        if meta.get("stats") != self.stats:
+            return False
+        if self.delta_path.exists():
+            self.delta = dict(line.split("\t", 1) for line in iter_lines(self.delta_path, skip_empty=True))
+        return True
+
+    def _write_meta(self) -> None:
+        meta = {"version": INDEX_VERSION, "hostlist_dir": str(self.hostlist_dir), "stats": self.stats}
+        self.meta.write_text(json.dumps(meta) + "\n", encoding="utf-8")
+
+    def rebuild(self) -> None:
+        """Index every hostlist from scratch; a domain listed twice maps to the first file."""
+        owners: dict[str, str] = {}
+        for path in self._hostlists():
+            for domain in validate_domains(line.strip() for line in iter_lines(path)):
+                owners.setdefault(domain, path.name)
+        self.base.parent.mkdir(parents=True, exist_ok=True)
+        if not write_lines(self.base, (f"{d}\t{owners[d]}" for d in sorted(owners))):
+            raise OSError(f"could not write {self.base}")
+        self.delta_path.unlink(missing_ok=True)
+        self.delta = {}
+        self.stats = self._current_stats()
+        self._write_meta()
+
+    def lookup(self, domains: Iterable[str]) -> dict[str, str]:
+        """Map each indexed domain among domains to the file listing it."""
+        found: dict[str, str] = {}
+        pending: list[str] = []
+        for domain in domains:
+            if domain in self.delta:
+                found[domain] = self.delta[domain]
+            else:
+                pending.append(domain)
+        if not pending:
+            return found
+        with self.base.open("rb") as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return found
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                for domain in pending:
+                    value = sorted_lookup(mm, domain.encode())
+                    if value is not None:
+                        found[domain] = value.decode()
+        return found
+
+    def get(self, domain: str) -> str | None:
+        """File listing exactly domain, if any."""
+        return self.lookup([domain]).get(domain)
+
+    def __contains__(self, domain: str) -> bool:
+        return self.get(domain) is not None
+
+    def covering(self, domain: str) -> tuple[str, str] | None:
+        """Least specific indexed entry covering domain (itself or a parent) and its file."""
+        parents = parent_domains(domain)
+        found = self.lookup(parents)
+        for parent in reversed(parents):
+            if parent in found:
+                return parent, found[parent]
+        return None
+
+    def missing(self, domains: Iterable[str]) -> list[str]:
+        """Sorted, unique domains neither indexed nor covered by a parent.
+
+        Parents listed in the same batch count too, so ``example.com`` and
+        ``ads.example.com`` together yield only ``example.com``.
+        """
+        candidates = sorted(set(domains), key=lambda d: (d.count("."), d))
+        found = self.lookup({p for d in candidates for p in parent_domains(d)})
+        accepted: set[str] = set()
+        for domain in candidates:
+            if not any(p in found or p in accepted for p in parent_domains(domain)):
+                accepted.add(domain)
+        return sorted(accepted)
+
+    def add(self, domains: list[str], hostlist: str) -> None:
+        """Record domains that were just appended to the hostlist file named hostlist."""
+        new = [d for d in domains if d not in self.delta]
+        if new:
+            if not write_lines(self.delta_path, (f"{d}\t{hostlist}" for d in new), mode="a"):
+                raise OSError(f"could not write {self.delta_path}")
+            self.delta.update(dict.fromkeys(new, hostlist))
+            if self.delta_path.stat().st_size > max(COMPACT_MIN_BYTES, self.base.stat().st_size // COMPACT_RATIO):
+                self.compact()
+        # Only the appended file is re-stamped; other changes still force a rebuild.
+        self.stats[hostlist] = self._stat(self.hostlist_dir / hostlist)
+        self._write_meta()
+
+    def compact(self) -> None:
+        """Merge the delta into the sorted base."""
+        delta = sorted(f"{d}\t{f}" for d, f in self.delta.items())
+        merged = merge_unique([iter_lines(self.base, skip_empty=True), delta])
+        if not write_lines(self.base, merged):
+            raise OSError(f"could not write {self.base}")
+        self.delta_path.unlink(missing_ok=True)
+        self.delta = {}
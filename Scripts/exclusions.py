@@ -0,0 +1,188 @@
+"""
+Hostname allowlist shared by hosts_creator and the hosts build.
+Entries follow the hostlist-compiler exclusions format: plain or ``||host^``
+domains exclude the domain and its subdomains, ``*.host`` only its
+subdomains, other wildcards and ``/regex/`` entries match the hostname.
+Domains go into a suffix trie and the patterns into one combined regex
+(split into anchored and floating halves), so the cost per hostname does
+not grow with the number of domain entries.
+"""
+
+import json
+import re
+import sys
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from pathlib import Path
+from typing import Final
+
+from Scripts.common import is_valid_domain, log
+from Scripts.suffix_trie import SuffixTrie
+
+EXCLUSIONS_CONFIG: Final[Path] = Path(__file__).parent.parent / "lists" / "conf.json"
+# Entries named in the match report.
+REPORT_TOP: Final[int] = 10
+
+# Regex entries that cannot be wrapped in a named group of the combined pattern.
+_UNCOMBINABLE_RE = re.compile(r"\(\?P[<=]|\\[1-9]|^\(\?[a-zA-Z]+\)")
+
+
+def _strip_rule(entry: str) -> str:
+    """Drop adblock rule syntax around a hostname: ``@@||host^$opts`` -> ``host``."""
+    host = entry.removeprefix("@@")
+    host = host[2:] if host.startswith("||") else host.removeprefix("|")
+    host = host.partition("$")[0]
+    return host.removesuffix("|").removesuffix("^").rstrip(".").lower()
+
+
+class Exclusions:
+    """Compiled hostname allowlist that counts which entries matched."""
+
+    def __init__(self, entries: Iterable[str] = ()) -> None:
+        # Value: (entry, whether the suffix itself is excluded or only its subdomains).
+        self._trie: SuffixTrie[tuple[str, bool]] = SuffixTrie()
+        self._patterns: list[tuple[str, str]] = []
+        self._anchored: re.Pattern | None = None
+        self._floating: re.Pattern | None = None
+        self._extra: list[tuple[re.Pattern, str]] = []
+        self._groups: dict[str, str] = {}
+        self.hits: Counter[str] = Counter()
+        # Hostnames excluded so far, so callers can tell them from written ones.
+        self.dropped: set[str] = set()
+        self.skipped: list[str] = []
+        for entry in entries:
+            self.add(entry)
+        self.compile()
+
+    def __len__(self) -> int:
+        return len(self._trie) + len(self._patterns)
+
+    def add(self, raw: str) -> None:
+        """Add one entry; call compile() before matching if patterns were added."""
+        entry = raw.strip()
+        if not entry or entry.startswith(("!", "#")):
+            return
+        if len(entry) > 2 and entry.startswith("/") and entry.endswith("/"):
+            try:
+                re.compile(entry[1:-1])
+            except re.error:
+                self.skipped.append(entry)
+                return
+            self._patterns.append((entry, entry[1:-1]))
+            return
+        host = _strip_rule(entry)
+        if host.startswith("*.") and "*" not in host[2:] and is_valid_domain(host[2:]):
+            existing = self._trie.get(host[2:])
+            if existing is None or not existing[1]:
+                self._trie.insert(host[2:], (entry, False))
+        elif "*" in host:
+            regex = ".*".join(re.escape(part) for part in host.split("*"))
+            self._patterns.append((entry, f"^{regex}$"))
+        elif is_valid_domain(host):
+            self._trie.insert(host, (entry, True))
+        else:
+            self.skipped.append(entry)
+
+    def compile(self) -> None:
+        """Combine pattern entries into one regex tried at the start and one searched."""
+        anchored: list[str] = []
+        floating: list[str] = []
+        self._groups = {}
+        self._extra = []
+        for entry, regex in self._patterns:
+            if _UNCOMBINABLE_RE.search(regex):
+                self._extra.append((re.compile(regex), entry))
+                continue
+            name = f"_x{len(self._groups)}"
+            self._groups[name] = entry
+            # Only a leading ^ without alternation pins every match to position 0.
+            parts = anchored if regex.startswith("^") and "|" not in regex else floating
+            parts.append(f"(?P<{name}>{regex})")
+        self._anchored = re.compile("|".join(anchored)) if anchored else None
+        self._floating = re.compile("|".join(floating)) if floating else None
+
+    def match(self, host: str) -> str | None:
+        """Entry excluding host (lowercase), or None."""
+        for suffix, (entry, itself) in self._trie.matches(host):
+            if itself or len(suffix) < len(host):
+                return entry
+        m = self._anchored.match(host) if self._anchored is not None else None
+        if m is None and self._floating is not None:
+            m = self._floating.search(host)
+        if m is not None:
+            return self._groups[m.lastgroup]
+        for pattern, entry in self._extra:
+            if pattern.search(host):
+                return entry
+        return None
+
+    def excluded(self, host: str) -> bool:
+        """Whether host is excluded, recording the hit."""
+        entry = self.match(host)
+        if entry is None:
+            return False
+        self.hits[entry] += 1
+        self.dropped.add(host)
+        return True
+
+    def filter(self, hosts: Iterable[str]) -> Iterator[str]:
+        """Yield hosts that are not excluded."""
+        excluded = self.excluded
+        return (host for host in hosts if not excluded(host))
+
+    def report(self, limit: int = REPORT_TOP) -> None:
+        """Log how many hostnames each entry excluded."""
+        log("exclusions", f"Excluded {len(self.dropped)} hostnames via {len(self.hits)} of {len(self)} entries")
+        for entry, n in self.hits.most_common(limit):
+            print(f"  {n:>8}  {entry}")
+        if self.skipped:
+            print(f"  Skipped {len(self.skipped)} unusable entries, e.g. {self.skipped[0]}", file=sys.stderr)
+
+
+def config_sources(config_path: Path) -> tuple[list[str], list[str]]:
+    """Inline exclusions and exclusions_sources of a hostlist-compiler config, its sources included."""
+    try:
+        config = json.loads(config_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError) as e:
+        print(f"  Error reading {config_path}: {e}", file=sys.stderr)
+        return [], []
+    inline: list[str] = []
+    sources: list[str] = []
+    for section in (config, *config.get("sources", [])):
+        inline.extend(section.get("exclusions", []))
+        sources.extend(section.get("exclusions_sources", []))
+    return inline, list(dict.fromkeys(sources))
+
+
+def load_exclusions(
+    config_path: Path | None = EXCLUSIONS_CONFIG, extra_sources: Iterable[str] = ()
+) -> Exclusions:
+    """Compile the exclusions named by a config file plus any extra sources.
+
+    Relative sources resolve against the config's directory, or the working
+    directory for extra ones. Unreadable sources are reported and skipped;
+    local files the config names but that do not exist are skipped quietly,
+    as the shared hostlist-compiler config lists optional ones.
+    """
+    from Scripts.hostlist_compiler import iter_source
+
+    exclusions = Exclusions()
+    # (location, base directory, whether a missing local file is expected)
+    located: list[tuple[str, Path, bool]] = []
+    if config_path is not None:
+        inline, sources = config_sources(config_path)
+        for entry in inline:
+            exclusions.add(entry)
+        located += [(source, config_path.parent, True) for source in sources]
+    located += [(source, Path(), False) for source in extra_sources]
+    for location, base_dir, optional in located:
+        try:
+            for entry in iter_source(location, base_dir):
+                exclusions.add(entry)
+        except FileNotFoundError as e:
+            if not optional:
+                print(f"  Error reading exclusion source {location}: {e}", file=sys.stderr)
+        except (OSError, UnicodeError) as e:  # includes urllib.error.URLError
+            print(f"  Error reading exclusion source {location}: {e}", file=sys.stderr)
+    exclusions.compile()
+    return exclusions
@@ -0,0 +1,473 @@
+#!/usr/bin/env python3
+"""
+Compile hostlist configurations without the Node hostlist-compiler.
+Implements the @adguard/hostlist-compiler transformations used by
+hostlist-config.json, applied in the same fixed order as the Node tool.
+"""
+
+import argparse
+import json
+import re
+import sys
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass, field
+from datetime import UTC, datetime
+from functools import partial
+from itertools import chain
+from pathlib import Path
+from typing import Final
+
+from Scripts.common import fetch, is_valid_domain, write_lines
+
+# The Node tool ignores the order given in the config and always applies
+# transformations in this order.
+TRANSFORMATION_ORDER: Final[tuple[str, ...]] = (
+    "RemoveComments",
+    "Compress",
+    "RemoveModifiers",
+    "Validate",
+    "ValidateAllowIp",
+    "Deduplicate",
+    "InvertAllow",
+    "RemoveEmptyLines",
+    "TrimLines",
+    "InsertFinalNewLine",
+    "ConvertToAscii",
+)
+
+# Modifiers dropped by RemoveModifiers; they are meaningless for DNS blocking.
+REMOVABLE_MODIFIERS: Final[frozenset[str]] = frozenset(
+    {"third-party", "3p", "document", "doc", "all", "popup", "network"}
+)
+# Modifiers supported by DNS-level blockers, kept by Validate.
+DNS_MODIFIERS: Final[frozenset[str]] = frozenset(
+    {"important", "ctag", "dnstype", "dnsrewrite", "denyallow", "badfilter", "client"}
+)
+COSMETIC_MARKERS: Final[tuple[str, ...]] = ("##", "#@#", "#?#", "#$#", "#%#", "$$", "$@$")
+MIN_RULE_LENGTH: Final[int] = 4
+
+_IPV4_RE = re.compile(r"^\d{1,3}(?:\.\d{1,3}){3}$")
+_HOSTS_RULE_RE = re.compile(r"^(\d{1,3}(?:\.\d{1,3}){3}|[0-9a-f:]*:[0-9a-f:.]*)\s+(.+)$", re.IGNORECASE)
+_NON_ASCII_RE = re.compile(r"[^\s|^$/,=~@#*]*[^\x00-\x7f][^\s|^$/,=~@#*]*")
+
+
+@dataclass(slots=True)
+class Source:
+    source: str
+    name: str = ""
+    type: str = "adblock"
+    transformations: list[str] = field(default_factory=list)
+    exclusions: list[str] = field(default_factory=list)
+    exclusions_sources: list[str] = field(default_factory=list)
+    inclusions: list[str] = field(default_factory=list)
+    inclusions_sources: list[str] = field(default_factory=list)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "Source":
+        return cls(
+            source=data["source"],
+            name=data.get("name", ""),
+            type=data.get("type", "adblock"),
+            transformations=list(data.get("transformations", [])),
+            exclusions=list(data.get("exclusions", [])),
+            exclusions_sources=list(data.get("exclusions_sources", [])),
+            inclusions=list(data.get("inclusions", [])),
+            inclusions_sources=list(data.get("inclusions_sources", [])),
+        )
+
+
+# ============================================================================
+# RULE HELPERS
+# ============================================================================
+
+
+def is_comment(line: str) -> bool:
+    """Check if a line is a comment the way the Node compiler does."""
+    return line.startswith("!") or line.startswith("# ") or line == "#" or line.startswith("####")
+
+
+def is_cosmetic(line: str) -> bool:
+    return any(marker in line for marker in COSMETIC_MARKERS)
+
+
+def is_regex_rule(pattern: str) -> bool:
+    return len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/")
+
+
+def split_options(line: str) -> tuple[str, list[str]]:
+    """Split a network rule into its pattern and modifier list."""
+    if is_regex_rule(line):
+        return line, []
+    idx = line.rfind("$")
+    if idx <= 0:
+        return line, []
+    return line[:idx], [opt for opt in line[idx + 1 :].split(",") if opt]
+
+
+def parse_hosts_rule(line: str) -> list[str] | None:
+    """Return hostnames of an /etc/hosts style rule, or None."""
+    m = _HOSTS_RULE_RE.match(line)
+    if not m:
+        return None
+    hosts = m.group(2).split("#", 1)[0].split()
+    return [h.lower() for h in hosts] or None
+
+
+def _domain_part(pattern: str) -> str | None:
+    """Extract the hostname from a ``||host^`` pattern, or None if it has a path."""
+    host = pattern.removeprefix("@@")
+    host = host[2:] if host.startswith("||") else host.removeprefix("|")
+    host = host.removesuffix("|").removesuffix("^")
+    if any(c in host for c in "/^|$?="):
+        return None
+    return host
+
+
+def _is_ip(host: str) -> bool:
+    return bool(_IPV4_RE.match(host)) or (":" in host and all(c in "0123456789abcdefABCDEF:." for c in host))
+
+
+def _simple_hostnames(line: str) -> list[str] | None:
+    """Hostnames of a rule that Compress may rewrite as ``||host^``."""
+    hosts = parse_hosts_rule(line)
+    if hosts is not None:
+        return hosts
+    if is_valid_domain(line):
+        return [line.lower()]
+    if line.startswith("||") and line.endswith("^"):
+        host = line[2:-1]
+        if is_valid_domain(host):
+            return [host.lower()]
+    return None
+
+
+def _compile_patterns(patterns: Iterable[str]) -> list[Callable[[str], bool]]:
+    """Compile exclusion/inclusion patterns: /regex/, wildcard or plain substring."""
+    matchers: list[Callable[[str], bool]] = []
+    for raw in patterns:
+        pattern = raw.strip()
+        if not pattern or is_comment(pattern):
+            continue
+        if is_regex_rule(pattern):
+            try:
+                matchers.append(re.compile(pattern[1:-1]).search)
+            except re.error:
+                print(f"  Invalid regex pattern skipped: {pattern}", file=sys.stderr)
+        elif "*" in pattern:
+            regex = ".*".join(re.escape(part) for part in pattern.split("*"))
+            matchers.append(re.compile(regex).search)
+        else:
+            matchers.append(lambda line, p=pattern: p in line)
+    return matchers
+
+
+# ============================================================================
+# TRANSFORMATIONS
+# ============================================================================
+
+
+def remove_comments(lines: Iterable[str]) -> Iterator[str]:
+    return (line for line in lines if not is_comment(line.strip()))
+
+
+def compress(lines: Iterable[str]) -> list[str]:
+    """Convert hosts/plain rules to ``||host^`` and drop rules covered by a parent domain."""
+    entries: list[str | list[str]] = []
+    blocked: set[str] = set()
+    for line in lines:
+        hosts = _simple_hostnames(line.strip())
+        if hosts is None:
+            entries.append(line)
+        else:
+            entries.append(hosts)
+            blocked.update(hosts)
+
+    out: list[str] = []
+    emitted: set[str] = set()
+    for entry in entries:
+        if isinstance(entry, str):
+            out.append(entry)
+            continue
+        for host in entry:
+            if host in emitted or _has_blocked_parent(host, blocked):
+                continue
+            emitted.add(host)
+            out.append(f"||{host}^")
+    return out
+
+
+def _has_blocked_parent(host: str, blocked: set[str]) -> bool:
+    idx = host.find(".")
+    while idx != -1:
+        parent = host[idx + 1 :]
+        if "." in parent and parent in blocked:
+            return True
+        idx = host.find(".", idx + 1)
+    return False
+
+
+def remove_modifiers(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or is_comment(stripped) or is_cosmetic(stripped):
+            yield line
+            continue
+        pattern, options = split_options(stripped)
+        if not options:
+            yield line
+            continue
+        kept = [opt for opt in options if opt.lower() not in REMOVABLE_MODIFIERS]
+        yield f"{pattern}${','.join(kept)}" if kept else pattern
+
+
+def _is_valid_rule(line: str, allow_ip: bool) -> bool:
+    if is_cosmetic(line):
+        return False
+    hosts = parse_hosts_rule(line)
+    if hosts is not None:
+        return all(is_valid_domain(h) for h in hosts)
+    if is_valid_domain(line):
+        return True
+    if allow_ip and _is_ip(line):
+        return True
+
+    pattern, options = split_options(line)
+    if any(opt.lstrip("~").split("=", 1)[0].lower() not in DNS_MODIFIERS for opt in options):
+        return False
+    body = pattern.removeprefix("@@")
+    if is_regex_rule(body):
+        return True
+    if len(body) < MIN_RULE_LENGTH or not body.startswith("|"):
+        return False
+    host = _domain_part(body)
+    if not host:
+        return False
+    if _is_ip(host):
+        return allow_ip
+    if "*" in host:
+        # Wildcards are fine inside a host but never for the whole TLD part.
+        labels = host.split(".")
+        return len(labels) > 2 and "*" not in "".join(labels[-2:]) and is_valid_domain(host.replace("*", "a"))
+    return is_valid_domain(host)
+
+
+def validate(lines: Iterable[str], allow_ip: bool = False) -> Iterator[str]:
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or is_comment(stripped) or _is_valid_rule(stripped, allow_ip):
+            yield line
+
+
+def deduplicate(lines: Iterable[str]) -> Iterator[str]:
+    seen: set[str] = set()
+    for line in lines:
+        stripped = line.strip()
+        if not stripped or is_comment(stripped):
+            yield line
+        elif stripped not in seen:
+            seen.add(stripped)
+            yield line
+
+
+def invert_allow(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        stripped = line.strip()
+        if stripped and not is_comment(stripped) and not stripped.startswith("@@") and not is_cosmetic(stripped):
+            yield f"@@{stripped}"
+        else:
+            yield line
+
+
+def remove_empty_lines(lines: Iterable[str]) -> Iterator[str]:
+    return (line for line in lines if line.strip())
+
+
+def trim_lines(lines: Iterable[str]) -> Iterator[str]:
+    return (line.strip() for line in lines)
+
+
+def _to_ascii(match: re.Match) -> str:
+    try:
+        return match.group(0).encode("idna").decode("ascii")
+    except UnicodeError:
+        return match.group(0)
+
+
+def convert_to_ascii(lines: Iterable[str]) -> Iterator[str]:
+    for line in lines:
+        yield line if line.isascii() else _NON_ASCII_RE.sub(_to_ascii, line)
+
+
+_TRANSFORMS: Final[dict[str, Callable[[Iterable[str]], Iterable[str]]]] = {
+    "RemoveComments": remove_comments,
+    "Compress": compress,
+    "RemoveModifiers": remove_modifiers,
+    "Validate": validate,
+    "ValidateAllowIp": partial(validate, allow_ip=True),
+    "Deduplicate": deduplicate,
+    "InvertAllow": invert_allow,
+    "RemoveEmptyLines": remove_empty_lines,
+    "TrimLines": trim_lines,
+    "ConvertToAscii": convert_to_ascii,
+}
+
+
+def apply_transformations(lines: Iterable[str], transformations: Iterable[str]) -> Iterable[str]:
+    """Lazily chain the requested transformations in the compiler's fixed order."""
+    requested = set(transformations)
+    unknown = requested - set(TRANSFORMATION_ORDER)
+    if unknown:
+        raise ValueError(f"Unknown transformations: {', '.join(sorted(unknown))}")
+    for name in TRANSFORMATION_ORDER:
+        if name in requested and name in _TRANSFORMS:
+            lines = _TRANSFORMS[name](lines)
+    return lines
+
+
+def filter_patterns(
+    lines: Iterable[str],
+    exclusions: Iterable[str] = (),
+    inclusions: Iterable[str] = (),
+) -> Iterable[str]:
+    excluded = _compile_patterns(exclusions)
+    included = _compile_patterns(inclusions)
+    if not excluded and not included:
+        return lines
+    return (
+        line
+        for line in lines
+        if not any(match(line) for match in excluded) and (not included or any(match(line) for match in included))
+    )
+
+
+# ============================================================================
+# SOURCES
+# ============================================================================
+
+
+def iter_source(location: str, base_dir: Path) -> Iterator[str]:
+    """Stream lines from a local path or URL (through the shared download cache)."""
+    if location.startswith(("http://", "https://")):
+        with fetch(location).open("r", encoding="utf-8", errors="replace", newline="") as f:
+            for line in f:
+                yield line.rstrip("\r\n")
+        return
+    path = Path(location)
+    if not path.is_absolute():
+        path = base_dir / path
+    with path.open("r", encoding="utf-8") as f:
+        for line in f:
+            yield line.rstrip("\r\n")
+
+
+def _load_patterns(inline: list[str], sources: list[str], base_dir: Path) -> list[str]:
+    patterns = list(inline)
+    for location in sources:
+        try:
+            patterns.extend(iter_source(location, base_dir))
+        except OSError as e:  # includes urllib.error.URLError
+            print(f"  Error reading pattern source {location}: {e}", file=sys.stderr)
+    return patterns
+
+
+def compile_source(source: Source, base_dir: Path) -> Iterable[str]:
+    lines = iter_source(source.source, base_dir)
+    lines = filter_patterns(
+        lines,
+        _load_patterns(source.exclusions, source.exclusions_sources, base_dir),
+        _load_patterns(source.inclusions, source.inclusions_sources, base_dir),
+    )
+    return apply_transformations(lines, source.transformations)
+
+
+def _source_lines(sources: list[Source], base_dir: Path) -> Iterator[str]:
+    for source in sources:
+        try:
+            yield from compile_source(source, base_dir)
+        except (OSError, UnicodeError) as e:
+            print(f"  Error reading source {source.source}: {e}", file=sys.stderr)
+
+
+def build_header(config: dict) -> list[str]:
+    header = ["!", f"! Title: {config.get('name', '')}"]
+    for key, label in (
+        ("description", "Description"),
+        ("version", "Version"),
+        ("homepage", "Homepage"),
+        ("license", "License"),
+    ):
+        if config.get(key):
+            header.append(f"! {label}: {config[key]}")
+    header += [
+        f"! Last modified: {datetime.now(UTC).isoformat()}",
+        "!",
+        "! Compiled by Ven0m0-Adblock hostlist_compiler",
+        "!",
+    ]
+    return header
+
+
+def compile_config(config: dict, base_dir: Path = Path()) -> Iterator[str]:
+    """Compile a hostlist-compiler configuration dict into output lines, lazily."""
+    sources = [Source.from_dict(src) for src in config.get("sources", [])]
+    lines = filter_patterns(
+        _source_lines(sources, base_dir),
+        _load_patterns(config.get("exclusions", []), config.get("exclusions_sources", []), base_dir),
+        _load_patterns(config.get("inclusions", []), config.get("inclusions_sources", []), base_dir),
+    )
+    rules = apply_transformations(lines, config.get("transformations", []))
+    return chain(build_header(config), rules)
+
+
+def compile_file(config_path: Path, output: Path) -> bool:
+    """Compile a JSON config file to output. Returns True on success."""
+    try:
+        config = json.loads(config_path.read_text(encoding="utf-8"))
+    except (OSError, json.JSONDecodeError) as e:
+        print(f"  Error reading {config_path}: {e}", file=sys.stderr)
+        return False
+    try:
+        lines = compile_config(config, config_path.parent)
+    except ValueError as e:
+        print(f"  Error compiling {config_path}: {e}", file=sys.stderr)
+        return False
+    output.parent.mkdir(parents=True, exist_ok=True)
+    return write_lines(output, lines, final_newline="InsertFinalNewLine" in config.get("transformations", []))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Compile hostlists (Python hostlist-compiler)")
+    group = parser.add_mutually_exclusive_group(required=True)
+    group.add_argument("-c", "--config", type=Path, help="Configuration file (JSON)")
+    group.add_argument("-i", "--input", action="append", help="Input file or URL (repeatable)")
+    parser.add_argument("-o", "--output", type=Path, required=True, help="Output file")
+    parser.add_argument("-v", "--verbose", action="store_true", help="Print a summary")
+    args = parser.parse_args()
+
+    if args.config:
+        if not compile_file(args.config, args.output):
+            return 1
+    else:
+        config = {
+            "name": "Blocklist",
+            "sources": [{"source": src} for src in args.input],
+            "transformations": [
+                "RemoveComments",
+                "Deduplicate",
+                "Compress",
+                "Validate",
+                "TrimLines",
+                "InsertFinalNewLine",
+            ],
+        }
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        if not write_lines(args.output, compile_config(config)):
+            return 1
+
+    if args.verbose:
+        print(f"Compiled → {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,32 +1,68 @@
 #!/usr/bin/env python3
 """Download, process, and install a system-wide hosts file for ad-blocking."""
 
+import hashlib
+import os
 import socket
-import subprocess
 import sys
-import urllib.error
-import urllib.request
+from collections.abc import Callable, Iterable, Iterator
+from datetime import UTC, datetime
 from pathlib import Path
+from typing import Final
 
 _root = Path(__file__).parent.parent
 if str(_root) not in sys.path:
     sys.path.insert(0, str(_root))
 
-from Scripts.common import die, has, log, ok, warn
+from Scripts import profiling
+from Scripts.common import die, fetch, has, is_valid_domain, iter_lines, log, ok, warn, write_lines
+from Scripts.exclusions import EXCLUSIONS_CONFIG, Exclusions, load_exclusions
 
 CONFIG_PATH = Path(__file__).parent / "hosts-config"
 BACKUP_DIR = Path("backups")
+BACKUP_KEEP: Final[int] = 5
+# Added/removed hostnames listed after an install.
+SUMMARY_SAMPLE: Final[int] = 5
+FETCH_CHUNK: Final[int] = 64 * 1024
+FETCH_WORKERS: Final[int] = 8
+DEFAULT_SINK: Final[str] = "0.0.0.0"
+# Addresses that mean "blocked"; entries using them are rewritten to the sink.
+SINKS: Final[frozenset[str]] = frozenset({"0.0.0.0", "127.0.0.1", "::", "::1", "0"})
+# Names every hosts source lists for the machine itself.
+LOCAL_NAMES: Final[frozenset[str]] = frozenset(
+    {
+        "localhost",
+        "localhost.localdomain",
+        "local",
+        "broadcasthost",
+        "ip6-localhost",
+        "ip6-loopback",
+        "ip6-localnet",
+        "ip6-mcastprefix",
+        "ip6-allnodes",
+        "ip6-allrouters",
+        "ip6-allhosts",
+    }
+)
+# Loopback entries written after the machine's own line; source lines naming
+# only LOCAL_NAMES are dropped in favour of these.
+LOCAL_LINES: Final[tuple[str, ...]] = ("::1 localhost ip6-localhost ip6-loopback", "255.255.255.255 broadcasthost")
 
 
 def _load_config() -> dict[str, str]:
     defaults: dict[str, str] = {
         "syshosts_file": "/etc/hosts",
         "backupfilename": "hosts.backup",
+        "BACKUP_KEEP": str(BACKUP_KEEP),
         "newhostsfn": "hosts-new",
         "replacehosts": "1",
         "RM_COMMENTS": "1",
         "RM_DUPLICATE_LINES": "1",
         "RM_TRAILING_SPACES": "1",
+        "SINK_IP": DEFAULT_SINK,
+        "COLLAPSE_SUBDOMAINS": "0",
+        "EXCLUSIONS_CONFIG": str(EXCLUSIONS_CONFIG),
+        "EXCLUSIONS": "",
         "HOSTS": "",
     }
     if not CONFIG_PATH.exists():
@@ -67,62 +103,191 @@ def _resolve_host() -> str:
     return f"127.0.0.1 {hostname}.local {hostname} localhost"
 
 
-def backup(hosts_file: Path, backup_name: str) -> None:
-    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
-    old = BACKUP_DIR / f"{backup_name}.old"
-    current = BACKUP_DIR / backup_name
-    if not old.exists():
-        if current.exists():
-            current.rename(old)
-        if hosts_file.exists():
-            import shutil
+def _read(path: Path, emit: Callable[[list[str]], object]) -> int:
+    """Hand each chunk's complete lines of a fetched source to emit. Returns bytes read."""
+    total = 0
+    tail = b""
+    with path.open("rb") as f:
+        while chunk := f.read(FETCH_CHUNK):
+            total += len(chunk)
+            data = tail + chunk
+            cut = data.rfind(b"\n") + 1
+            tail = data[cut:]
+            if cut:
+                emit(data[:cut].decode("utf-8", errors="replace").splitlines())
+    if tail:
+        emit(tail.decode("utf-8", errors="replace").splitlines())
+    return total
 
-            shutil.copy2(hosts_file, current)
-            log("backup", f"Saved {hosts_file}")
 
+def _is_ip(field: str) -> bool:
+    return ":" in field or field.replace(".", "").isdigit()
+
+
+def parse_hosts_line(line: str) -> tuple[str | None, list[str]]:
+    """Split a hosts or plain domain line into its IP (None if absent) and hostnames.
+
+    Hostnames are lowercased without a trailing dot; loopback names and
+    IP addresses listed as names are dropped.
+    """
+    fields = line.partition("#")[0].lower().split()
+    ip = fields.pop(0) if len(fields) > 1 and (fields[0] in SINKS or _is_ip(fields[0])) else None
+    hostnames = []
+    for host in fields:
+        if host[-1] == ".":
+            host = host.rstrip(".")
+        # Names end in a letter TLD, so only a trailing digit or colon needs the IP check.
+        if host and host not in LOCAL_NAMES and not ((host[-1].isdigit() or ":" in host) and _is_ip(host)):
+            hostnames.append(host)
+    return ip, hostnames
+
+
+def process(
+    lines: Iterable[str],
+    seen: set[str],
+    rm_comments: bool,
+    rm_trailing: bool,
+    rm_dupes: bool,
+    sink: str = DEFAULT_SINK,
+    exclusions: Exclusions | None = None,
+    sinked: set[str] | None = None,
+) -> Iterator[str]:
+    """Normalize hosts lines to one ``sink hostname`` entry each.
+
+    Lines mapping to a sink address (or bare domains) are split per hostname,
+    dropped if not a valid domain or excluded and, with rm_dupes, deduped on
+    the hostname through seen; the hostnames kept are added to sinked. Lines
+    pointing at a real address are redirects and pass through with only their
+    excluded hostnames removed.
+    """
+    for line in lines:
+        if rm_trailing:
+            line = line.strip()
+        ip, hostnames = parse_hosts_line(line)
+        if not hostnames:
+            # Loopback-only entries are covered by _resolve_host() and LOCAL_LINES.
+            if ip is None and not rm_comments:
+                yield line
+            continue
+        if ip is not None and ip not in SINKS:
+            if rm_dupes and seen.issuperset(hostnames):
+                continue
+            seen.update(hostnames)
+            if exclusions is not None:
+                kept = [host for host in hostnames if not exclusions.excluded(host)]
+                if not kept:
+                    continue
+                if len(kept) < len(hostnames):
+                    line = f"{ip} {' '.join(kept)}"
+            yield line
+            continue
+        for host in hostnames:
+            if (rm_dupes and host in seen) or not is_valid_domain(host):
+                continue
+            seen.add(host)
+            if exclusions is not None and exclusions.excluded(host):
+                continue
+            if sinked is not None:
+                sinked.add(host)
+            yield f"{sink} {host}"
+
+
+def _parent_listed(host: str, hosts: set[str]) -> bool:
+    idx = host.find(".")
+    while idx != -1:
+        if host[idx + 1 :] in hosts:
+            return True
+        idx = host.find(".", idx + 1)
+    return False
+
+
+def collapse_subdomains(new_path: Path, hosts: set[str], sink: str = DEFAULT_SINK) -> int:
+    """Drop ``sink hostname`` entries whose parent domain is listed too. Returns entries removed.
+
+    Only for resolvers that block subdomains of a listed name (dnsmasq,
+    AdGuard Home, ...); a plain /etc/hosts matches exact names only.
+    """
+    removed = 0
+
+    def keep(line: str) -> bool:
+        nonlocal removed
+        ip, hostnames = parse_hosts_line(line)
+        if ip == sink and len(hostnames) == 1 and _parent_listed(hostnames[0], hosts):
+            removed += 1
+            return False
+        return True
+
+    if not write_lines(new_path, (line for line in iter_lines(new_path) if keep(line))):
+        die(f"Could not rewrite {new_path}")
+    return removed
+
+
+def download(
+    urls: list[str],
+    new_path: Path,
+    rm_comments: bool = True,
+    rm_trailing: bool = True,
+    rm_dupes: bool = True,
+    workers: int = FETCH_WORKERS,
+    sink: str = DEFAULT_SINK,
+    exclusions: Exclusions | None = None,
+) -> set[str]:
+    """Fetch all sources concurrently and stream processed lines into new_path.
+
+    Downloads run in parallel, but each source is parsed chunkwise and
+    deduped through one set in this thread in URL order, so the same sources
+    always produce the same file. Returns the hostnames written as sink
+    entries, which is what collapse_subdomains may collapse against.
+    """
+    from concurrent.futures import ThreadPoolExecutor
 
-def download(urls: list[str], new_path: Path) -> None:
-    if new_path.exists():
-        new_path.unlink()
     log("download", "Fetching hosts")
-    new_path.write_text(_resolve_host() + "\n", encoding="utf-8")
 
-    for n, url in enumerate(urls, 1):
-        print(f"  {n}) {url}")
+    def download_one(n: int, url: str) -> Path | None:
+        print(f"  {n}) {url}", flush=True)
         try:
-            req = urllib.request.Request(
-                url,
-                headers={
-                    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64; rv:138.0) Gecko/138.0 Firefox/138.0"
-                },
-            )
-            with (
-                urllib.request.urlopen(req, timeout=30) as resp,
-                new_path.open("ab") as fh,
-            ):
-                fh.write(resp.read())
-        except (OSError, urllib.error.URLError) as e:
+            return fetch(url)
+        except OSError as e:  # includes urllib.error.URLError
             warn(f"Failed: {url}: {e}")
+            return None
 
+    seen: set[str] = set()
+    sinked: set[str] = set()
+    size = 0
+    written = 0
+    with (
+        ThreadPoolExecutor(max_workers=max(1, min(workers, len(urls)))) as pool,
+        new_path.open("w", encoding="utf-8", newline="\n") as fh,
+    ):
 
-def process(
-    new_path: Path, rm_comments: bool, rm_trailing: bool, rm_dupes: bool
-) -> None:
-    lines = new_path.read_text(encoding="utf-8", errors="replace").splitlines()
-    if rm_trailing:
-        lines = [ln.strip() for ln in lines]
-    if rm_comments:
-        lines = [ln for ln in lines if not ln.startswith("#")]
-    if rm_dupes:
-        seen: set[str] = set()
-        deduped: list[str] = []
-        for ln in lines:
-            if ln not in seen:
-                seen.add(ln)
-                deduped.append(ln)
-        lines = deduped
-    new_path.write_text("\n".join(lines) + "\n", encoding="utf-8")
-    ok("Processed")
+        def emit(batch: list[str]) -> None:
+            nonlocal written
+            out = list(process(batch, seen, rm_comments, rm_trailing, rm_dupes, sink, exclusions, sinked))
+            if out:
+                fh.write("\n".join(out) + "\n")
+                written += len(out)
+
+        # The machine's own names go first, untouched by sink rewriting.
+        fh.write("\n".join((_resolve_host(), *LOCAL_LINES)) + "\n")
+        futures = [pool.submit(download_one, n, url) for n, url in enumerate(urls, 1)]
+        for future in futures:
+            try:
+                path = future.result()
+            except BaseException:
+                # Anything but the network errors download_one reports is a bug:
+                # stop queued downloads and let it propagate.
+                pool.shutdown(cancel_futures=True)
+                raise
+            if path is None:
+                continue
+            try:
+                size += _read(path, emit)
+            except OSError as e:
+                warn(f"Failed: {path}: {e}")
+    profiling.count("hosts.bytes", size)
+    profiling.count("hosts.lines", written)
+    ok(f"Processed {written} lines, {len(sinked)} blocked hostnames")
+    return sinked
 
 
 def check_size(new_path: Path) -> None:
@@ -132,14 +297,105 @@ def check_size(new_path: Path) -> None:
     ok(f"{new_path} ({size_mb:.1f}MB)")
 
 
-def replace(new_path: Path, hosts_file: Path) -> None:
+def _digest(path: Path) -> bytes | None:
+    try:
+        with path.open("rb") as f:
+            return hashlib.file_digest(f, "sha256").digest()
+    except OSError:
+        return None
+
+
+def _hostnames(path: Path) -> set[str]:
+    hosts: set[str] = set()
+    if path.exists():
+        for line in iter_lines(path):
+            hosts.update(parse_hosts_line(line)[1])
+    return hosts
+
+
+def summarize(old: Path, new: Path) -> tuple[list[str], list[str]]:
+    """Hostnames added and removed going from old to new, sorted."""
+    before = _hostnames(old)
+    after = _hostnames(new)
+    return sorted(after - before), sorted(before - after)
+
+
+def backup(hosts_file: Path, backup_name: str, keep: int = BACKUP_KEEP) -> Path | None:
+    """Save a gzip copy of hosts_file, keeping the newest keep copies. Returns the copy."""
+    if not hosts_file.exists():
+        return None
+    import gzip
+    import shutil
+
+    BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+    dest = BACKUP_DIR / f"{backup_name}.{datetime.now(UTC):%Y%m%dT%H%M%S%fZ}.gz"
+    with hosts_file.open("rb") as src, gzip.open(dest, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    # Timestamps sort lexically, oldest first.
+    for stale in sorted(BACKUP_DIR.glob(f"{backup_name}.*.gz"))[: -max(keep, 1)]:
+        stale.unlink()
+    log("backup", f"Saved {hosts_file} to {dest}")
+    return dest
+
+
+def _install(new_path: Path, hosts_file: Path) -> None:
+    """Copy new_path next to hosts_file and rename it into place."""
+    target_dir = hosts_file.parent
+    if os.access(target_dir, os.W_OK) and (not hosts_file.exists() or os.access(hosts_file, os.W_OK)):
+        import shutil
+        import tempfile
+
+        mode = hosts_file.stat().st_mode & 0o777 if hosts_file.exists() else 0o644
+        fd, tmp = tempfile.mkstemp(dir=target_dir, prefix=f".{hosts_file.name}.")
+        try:
+            with os.fdopen(fd, "wb") as dst, new_path.open("rb") as src:
+                shutil.copyfileobj(src, dst)
+                dst.flush()
+                os.fsync(dst.fileno())
+            os.chmod(tmp, mode)
+            os.replace(tmp, hosts_file)
+        except OSError as e:
+            Path(tmp).unlink(missing_ok=True)
+            die(f"Replace failed: {e}")
+        new_path.unlink()
+        return
+
+    import subprocess
+
     sudo = "doas" if has("doas") else "sudo"
+    tmp = f"{hosts_file}.new"
+    for cmd in (["install", "-m", "0644", str(new_path), tmp], ["mv", "-f", tmp, str(hosts_file)]):
+        if subprocess.run([sudo, *cmd], check=False).returncode != 0:
+            die("Replace failed")
+    new_path.unlink()
+
+
+def replace(new_path: Path, hosts_file: Path, backup_name: str, keep: int = BACKUP_KEEP) -> bool:
+    """Install new_path over hosts_file unless the content is unchanged. Returns True if installed.
+
+    The current file is backed up first, and the new one is renamed into
+    place from the same directory so readers never see a partial file.
+    """
+    if (
+        hosts_file.exists()
+        and hosts_file.stat().st_size == new_path.stat().st_size
+        and _digest(hosts_file) == _digest(new_path)
+    ):
+        new_path.unlink()
+        ok(f"{hosts_file} unchanged, nothing to install")
+        return False
+
+    added, removed = summarize(hosts_file, new_path)
+    backup(hosts_file, backup_name, keep)
     log("replace", f"Installing to {hosts_file}")
-    result = subprocess.run(
-        [sudo, "mv", "-f", str(new_path), str(hosts_file)], check=False
-    )
-    if result.returncode != 0:
-        die("Replace failed")
+    _install(new_path, hosts_file)
+    ok(f"Installed {hosts_file}: +{len(added)} -{len(removed)} hostnames")
+    for sign, hosts in (("+", added), ("-", removed)):
+        for host in hosts[:SUMMARY_SAMPLE]:
+            print(f"  {sign} {host}")
+        if len(hosts) > SUMMARY_SAMPLE:
+            print(f"  {sign} ... {len(hosts) - SUMMARY_SAMPLE} more")
+    return True
 
 
 def main() -> None:
@@ -147,20 +403,34 @@ def main() -> None:
     hosts_file = Path(cfg["syshosts_file"])
     new_path = Path(cfg["newhostsfn"])
     backup_name = cfg["backupfilename"]
+    try:
+        keep = int(cfg.get("BACKUP_KEEP", BACKUP_KEEP))
+    except ValueError:
+        die(f"BACKUP_KEEP is not a number: {cfg['BACKUP_KEEP']}")
     do_replace = cfg.get("replacehosts", "1") == "1"
     rm_comments = cfg.get("RM_COMMENTS", "1") == "1"
     rm_trailing = cfg.get("RM_TRAILING_SPACES", "1") == "1"
     rm_dupes = cfg.get("RM_DUPLICATE_LINES", "1") == "1"
+    sink = cfg.get("SINK_IP", DEFAULT_SINK)
+    collapse = cfg.get("COLLAPSE_SUBDOMAINS", "0") == "1"
     urls = [u for u in cfg.get("HOSTS", "").split() if u.startswith("http")]
+    if not _is_ip(sink):
+        die(f"SINK_IP is not an IP address: {sink}")
+    exclusions_config = cfg.get("EXCLUSIONS_CONFIG", "")
+    exclusions = load_exclusions(Path(exclusions_config) if exclusions_config else None, cfg["EXCLUSIONS"].split())
 
-    backup(hosts_file, backup_name)
-    download(urls, new_path)
-    process(new_path, rm_comments, rm_trailing, rm_dupes)
+    with profiling.span("hosts.download", sources=len(urls)):
+        blocked = download(urls, new_path, rm_comments, rm_trailing, rm_dupes, sink=sink, exclusions=exclusions)
+    exclusions.report()
+    if collapse:
+        with profiling.span("hosts.collapse"):
+            ok(f"Collapsed {collapse_subdomains(new_path, blocked, sink)} subdomains")
     check_size(new_path)
     if do_replace:
-        replace(new_path, hosts_file)
+        with profiling.span("hosts.replace"):
+            replace(new_path, hosts_file, backup_name, keep)
     ok("Complete")
 
 
 if __name__ == "__main__":
-    main()
+    profiling.run("hosts_creator", main)
@@ -0,0 +1,93 @@
+"""
+Resolver output formats for blocked domain sets.
+All requested formats are written from one sorted domain stream in a single pass.
+"""
+
+from collections.abc import Callable, Iterable, Sequence
+from contextlib import ExitStack
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final, TextIO
+
+SINK: Final[str] = "0.0.0.0"
+# Windows' DNS client stops parsing hosts lines after nine names.
+DEFAULT_HOSTS_PER_LINE: Final[int] = 9
+
+
+@dataclass(frozen=True, slots=True)
+class HostsFormat:
+    filename: str
+    comment: str
+    line: Callable[[str], str] | None = None
+    preamble: tuple[str, ...] = ()
+
+
+def _rpz_line(domain: str) -> str:
+    return f"{domain} CNAME .\n*.{domain} CNAME ."
+
+
+FORMATS: Final[dict[str, HostsFormat]] = {
+    "hosts": HostsFormat("hosts.txt", "#", lambda d: f"{SINK} {d}"),
+    "compressed": HostsFormat("hosts-compressed.txt", "#"),
+    "dnsmasq": HostsFormat("dnsmasq.conf", "#", lambda d: f"local=/{d}/"),
+    "unbound": HostsFormat("unbound.conf", "#", lambda d: f'local-zone: "{d}." always_null'),
+    "rpz": HostsFormat(
+        "hosts.rpz",
+        ";",
+        _rpz_line,
+        (
+            "$TTL 300",
+            "@ IN SOA localhost. root.localhost. (1 3600 600 86400 300)",
+            "  IN NS localhost.",
+        ),
+    ),
+    "adguard": HostsFormat("adguard-home.txt", "!", lambda d: f"||{d}^"),
+}
+
+
+def parse_formats(value: str) -> list[str]:
+    """Parse a comma separated format list, raising ValueError on unknown names."""
+    names = [name.strip().lower() for name in value.split(",") if name.strip()]
+    if not names:
+        raise ValueError("No hosts format given")
+    unknown = [name for name in names if name not in FORMATS]
+    if unknown:
+        raise ValueError(f"Unknown hosts format(s): {', '.join(unknown)}. Choose from: {', '.join(FORMATS)}")
+    return list(dict.fromkeys(names))
+
+
+def write_formats(
+    domains: Iterable[str],
+    out_dir: Path,
+    formats: Sequence[str],
+    header: Sequence[str] = (),
+    hosts_per_line: int = DEFAULT_HOSTS_PER_LINE,
+) -> dict[str, Path]:
+    """Stream domains once into every requested format. Returns format -> path."""
+    paths = {name: out_dir / FORMATS[name].filename for name in formats}
+    per_line = max(1, hosts_per_line)
+    with ExitStack() as stack:
+        handles: dict[str, TextIO] = {}
+        for name, path in paths.items():
+            fmt = FORMATS[name]
+            fh = stack.enter_context(path.open("w", encoding="utf-8", newline="\n"))
+            for line in header:
+                fh.write(f"{fmt.comment} {line}\n")
+            for line in fmt.preamble:
+                fh.write(line + "\n")
+            handles[name] = fh
+
+        line_writers = [(handles[name], FORMATS[name].line) for name in formats if FORMATS[name].line]
+        compressed = handles.get("compressed")
+        batch: list[str] = []
+        for domain in domains:
+            for fh, fmt_line in line_writers:
+                fh.write(fmt_line(domain) + "\n")
+            if compressed is not None:
+                batch.append(domain)
+                if len(batch) == per_line:
+                    compressed.write(f"{SINK} {' '.join(batch)}\n")
+                    batch.clear()
+        if compressed is not None and batch:
+            compressed.write(f"{SINK} {' '.join(batch)}\n")
+    return paths
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+"""
+Structural diff of two versions of a filter list.
+Both versions are parsed line by line into normalized rules (case, option
+order, domain order, whitespace and duplicates do not count as changes) and
+compared as sets, so moved or reformatted lines produce no noise. Added and
+removed rules are reported per kind (network, cosmetic, scriptlet, hostname)
+with an estimate of the hostnames newly blocked or unblocked.
+
+Large lists are streamed into hash buckets on disk and compared one bucket
+at a time, so memory is bounded by the bucket size plus the diff itself.
+Lines identical in both versions are matched as text and never parsed.
+
+Usage: python -m Scripts.listdiff OLD NEW [--limit N] [--markdown]
+       python -m Scripts.listdiff --rev REV FILE [FILE ...] [--limit N] [--markdown]
+"""
+
+import argparse
+import re
+import sys
+from collections import defaultdict
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Final
+
+_root = Path(__file__).parent.parent
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from Scripts import profiling
+from Scripts.common import err, iter_lines, log
+from Scripts.hosts_creator import SINKS, parse_hosts_line
+from Scripts.rules import COSMETIC, HOSTNAME, NETWORK, SCRIPTLET, Rule, parse_line
+
+KINDS: Final[tuple[str, ...]] = (NETWORK, COSMETIC, SCRIPTLET, HOSTNAME)
+REPORT_TOP: Final[int] = 20
+# Input bytes per bucket; smaller inputs are compared in memory.
+BUCKET_BYTES: Final[int] = 8 << 20
+
+# Modifiers whose value is a |-separated domain list, compared unordered.
+_DOMAIN_LIST_OPTIONS: Final[tuple[str, ...]] = ("domain", "from", "to", "denyallow")
+# Normalized host-level rules: ``||host^`` blocks and ``@@||host^`` exceptions.
+_HOST_RULE_RE = re.compile(r"(@@)?\|\|([a-z0-9.-]+)\^(?:\$important)?")
+
+
+def _option(opt: str) -> str:
+    name, eq, value = opt.partition("=")
+    name = name.lower()
+    if eq and name in _DOMAIN_LIST_OPTIONS:
+        value = "|".join(sorted(value.lower().split("|")))
+    return f"{name}{eq}{value}"
+
+
+def normalize(rule: Rule) -> tuple[str, str] | None:
+    """(kind, canonical text) of a rule; None for comments and empty lines."""
+    if rule.kind == HOSTNAME:
+        return HOSTNAME, rule.hostname  # type: ignore[return-value]
+    if rule.kind == NETWORK:
+        if rule.hostname is None and (" " in rule.text or "\t" in rule.text):
+            # Hosts file lines parse as patterns: "0.0.0.0 host".
+            ip, hostnames = parse_hosts_line(rule.text)
+            if ip in SINKS and len(hostnames) == 1:
+                return HOSTNAME, hostnames[0]
+        options = sorted(_option(opt) for opt in rule.options)
+        pattern = rule.pattern if "match-case" in options else rule.pattern.lower()
+        text = ("@@" if rule.exception else "") + pattern + ("$" + ",".join(options) if options else "")
+        return NETWORK, text
+    if rule.kind in (COSMETIC, SCRIPTLET):
+        return rule.kind, ",".join(sorted(rule.domains)) + rule.marker + rule.selector.strip()
+    return None
+
+
+def host_change(kind: str, text: str) -> tuple[str, bool] | None:
+    """(hostname, blocks) of a host-level rule, None for any other rule."""
+    if kind == HOSTNAME:
+        return text, True
+    m = _HOST_RULE_RE.fullmatch(text) if kind == NETWORK else None
+    return (m.group(2), m.group(1) is None) if m else None
+
+
+# ============================================================================
+# INPUT
+# ============================================================================
+
+
+def _git_lines(rev: str, path: Path) -> Iterator[str]:
+    """Lines of path at a git revision; nothing if it did not exist there."""
+    import io
+    import subprocess
+
+    with subprocess.Popen(
+        ["git", "show", f"{rev}:./{path.as_posix()}"], stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    ) as proc:
+        assert proc.stdout is not None
+        for line in io.TextIOWrapper(proc.stdout, encoding="utf-8", errors="replace"):
+            yield line.rstrip("\r\n")
+    if proc.returncode:
+        print(f"  {path} not found at {rev}; treating it as empty", file=sys.stderr)
+
+
+class _Lines:
+    """Stripped rule lines of one list version, partitioned by hash into buckets."""
+
+    def __init__(self, buckets: int, directory: Path | None, name: str) -> None:
+        self._memory: set[str] = set()
+        self._paths = [directory / f"{name}.{i}" for i in range(buckets)] if directory and buckets > 1 else []
+
+    def fill(self, lines: Iterable[str]) -> int:
+        """Store lines other than blank lines and ! comments; returns how many were read."""
+        count = 0
+        if not self._paths:
+            for raw in lines:
+                line = raw.strip()
+                if line and line[0] != "!":
+                    self._memory.add(line)
+                    count += 1
+            return count
+        n = len(self._paths)
+        files = [path.open("w", encoding="utf-8") for path in self._paths]
+        try:
+            for raw in lines:
+                line = raw.strip()
+                if line and line[0] != "!":
+                    files[hash(line) % n].write(line + "\n")
+                    count += 1
+        finally:
+            for f in files:
+                f.close()
+        return count
+
+    @property
+    def buckets(self) -> int:
+        return max(len(self._paths), 1)
+
+    def bucket(self, i: int) -> set[str]:
+        if not self._paths:
+            return self._memory
+        return set(self._paths[i].read_text(encoding="utf-8").splitlines())
+
+    def bucket_of(self, line: str) -> int:
+        return hash(line) % len(self._paths) if self._paths else 0
+
+
+# ============================================================================
+# DIFF
+# ============================================================================
+
+
+@dataclass(slots=True)
+class ListDiff:
+    old_rules: int = 0
+    new_rules: int = 0
+    added: dict[str, list[str]] = field(default_factory=lambda: defaultdict(list))
+    removed: dict[str, list[str]] = field(default_factory=lambda: defaultdict(list))
+    newly_blocked: list[str] = field(default_factory=list)
+    unblocked: list[str] = field(default_factory=list)
+
+    @property
+    def changed(self) -> bool:
+        return any(self.added.values()) or any(self.removed.values())
+
+
+def _parent_rules(host: str, itself: bool) -> Iterator[str]:
+    if itself:
+        yield host
+        yield f"||{host}^"
+    idx = host.find(".")
+    while idx != -1 and "." in host[idx + 1 :]:
+        yield f"||{host[idx + 1 :]}^"
+        idx = host.find(".", idx + 1)
+
+
+def _covered(lines: _Lines, hosts: Iterable[str], itself: bool = False) -> set[str]:
+    """Hosts a ``||parent^`` line (or, with itself, their own rule) blocks, reloading only the buckets needed."""
+    wanted: dict[int, dict[str, list[str]]] = defaultdict(lambda: defaultdict(list))
+    for host in hosts:
+        for rule in _parent_rules(host, itself):
+            wanted[lines.bucket_of(rule)][rule].append(host)
+    covered: set[str] = set()
+    for i, rules in wanted.items():
+        present = lines.bucket(i)
+        for rule, dependents in rules.items():
+            if rule in present:
+                covered.update(dependents)
+    return covered
+
+
+def _normalized(lines: Iterable[str]) -> set[str]:
+    return {"\t".join(n) for n in map(normalize, map(parse_line, lines)) if n is not None}
+
+
+def diff(old_lines: Iterable[str], new_lines: Iterable[str], size: int = 0) -> ListDiff:
+    """Diff two streams of filter lines; size (input bytes) decides whether to spill to disk.
+
+    Lines present verbatim in both versions are never parsed; only the lines
+    that differ are normalized and compared. A rule that changes form while a
+    differently written copy of it stays put is reported as changed.
+    """
+    import tempfile
+    from contextlib import nullcontext
+
+    result = ListDiff()
+    buckets = -(-size // BUCKET_BYTES)
+    with tempfile.TemporaryDirectory(prefix="listdiff-") if buckets > 1 else nullcontext() as tmp:
+        directory = Path(tmp) if tmp else None
+        old, new = _Lines(buckets, directory, "old"), _Lines(buckets, directory, "new")
+        with profiling.span("listdiff.read", buckets=old.buckets):
+            result.old_rules = old.fill(old_lines)
+            result.new_rules = new.fill(new_lines)
+
+        gained: set[str] = set()
+        lost: set[str] = set()
+        with profiling.span("listdiff.compare"):
+            for i in range(old.buckets):
+                before, after = old.bucket(i), new.bucket(i)
+                gained |= _normalized(after - before)
+                lost |= _normalized(before - after)
+
+        # Hostnames of added and removed block rules and exceptions.
+        hosts: dict[tuple[bool, bool], set[str]] = defaultdict(set)
+        for entries, target, added in ((gained - lost, result.added, True), (lost - gained, result.removed, False)):
+            for entry in entries:
+                kind, _, text = entry.partition("\t")
+                target[kind].append(text)
+                change = host_change(kind, text)
+                if change is not None:
+                    hosts[change[1], added].add(change[0])
+
+        # A block that moved between rule forms or stays covered by a parent block changes
+        # nothing; an exception only matters where a block applies.
+        blocked, lifted = hosts[True, True] - hosts[True, False], hosts[True, False] - hosts[True, True]
+        excepted, unexcepted = hosts[False, True] - hosts[False, False], hosts[False, False] - hosts[False, True]
+        with profiling.span("listdiff.impact"):
+            newly = (blocked - _covered(old, blocked)) | _covered(new, unexcepted, itself=True)
+            gone = (lifted - _covered(new, lifted)) | _covered(old, excepted, itself=True)
+        result.newly_blocked = sorted(newly)
+        result.unblocked = sorted(gone)
+    for rules in (*result.added.values(), *result.removed.values()):
+        rules.sort()
+    return result
+
+
+# ============================================================================
+# REPORT
+# ============================================================================
+
+
+def _report(name: str, d: ListDiff, limit: int | None) -> Iterator[str]:
+    yield f"[listdiff] {name}: {d.old_rules} -> {d.new_rules} rule lines"
+    for kind in KINDS:
+        added, removed = d.added.get(kind, []), d.removed.get(kind, [])
+        if not added and not removed:
+            continue
+        yield f"  {kind:<10} +{len(added):<8} -{len(removed)}"
+        yield from (f"    + {text}" for text in added[:limit])
+        yield from (f"    - {text}" for text in removed[:limit])
+    yield f"  Impact: {len(d.newly_blocked)} hostnames newly blocked, {len(d.unblocked)} unblocked"
+    yield from (f"    + {host}" for host in d.newly_blocked[:limit])
+    yield from (f"    - {host}" for host in d.unblocked[:limit])
+
+
+def _markdown(name: str, d: ListDiff, limit: int | None) -> Iterator[str]:
+    yield f"### `{name}`"
+    yield ""
+    yield "| Kind | Added | Removed |"
+    yield "| --- | ---: | ---: |"
+    for kind in KINDS:
+        yield f"| {kind} | {len(d.added.get(kind, []))} | {len(d.removed.get(kind, []))} |"
+    yield ""
+    yield f"Hostnames newly blocked: **{len(d.newly_blocked)}**, unblocked: **{len(d.unblocked)}**"
+    samples = [f"+ {h}" for h in d.newly_blocked[:limit]] + [f"- {h}" for h in d.unblocked[:limit]]
+    if samples:
+        yield ""
+        yield "```diff"
+        yield from samples
+        yield "```"
+    yield ""
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Rules and hostnames added or removed between two list versions")
+    parser.add_argument("paths", type=Path, nargs="+", help="OLD NEW, or the files to compare against --rev")
+    parser.add_argument("--rev", help="Compare each file with its version at this git revision")
+    parser.add_argument("--limit", type=int, default=REPORT_TOP, help="Rules shown per kind and direction (0: all)")
+    parser.add_argument("--markdown", action="store_true", help="Print a Markdown summary (for CI)")
+    args = parser.parse_args()
+
+    if args.rev is None and len(args.paths) != 2:
+        parser.error("expected OLD and NEW, or --rev REV with one or more files")
+    missing = [path for path in args.paths if not path.is_file()]
+    if missing:
+        err(f"Not found: {', '.join(map(str, missing))}")
+        return 1
+
+    if args.rev is None:
+        old_path, new_path = args.paths
+        pairs = [(f"{old_path} -> {new_path}", lambda: iter_lines(old_path), new_path, old_path.stat().st_size)]
+    else:
+        pairs = [
+            (str(path), lambda path=path: _git_lines(args.rev, path), path, 2 * path.stat().st_size)
+            for path in args.paths
+        ]
+
+    if args.markdown:
+        print(f"## List changes{f' since {args.rev}' if args.rev else ''}\n")
+    changed = 0
+    for name, old_lines, new_path, size in pairs:
+        try:
+            with profiling.span("listdiff.diff", list=name):
+                d = diff(old_lines(), iter_lines(new_path), size + new_path.stat().st_size)
+        except (OSError, UnicodeError) as e:
+            err(f"Could not diff {name}: {e}")
+            return 1
+        if args.rev is not None and not d.changed:
+            if not args.markdown:
+                log("listdiff", f"{name}: no rule changes")
+            continue
+        changed += 1
+        for line in (_markdown if args.markdown else _report)(name, d, args.limit or None):
+            print(line)
+    if args.markdown and not changed:
+        print("No rule changes.")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(profiling.run("listdiff", main))
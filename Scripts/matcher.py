@@ -0,0 +1,635 @@
+#!/usr/bin/env python3
+"""
+Network filter matching for the adblock lists.
+Block and ``@@`` exception rules are compiled into reverse indexes keyed by
+one token of each pattern, as uBlock Origin and adblock-rust do, so a request
+is only tested against the rules sharing one of its URL tokens. Supports
+``$domain``/``$from`` (entities and ``~`` negations), ``$denyallow``,
+``$third-party``, ``$method``, resource types, ``$important``,
+``$match-case``, ``$badfilter`` and page-wide ``@@...$document`` exceptions.
+Rules with other modifiers are skipped and counted.
+
+Usage: python -m Scripts.matcher CORPUS.jsonl [--list FILE ...] [--output FILE]
+The corpus holds one {"url", "source", "type"[, "method"]} object per line.
+"""
+
+import argparse
+import re
+import sys
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Final
+
+_root = Path(__file__).parent.parent
+if str(_root) not in sys.path:
+    sys.path.insert(0, str(_root))
+
+from Scripts import profiling
+from Scripts.common import err, iter_lines, log, ok, write_lines
+from Scripts.rules import HOSTNAME, NETWORK, Rule, parse_file
+
+DEFAULT_LISTS: Final[tuple[Path, ...]] = (Path("lists/releases/adblock.txt"),)
+REPORT_TOP: Final[int] = 20
+
+BLOCKED: Final[str] = "blocked"
+ALLOWED: Final[str] = "allowed"
+
+# Request type names (rule options, corpus and browser names) -> type.
+TYPE_ALIASES: Final[dict[str, str]] = {
+    "script": "script",
+    "image": "image",
+    "img": "image",
+    "imageset": "image",
+    "stylesheet": "stylesheet",
+    "css": "stylesheet",
+    "object": "object",
+    "object-subrequest": "object",
+    "xmlhttprequest": "xmlhttprequest",
+    "xhr": "xmlhttprequest",
+    "fetch": "xmlhttprequest",
+    "subdocument": "subdocument",
+    "frame": "subdocument",
+    "sub_frame": "subdocument",
+    "document": "document",
+    "doc": "document",
+    "main_frame": "document",
+    "ping": "ping",
+    "beacon": "ping",
+    "websocket": "websocket",
+    "font": "font",
+    "media": "media",
+    "popup": "popup",
+    "other": "other",
+}
+_TYPE_BITS: Final[dict[str, int]] = {t: 1 << n for n, t in enumerate(dict.fromkeys(TYPE_ALIASES.values()))}
+_ALL_TYPES: Final[int] = sum(_TYPE_BITS.values())
+# A rule without type options applies to every type but these.
+_DEFAULT_TYPES: Final[int] = _ALL_TYPES & ~(_TYPE_BITS["document"] | _TYPE_BITS["popup"])
+_DOCUMENT: Final[int] = _TYPE_BITS["document"]
+
+# Modifiers that change what a matched request gets rather than whether it matches.
+_NEUTRAL_OPTIONS: Final[frozenset[str]] = frozenset({"redirect", "rewrite", "empty", "mp4", "1x1", "noop"})
+# Second-level labels under two-letter TLDs treated as part of the public suffix.
+_SECOND_LEVEL: Final[frozenset[str]] = frozenset({"ac", "co", "com", "edu", "go", "gov", "ne", "net", "or", "org"})
+# Tokens too common to narrow a rule down; used only when nothing better exists.
+_WEAK_TOKENS: Final[frozenset[str]] = frozenset(
+    {"http", "https", "www", "com", "net", "org", "js", "html", "php", "png", "jpg", "gif", "css"}
+)
+
+_TOKEN_RE = re.compile(r"[a-z0-9%]+")
+_SEPARATOR: Final[str] = r"(?:[^\w.%-]|$)"
+_HOST_ANCHOR: Final[str] = r"^[a-z][a-z0-9+.-]*://(?:[^/?#]*\.)?"
+
+
+# ============================================================================
+# REQUESTS
+# ============================================================================
+
+
+def url_host(url: str) -> str:
+    """Lowercase hostname of a URL; a bare hostname is returned as is."""
+    start = url.find("://")
+    start = 0 if start == -1 else start + 3
+    end = len(url)
+    for ch in "/?#":
+        idx = url.find(ch, start, end)
+        if idx != -1:
+            end = idx
+    host = url[start:end].rpartition("@")[2]
+    if host.startswith("["):
+        return host[1 : host.find("]")].lower()
+    return host.partition(":")[0].rstrip(".").lower()
+
+
+def base_domain(host: str) -> str:
+    """Registrable domain of host, by a two-letter-TLD heuristic rather than the public suffix list."""
+    labels = host.rsplit(".", 3)
+    if labels[-1].isdigit() or ":" in host:
+        return host
+    if len(labels) >= 3 and len(labels[-1]) == 2 and labels[-2] in _SECOND_LEVEL:
+        return ".".join(labels[-3:])
+    return ".".join(labels[-2:])
+
+
+def host_keys(host: str) -> tuple[str, ...]:
+    """host, its parent domains and its ``name.*`` entity, most specific first."""
+    keys = [host]
+    idx = host.find(".")
+    while idx != -1:
+        keys.append(host[idx + 1 :])
+        idx = host.find(".", idx + 1)
+    base = base_domain(host)
+    if "." in base and ":" not in base and not base[-1].isdigit():
+        keys.append(base.partition(".")[0] + ".*")
+    return tuple(keys)
+
+
+@dataclass(slots=True)
+class Request:
+    url: str
+    source: str = ""
+    type: str = "other"
+    method: str = "get"
+    lower: str = field(init=False)
+    host: str = field(init=False)
+    host_keys: tuple[str, ...] = field(init=False)
+    source_keys: tuple[str, ...] = field(init=False)
+    third_party: bool = field(init=False)
+    type_bit: int = field(init=False)
+    tokens: list[str] = field(init=False)
+
+    def __post_init__(self) -> None:
+        self.lower = self.url.lower()
+        self.host = url_host(self.url)
+        self.host_keys = host_keys(self.host)
+        source_host = url_host(self.source) if self.source else ""
+        self.source_keys = host_keys(source_host) if source_host else ()
+        self.third_party = bool(source_host) and base_domain(source_host) != base_domain(self.host)
+        self.type_bit = _TYPE_BITS[TYPE_ALIASES.get(self.type.lower(), "other")]
+        self.method = self.method.lower()
+        self.tokens = list(dict.fromkeys(_TOKEN_RE.findall(self.lower)))
+
+    def page(self) -> "Request":
+        """The document request of the page that made this request."""
+        return Request(self.source, self.source, "document")
+
+
+# ============================================================================
+# FILTERS
+# ============================================================================
+
+
+def _pattern_regex(pattern: str, match_case: bool) -> re.Pattern:
+    """Translate an adblock pattern (``||``, ``|``, ``*``, ``^``) into a regex."""
+    flags = 0 if match_case else re.IGNORECASE
+    if len(pattern) > 2 and pattern[0] == "/" and pattern[-1] == "/":
+        return re.compile(pattern[1:-1], flags)
+    prefix = suffix = ""
+    if pattern.startswith("||"):
+        prefix, pattern = _HOST_ANCHOR, pattern[2:]
+    elif pattern.startswith("|"):
+        prefix, pattern = "^", pattern[1:]
+    if pattern.endswith("|"):
+        suffix, pattern = "$", pattern[:-1]
+    parts = []
+    for ch in pattern:
+        parts.append(".*" if ch == "*" else _SEPARATOR if ch == "^" else re.escape(ch))
+    return re.compile(prefix + "".join(parts) + suffix, flags)
+
+
+def _pattern_tokens(pattern: str) -> list[str]:
+    """Tokens of pattern that any matching URL contains as whole tokens, weak ones last."""
+    if len(pattern) > 2 and pattern[0] == "/" and pattern[-1] == "/":
+        return []
+    text = pattern.lower()
+    strong: list[str] = []
+    weak: list[str] = []
+    for m in _TOKEN_RE.finditer(text):
+        start, end = m.span()
+        # Unanchored ends or wildcards mean the URL token may be longer.
+        if start == 0 or end == len(text) or text[start - 1] == "*" or text[end] == "*":
+            continue
+        token = m.group(0)
+        (weak if token in _WEAK_TOKENS else strong).append(token)
+    return strong or weak
+
+
+def _split_domains(value: str) -> tuple[frozenset[str], frozenset[str]]:
+    include: set[str] = set()
+    exclude: set[str] = set()
+    for domain in value.lower().split("|"):
+        if domain.startswith("~"):
+            exclude.add(domain[1:])
+        elif domain:
+            include.add(domain)
+    return frozenset(include), frozenset(exclude)
+
+
+@dataclass(slots=True, eq=False)
+class NetworkFilter:
+    text: str
+    origin: str
+    pattern: str
+    exception: bool = False
+    important: bool = False
+    match_case: bool = False
+    types: int = _DEFAULT_TYPES
+    # None: either party; True: third-party only; False: first-party only.
+    third_party: bool | None = None
+    domains: frozenset[str] = frozenset()
+    not_domains: frozenset[str] = frozenset()
+    denyallow: frozenset[str] = frozenset()
+    methods: frozenset[str] = frozenset()
+    not_methods: frozenset[str] = frozenset()
+    # ``||host^`` patterns match on the hostname alone.
+    hostname: str | None = None
+    needle: str | None = None
+    regex: re.Pattern | None = None
+
+    def _source_ok(self, request: Request) -> bool:
+        # The most specific listed source domain decides.
+        for key in request.source_keys:
+            if key in self.not_domains:
+                return False
+            if key in self.domains:
+                return True
+        return not self.domains
+
+    def matches(self, request: Request) -> bool:
+        if not self.types & request.type_bit:
+            return False
+        if self.third_party is not None and self.third_party != request.third_party:
+            return False
+        if (self.domains or self.not_domains) and not self._source_ok(request):
+            return False
+        if (self.methods and request.method not in self.methods) or request.method in self.not_methods:
+            return False
+        if self.denyallow and not self.denyallow.isdisjoint(request.host_keys):
+            return False
+        if self.hostname is not None:
+            host = request.host
+            return host == self.hostname or (host.endswith(self.hostname) and host[-len(self.hostname) - 1] == ".")
+        url = request.url if self.match_case else request.lower
+        if self.needle is not None:
+            return self.needle in url
+        if self.regex is None:
+            self.regex = _pattern_regex(self.pattern, self.match_case)
+        return self.regex.search(url) is not None
+
+
+def _signature(rule: Rule, drop: str = "") -> str:
+    """Rule text without one modifier, for ``$badfilter`` lookups."""
+    options = [opt for opt in rule.options if opt.lower() != drop]
+    text = ("@@" if rule.exception else "") + rule.pattern
+    return f"{text}${','.join(options)}" if options else text
+
+
+def compile_filter(rule: Rule, origin: str = "") -> NetworkFilter | str:
+    """Compile a network or hostname rule; returns the unsupported modifier instead when there is one."""
+    if rule.kind == HOSTNAME:
+        return NetworkFilter(rule.text, origin, f"||{rule.hostname}^", types=_ALL_TYPES, hostname=rule.hostname)
+    f = NetworkFilter(rule.text, origin, rule.pattern, rule.exception)
+    types = 0
+    not_types = 0
+    for opt in rule.options:
+        negated = opt.startswith("~")
+        name, _, value = opt.lstrip("~").partition("=")
+        name = name.lower()
+        if name in TYPE_ALIASES:
+            bit = _TYPE_BITS[TYPE_ALIASES[name]]
+            if negated:
+                not_types |= bit
+            else:
+                types |= bit
+        elif name == "all":
+            types |= _ALL_TYPES
+        elif name in ("third-party", "3p"):
+            f.third_party = not negated
+        elif name in ("first-party", "1p"):
+            f.third_party = negated
+        elif name in ("domain", "from"):
+            f.domains, f.not_domains = _split_domains(value)
+        elif name == "denyallow":
+            f.denyallow = _split_domains(value)[0]
+        elif name == "method":
+            f.methods, f.not_methods = _split_domains(value)
+        elif name == "important":
+            f.important = True
+        elif name == "match-case":
+            f.match_case = True
+        elif name not in _NEUTRAL_OPTIONS:
+            return name
+    pattern = f.pattern
+    if rule.hostname and pattern in (f"||{rule.hostname}^", f"||{rule.hostname}^|"):
+        f.hostname = rule.hostname
+    if types:
+        f.types = types
+    elif f.hostname is not None and not rule.exception:
+        # uBO blocks whole pages on pure hostname rules (strict blocking).
+        f.types = _ALL_TYPES & ~_TYPE_BITS["popup"]
+    f.types &= ~not_types
+    regex_rule = len(pattern) > 2 and pattern[0] == "/" == pattern[-1]
+    if f.hostname is None and not regex_rule and not any(c in pattern for c in "|^"):
+        needle = pattern.strip("*")
+        if "*" not in needle:
+            f.needle = needle if f.match_case else needle.lower()
+    return f
+
+
+class _Index:
+    """Filters bucketed by their pattern token; untokenizable ones are always tried."""
+
+    __slots__ = ("_buckets", "_fallback", "size")
+
+    def __init__(self) -> None:
+        self._buckets: dict[str, list[NetworkFilter]] = {}
+        self._fallback: list[NetworkFilter] = []
+        self.size = 0
+
+    def add(self, f: NetworkFilter) -> None:
+        tokens = _pattern_tokens(f.pattern)
+        if tokens:
+            # The least used token keeps buckets short, as adblock-rust does.
+            buckets = self._buckets
+            token = min(tokens, key=lambda t: (len(buckets.get(t, ())), -len(t)))
+            buckets.setdefault(token, []).append(f)
+        else:
+            self._fallback.append(f)
+        self.size += 1
+
+    def __iter__(self) -> Iterator[NetworkFilter]:
+        for bucket in self._buckets.values():
+            yield from bucket
+        yield from self._fallback
+
+    def first(self, request: Request) -> NetworkFilter | None:
+        buckets = self._buckets
+        for token in request.tokens:
+            bucket = buckets.get(token)
+            if bucket is not None:
+                for f in bucket:
+                    if f.matches(request):
+                        return f
+        for f in self._fallback:
+            if f.matches(request):
+                return f
+        return None
+
+    def all(self, request: Request) -> Iterator[NetworkFilter]:
+        buckets = self._buckets
+        for token in request.tokens:
+            for f in buckets.get(token, ()):
+                if f.matches(request):
+                    yield f
+        for f in self._fallback:
+            if f.matches(request):
+                yield f
+
+
+@dataclass(frozen=True, slots=True)
+class Verdict:
+    result: str
+    rule: NetworkFilter
+    exception: NetworkFilter | None = None
+
+
+class Matcher:
+    """Decides whether requests are blocked, and by which rules."""
+
+    def __init__(self) -> None:
+        self.important = _Index()
+        self.blocks = _Index()
+        self.exceptions = _Index()
+        # ``@@...$document`` rules, applied to the page a request comes from.
+        self.page_exceptions = _Index()
+        # Unsupported modifier -> rules skipped for it.
+        self.skipped: Counter[str] = Counter()
+        self.duplicates = 0
+        self.badfiltered = 0
+
+    def __len__(self) -> int:
+        return self.important.size + self.blocks.size + self.exceptions.size + self.page_exceptions.size
+
+    def __iter__(self) -> Iterator[NetworkFilter]:
+        for index in (self.important, self.blocks, self.exceptions, self.page_exceptions):
+            yield from index
+
+    @classmethod
+    def from_rules(cls, rules: Iterable[tuple[Rule, str]]) -> "Matcher":
+        """Build from (rule, origin) pairs; rules other than network and hostname are ignored."""
+        matcher = cls()
+        # Keyed by signature; a rule listed again (merged lists overlap) keeps its first origin.
+        pending: dict[str, NetworkFilter] = {}
+        badfilters: set[str] = set()
+        for rule, origin in rules:
+            if rule.kind == HOSTNAME:
+                signature = f"||{rule.hostname}^"
+            elif rule.kind == NETWORK:
+                if any(opt.lower() == "badfilter" for opt in rule.options):
+                    badfilters.add(_signature(rule, "badfilter"))
+                    continue
+                signature = _signature(rule)
+            else:
+                continue
+            if signature in pending:
+                matcher.duplicates += 1
+                continue
+            compiled = compile_filter(rule, origin)
+            if isinstance(compiled, str):
+                matcher.skipped[compiled] += 1
+                continue
+            pending[signature] = compiled
+        for signature, f in pending.items():
+            if signature in badfilters:
+                matcher.badfiltered += 1
+            else:
+                matcher.add(f)
+        return matcher
+
+    def add(self, f: NetworkFilter) -> None:
+        if not f.exception:
+            (self.important if f.important else self.blocks).add(f)
+        elif f.types == _DOCUMENT:
+            self.page_exceptions.add(f)
+        else:
+            self.exceptions.add(f)
+
+    def _pages(self, request: Request) -> Iterator[Request]:
+        """Document requests that $document exceptions are checked against: the request itself and its page."""
+        if not self.page_exceptions.size:
+            return
+        if request.type_bit == _DOCUMENT:
+            yield request
+        if request.source:
+            yield request.page()
+
+    def exception_for(self, request: Request) -> NetworkFilter | None:
+        exception = self.exceptions.first(request)
+        pages = self._pages(request)
+        while exception is None and (page := next(pages, None)) is not None:
+            exception = self.page_exceptions.first(page)
+        return exception
+
+    def _all_exceptions(self, request: Request) -> Iterator[NetworkFilter]:
+        yield from self.exceptions.all(request)
+        for page in self._pages(request):
+            yield from self.page_exceptions.all(page)
+
+    def important_exception_for(self, request: Request) -> NetworkFilter | None:
+        """The ``@@...$important`` exception for request; only these override $important blocks."""
+        return next((f for f in self._all_exceptions(request) if f.important), None)
+
+    def match(self, request: Request) -> Verdict | None:
+        """Blocked or allowed verdict with its rules, or None when no block rule matches."""
+        rule = self.important.first(request)
+        if rule is not None:
+            exception = self.important_exception_for(request)
+        else:
+            rule = self.blocks.first(request)
+            if rule is None:
+                return None
+            exception = self.exception_for(request)
+        return Verdict(BLOCKED, rule) if exception is None else Verdict(ALLOWED, rule, exception)
+
+    def matching(self, request: Request) -> Iterator[NetworkFilter]:
+        """Every block rule matching request, plus every exception overriding one."""
+        important = False
+        for rule in self.important.all(request):
+            important = True
+            yield rule
+        overridable = False
+        for rule in self.blocks.all(request):
+            overridable = True
+            yield rule
+        if overridable:
+            yield from self._all_exceptions(request)
+        elif important:
+            yield from (f for f in self._all_exceptions(request) if f.important)
+
+
+def load_matcher(paths: Iterable[Path]) -> Matcher:
+    """Build a Matcher from filter list files. Raises OSError or UnicodeError."""
+
+    def rules() -> Iterator[tuple[Rule, str]]:
+        for path in paths:
+            for lineno, rule in enumerate(parse_file(path), 1):
+                yield rule, f"{path.name}:{lineno}"
+
+    return Matcher.from_rules(rules())
+
+
+# ============================================================================
+# CORPUS EVALUATION
+# ============================================================================
+
+
+def iter_corpus_fields(path: Path) -> Iterator[tuple[str, str, str, str] | None]:
+    """Stream (url, source, type, method) from a JSONL corpus; unusable lines yield None."""
+    import json
+
+    for line in iter_lines(path, skip_empty=True):
+        try:
+            entry = json.loads(line)
+            url = entry["url"]
+            source = entry.get("source") or entry.get("frameUrl") or entry.get("sourceUrl") or ""
+            kind = entry.get("type") or entry.get("cpt") or "other"
+            fields = (url, source, kind, entry.get("method") or "get")
+        except (ValueError, KeyError, TypeError, AttributeError):
+            yield None
+            continue
+        yield fields if all(isinstance(value, str) for value in fields) else None
+
+
+def iter_corpus(path: Path) -> Iterator[Request | None]:
+    """Stream requests from a JSONL corpus; unusable lines yield None."""
+    for fields in iter_corpus_fields(path):
+        yield Request(*fields) if fields is not None else None
+
+
+@dataclass(slots=True)
+class Report:
+    requests: int = 0
+    blocked: int = 0
+    allowed: int = 0
+    invalid: int = 0
+    block_hits: Counter[str] = field(default_factory=Counter)
+    exception_hits: Counter[str] = field(default_factory=Counter)
+
+
+def _describe(f: NetworkFilter) -> str:
+    return f"{f.text}  ({f.origin})" if f.origin else f.text
+
+
+def evaluate(matcher: Matcher, requests: Iterable[Request | None], details: list[str] | None = None) -> Report:
+    """Match every request, counting verdicts and rule hits.
+
+    When details is given, one JSON line per blocked or allowed request is
+    appended to it.
+    """
+    import json
+
+    report = Report()
+    match = matcher.match
+    for request in requests:
+        if request is None:
+            report.invalid += 1
+            continue
+        report.requests += 1
+        verdict = match(request)
+        if verdict is None:
+            continue
+        rule = _describe(verdict.rule)
+        if verdict.exception is None:
+            report.blocked += 1
+            report.block_hits[rule] += 1
+        else:
+            report.allowed += 1
+            report.exception_hits[_describe(verdict.exception)] += 1
+        if details is not None:
+            entry = {"url": request.url, "source": request.source, "type": request.type, "result": verdict.result}
+            entry["rule"] = verdict.rule.text
+            entry["origin"] = verdict.rule.origin
+            if verdict.exception is not None:
+                entry["exception"] = verdict.exception.text
+                entry["exception_origin"] = verdict.exception.origin
+            details.append(json.dumps(entry, ensure_ascii=False))
+    return report
+
+
+def print_report(report: Report, top: int = REPORT_TOP) -> None:
+    unmatched = report.requests - report.blocked - report.allowed
+    summary = f"{report.blocked} blocked, {report.allowed} allowed, {unmatched} unmatched"
+    log("matcher", f"{report.requests} requests: {summary}")
+    if report.invalid:
+        print(f"  Skipped {report.invalid} unreadable corpus lines", file=sys.stderr)
+    for title, hits in (("Blocking rules", report.block_hits), ("Overriding exceptions", report.exception_hits)):
+        if hits:
+            print(f"\n{title}:")
+            for rule, n in hits.most_common(top):
+                print(f"  {n:>8}  {rule}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Evaluate adblock lists against a JSONL request corpus")
+    parser.add_argument("corpus", type=Path, help="JSONL file of {url, source, type[, method]} requests")
+    parser.add_argument("-l", "--list", dest="lists", type=Path, action="append", help="Filter list (repeatable)")
+    parser.add_argument("-o", "--output", type=Path, help="Write per-request verdicts (JSONL)")
+    parser.add_argument("--top", type=int, default=REPORT_TOP, help="Rules listed per section")
+    args = parser.parse_args()
+
+    lists: list[Path] = args.lists or list(DEFAULT_LISTS)
+    missing = [path for path in [*lists, args.corpus] if not path.is_file()]
+    if missing:
+        err(f"Not found: {', '.join(map(str, missing))}")
+        return 1
+
+    try:
+        with profiling.span("matcher.load", lists=len(lists)):
+            matcher = load_matcher(lists)
+    except (OSError, UnicodeError) as e:
+        err(f"Could not read filter lists: {e}")
+        return 1
+    log("matcher", f"Indexed {len(matcher)} network rules from {len(lists)} lists")
+    if matcher.skipped:
+        skipped = ", ".join(f"{name} ({n})" for name, n in matcher.skipped.most_common())
+        print(f"  Skipped rules with unsupported modifiers: {skipped}", file=sys.stderr)
+
+    details: list[str] | None = [] if args.output else None
+    with profiling.span("matcher.evaluate"):
+        report = evaluate(matcher, iter_corpus(args.corpus), details)
+    profiling.count("matcher.requests", report.requests)
+    profiling.count("matcher.blocked", report.blocked)
+    profiling.count("matcher.allowed", report.allowed)
+    print_report(report, args.top)
+
+    if args.output and details is not None:
+        if not write_lines(args.output, details):
+            return 1
+        ok(f"Wrote {len(details)} verdicts to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(profiling.run("matcher", main))
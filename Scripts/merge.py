@@ -0,0 +1,87 @@
+"""
+Streaming merge of filter sources.
+Each source is sorted and deduplicated on its own (cached by content hash),
+then all sources are k-way merged so memory tracks the number of sources.
+"""
+
+import hashlib
+import heapq
+import os
+import tempfile
+from collections.abc import Callable, Iterable, Iterator
+from pathlib import Path
+from typing import Final
+
+from Scripts.common import CACHE_DIR, iter_lines
+
+# Bump when the meaning of a cached sorted file changes (e.g. the line filter).
+CACHE_VERSION: Final[str] = "1"
+SORTED_CACHE: Final[Path] = CACHE_DIR / "sorted"
+
+
+def file_digest(path: Path) -> str:
+    """SHA-256 hex digest of a file's content."""
+    with path.open("rb") as f:
+        return hashlib.file_digest(f, "sha256").hexdigest()
+
+
+def iter_file(path: Path) -> Iterator[str]:
+    """Yield lines of a file without trailing newlines."""
+    return iter_lines(path)
+
+
+def sorted_source(
+    path: Path,
+    keep: Callable[[str], bool],
+    tag: str = "",
+    cache_dir: Path = SORTED_CACHE,
+) -> Path:
+    """Return a cached file holding the sorted, unique lines of path accepted by keep.
+
+    ``tag`` identifies the filter so different callers do not share entries.
+    Entries are named after a hash of the full path, so sources with the same
+    name in different directories do not evict each other.
+    """
+    key = hashlib.sha256(f"{CACHE_VERSION}:{tag}:{file_digest(path)}".encode()).hexdigest()[:16]
+    where = hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:8]
+    prefix = f"{path.stem}.{where}.{tag}" if tag else f"{path.stem}.{where}"
+    cached = cache_dir / f"{prefix}-{key}.txt"
+    if cached.exists():
+        return cached
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    rules = sorted({line for line in iter_file(path) if keep(line)})
+    fd, temp_path = tempfile.mkstemp(dir=cache_dir, text=True)
+    try:
+        with open(fd, "w", encoding="utf-8", newline="\n") as f:
+            f.writelines(f"{rule}\n" for rule in rules)
+        os.replace(temp_path, cached)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+    # Drop entries for older versions of the same source.
+    for stale in cache_dir.glob(f"{prefix}-*.txt"):
+        if stale != cached and stale.stem.rsplit("-", 1)[0] == prefix:
+            stale.unlink(missing_ok=True)
+    return cached
+
+
+def merge_unique(sources: Iterable[Iterable[str]]) -> Iterator[str]:
+    """K-way merge sorted iterables, dropping adjacent duplicates."""
+    previous: str | None = None
+    for line in heapq.merge(*sources):
+        if line != previous:
+            yield line
+            previous = line
+
+
+def merge_files(
+    paths: Iterable[Path],
+    keep: Callable[[str], bool],
+    tag: str = "",
+    cache_dir: Path = SORTED_CACHE,
+) -> Iterator[str]:
+    """Sorted, deduplicated union of the lines of paths accepted by keep."""
+    sorted_paths = [sorted_source(path, keep, tag, cache_dir) for path in paths]
+    return merge_unique(iter_file(path) for path in sorted_paths)
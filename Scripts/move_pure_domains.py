@@ -4,67 +4,90 @@ Move pure domain entries from adblock lists to hostlist files.
 Pure domains are entries without AdGuard filter syntax (||, ##, $, @@, etc.)
 """
 
-import re
 import sys
 from collections import defaultdict
+from collections.abc import Iterator
+from functools import cache
 from pathlib import Path
 
-from Scripts.common import is_valid_domain, read_lines, write_lines
+from Scripts import profiling
+from Scripts.categorize import Categorizer, load_categorizer
+from Scripts.common import is_valid_domain, iter_lines, ncpu, write_lines
+from Scripts.domain_index import INDEX_CACHE, DomainIndex
 
 
 def is_pure_domain(line: str) -> bool:
     """Check if a line is a pure domain without AdGuard syntax"""
-    line = line.strip()
+    # Same as parse_line(line).kind == HOSTNAME: a valid domain contains none
+    # of the comment, cosmetic or exception markers the parser checks first.
+    return is_valid_domain(line.strip())
 
-    if not line or line.startswith(
-        ("!", "#", "[", ";", "|", "@", "$", "^", "*", "]", "~")
-    ):
-        return False
 
-    return is_valid_domain(line)
-
-
-# Compiled regex patterns for domain categorization
-ADS_PATTERN = re.compile(r"ad|ads|analytics|tracking|telemetry|metric")
-SOCIAL_PATTERN = re.compile(r"social|facebook|twitter|instagram")
+@cache
+def _categorizer() -> Categorizer:
+    return load_categorizer()
 
 
 def get_file_category(source_file: str) -> str | None:
     """Get category based on source file name, if any"""
-    source_lower = source_file.lower()
-    if "spotify" in source_lower:
-        return "Spotify.txt"
-    elif (
-        "youtube" in source_lower
-        or "twitch" in source_lower
-        or "reddit" in source_lower
-        or "twitter" in source_lower
-    ):
-        return "Social-Media.txt"
-    elif "game" in source_lower:
-        return "Games.txt"
-    return None
+    return _categorizer().for_source(source_file)
 
 
 def categorize_domain(domain: str, source_file: str) -> str:
     """Determine which hostlist category a domain belongs to"""
+    return _categorizer().categorize(domain, source_file)
+
 
-    file_category = get_file_category(source_file)
-    if file_category:
-        return file_category
+# Below this total size, worker start-up costs more than classification saves.
+PARALLEL_MIN_BYTES = 4 * 1024 * 1024
 
-    domain_lower = domain.lower()
-    if ADS_PATTERN.search(domain_lower):
-        return "Ads.txt"
-    elif SOCIAL_PATTERN.search(domain_lower):
-        return "Social-Media.txt"
-    else:
-        return "Other.txt"
 
+def classify_file(adblock_file: Path) -> tuple[list[str], list[str]]:
+    """Split a file into pure domains and the remaining lines.
 
-def scan_adblock_files(adblock_dir: Path) -> tuple[dict, dict]:
+    Runs in worker processes; the remaining lines are only returned when
+    there are pure domains to move, since the file is left alone otherwise.
+    """
+    pure_domains = []
+    filter_rules = []
+    for line in iter_lines(adblock_file):
+        if is_pure_domain(line):
+            pure_domains.append(line.strip())
+        else:
+            filter_rules.append(line)
+    return pure_domains, filter_rules if pure_domains else []
+
+
+def _classify_all(
+    files: list[Path], workers: int | None
+) -> Iterator[tuple[Path, tuple[list[str], list[str]] | OSError]]:
+    if workers is None:
+        total = sum(f.stat().st_size for f in files)
+        workers = min(ncpu(), len(files)) if total >= PARALLEL_MIN_BYTES else 1
+    if workers <= 1 or len(files) <= 1:
+        for adblock_file in files:
+            try:
+                yield adblock_file, classify_file(adblock_file)
+            except OSError as e:
+                yield adblock_file, e
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [pool.submit(classify_file, f) for f in files]
+        for adblock_file, future in zip(files, futures):
+            try:
+                yield adblock_file, future.result()
+            except OSError as e:
+                yield adblock_file, e
+
+
+def scan_adblock_files(adblock_dir: Path, workers: int | None = None) -> tuple[dict, dict]:
     """
     Scan adblock files, identify pure domains.
+    Files are classified in worker processes when there is enough data;
+    workers=1 forces a single process.
     Returns:
         domain_moves: dict[target_hostlist_file][source_file] -> list[domains]
         file_updates: dict[filepath] -> list[str] (new content for source file)
@@ -75,21 +98,12 @@ def scan_adblock_files(adblock_dir: Path) -> tuple[dict, dict]:
     file_updates = {}
 
     # sorted glob for consistent order
-    for adblock_file in sorted(adblock_dir.glob("*.txt")):
+    for adblock_file, result in _classify_all(sorted(adblock_dir.glob("*.txt")), workers):
         print(f"Scanning: {adblock_file.name}")
-        pure_domains = []
-        filter_rules = []
-
-        try:
-            content = adblock_file.read_text(encoding="utf-8")
-            for line in content.splitlines():
-                if is_pure_domain(line):
-                    pure_domains.append(line.strip())
-                else:
-                    filter_rules.append(line)
-        except OSError as e:
-            print(f"  Error reading: {e}", file=sys.stderr)
+        if isinstance(result, OSError):
+            print(f"  Error reading: {result}", file=sys.stderr)
             continue
+        pure_domains, filter_rules = result
 
         if pure_domains:
             print(f"  Found {len(pure_domains)} pure domains")
@@ -102,22 +116,32 @@ def scan_adblock_files(adblock_dir: Path) -> tuple[dict, dict]:
                 # Fast path: all domains go to the same target based on source filename
                 domain_moves[file_category][adblock_file.name].extend(pure_domains)
             else:
-                for domain in pure_domains:
-                    domain_moves[categorize_domain(domain, adblock_file.name)][
-                        adblock_file.name
-                    ].append(domain)
+                for target, domains in _categorizer().categorize_many(pure_domains).items():
+                    domain_moves[target][adblock_file.name].extend(domains)
 
     return domain_moves, file_updates
 
 
-def _update_hostlists(hostlist_dir: Path, domain_moves: dict) -> int:
-    """Append domains to hostlists."""
+def _update_hostlists(
+    hostlist_dir: Path, domain_moves: dict, index_dir: Path = INDEX_CACHE
+) -> tuple[int, set[str]] | None:
+    """
+    Append domains to hostlists, skipping any listed or covered by a parent in any hostlist.
+    Returns (domains moved, names of source files whose domains could not be appended),
+    or None if the index could not be opened.
+    """
     total_moved = 0
+    failed: set[str] = set()
 
     print("\n" + "=" * 60)
     print("Appending domains to hostlist files")
     print("=" * 60 + "\n")
 
+    # Only pure domains are indexed, not regex patterns.
+    index = DomainIndex.open(hostlist_dir, index_dir)
+    if index is None:
+        return None
+
     for target_file, source_domains in sorted(domain_moves.items()):
         target_path = hostlist_dir / target_file
         all_domains = []
@@ -128,24 +152,25 @@ def _update_hostlists(hostlist_dir: Path, domain_moves: dict) -> int:
         if not all_domains:
             continue
 
-        existing_domains = set()
-        if target_path.exists():
-            lines = read_lines(target_path)
-            if lines is None:
-                continue
-            for line in lines:
-                stripped = line.strip()
-                # Only track pure domains, not regex patterns
-                if stripped and is_valid_domain(stripped):
-                    existing_domains.add(stripped)
-
-        new_domains = list(set(all_domains) - existing_domains)
+        new_domains = index.missing(all_domains)
+        skipped = len(set(all_domains)) - len(new_domains)
+        if skipped:
+            print(f"Skipped {skipped} domains already covered in {hostlist_dir.name}")
 
-        if new_domains and write_lines(target_path, sorted(new_domains), mode="a"):
-            total_moved += len(new_domains)
-            print(f"Appended {len(new_domains)} domains to {target_file}")
+        if not new_domains:
+            continue
+        if not write_lines(target_path, new_domains, mode="a"):
+            print(f"  Could not append to {target_file}", file=sys.stderr)
+            failed.update(source_domains)
+            continue
+        total_moved += len(new_domains)
+        print(f"Appended {len(new_domains)} domains to {target_file}")
+        try:
+            index.add(new_domains, target_file)
+        except OSError as e:
+            print(f"  Could not update index for {target_file}: {e}", file=sys.stderr)
 
-    return total_moved
+    return total_moved, failed
 
 
 def _update_source_files(file_updates: dict) -> None:
@@ -155,19 +180,28 @@ def _update_source_files(file_updates: dict) -> None:
     print("=" * 60 + "\n")
 
     for filepath, new_lines in file_updates.items():
-        tmp_path = filepath.with_name(filepath.name + ".tmp")
-        if write_lines(tmp_path, new_lines):
-            tmp_path.replace(filepath)
+        # write_lines replaces the file atomically.
+        if write_lines(filepath, new_lines):
             print(f"Updated {filepath.name}")
-        else:
-            if tmp_path.exists():
-                tmp_path.unlink()
 
 
-def apply_updates(hostlist_dir: Path, domain_moves: dict, file_updates: dict) -> int:
-    """Append moved domains to hostlists and rewrite source adblock files."""
-    total_moved = _update_hostlists(hostlist_dir, domain_moves)
-    _update_source_files(file_updates)
+def apply_updates(
+    hostlist_dir: Path, domain_moves: dict, file_updates: dict, index_dir: Path = INDEX_CACHE
+) -> int | None:
+    """
+    Append moved domains to hostlists and rewrite source adblock files.
+    A source is only rewritten once all of its domains are in a hostlist, so nothing is lost;
+    returns None if any source had to be left as is.
+    """
+    result = _update_hostlists(hostlist_dir, domain_moves, index_dir)
+    if result is None:
+        print("  Source files left unchanged", file=sys.stderr)
+        return None
+    total_moved, failed = result
+    _update_source_files({path: lines for path, lines in file_updates.items() if path.name not in failed})
+    if failed:
+        print(f"  Left {len(failed)} source files unchanged: {', '.join(sorted(failed))}", file=sys.stderr)
+        return None
     return total_moved
 
 
@@ -185,17 +219,29 @@ def main() -> int:
         print(f"Error: Hostlist directory not found at {hostlist_dir}", file=sys.stderr)
         return 1
 
+    try:
+        _categorizer()
+    except (OSError, ValueError) as e:
+        print(f"Error loading category rules: {e}", file=sys.stderr)
+        return 1
+
     print("=" * 60)
     print("Moving pure domain entries from adblock to hostlist")
     print("=" * 60 + "\n")
 
-    domain_moves, file_updates = scan_adblock_files(adblock_dir)
+    with profiling.span("move.scan"):
+        domain_moves, file_updates = scan_adblock_files(adblock_dir)
 
     if not domain_moves:
         print("\n✓ No pure domains found in adblock lists")
         return 0
 
-    total_moved = apply_updates(hostlist_dir, domain_moves, file_updates)
+    with profiling.span("move.apply"):
+        total_moved = apply_updates(hostlist_dir, domain_moves, file_updates)
+    if total_moved is None:
+        print("\nError: some pure domains could not be moved", file=sys.stderr)
+        return 1
+    profiling.count("move.domains", total_moved)
 
     print("\n" + "=" * 60)
     print(f"✓ Successfully moved {total_moved} pure domains to hostlist")
@@ -205,4 +251,4 @@ def main() -> int:
 
 
 if __name__ == "__main__":
-    sys.exit(main())
+    sys.exit(profiling.run("move_pure_domains", main))
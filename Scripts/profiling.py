@@ -0,0 +1,214 @@
+"""
+Opt-in instrumentation shared by the Scripts entry points.
+Named timing spans, counters and peak RSS are collected while profiling is
+on and written as a Chrome trace-event JSON file (chrome://tracing, Perfetto).
+
+Enable with ``--profile[=TRACE]`` on any entry point, or set ADBLOCK_PROFILE
+to ``1`` (traces go to .cache/profile) or to a directory. ``--profile-cprofile``
+and ``--profile-tracemalloc`` (or ADBLOCK_PROFILE_CPROFILE/_TRACEMALLOC=1)
+additionally wrap the run in cProfile or tracemalloc.
+"""
+
+import os
+import sys
+import threading
+import time
+from collections.abc import Callable
+from contextlib import nullcontext
+from pathlib import Path
+from typing import Any, Final, TypeVar
+
+from Scripts.common import CACHE_DIR, log
+
+PROFILE_DIR: Final[Path] = CACHE_DIR / "profile"
+TRACEMALLOC_TOP: Final[int] = 25
+
+T = TypeVar("T")
+
+
+class _Session:
+    def __init__(self, tool: str) -> None:
+        self.tool = tool
+        self.pid = os.getpid()
+        self.origin = time.perf_counter_ns()
+        self.events: list[dict[str, Any]] = []
+        self.counters: dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def us(self, ns: int) -> float:
+        return (ns - self.origin) / 1000
+
+
+_session: _Session | None = None
+_NULL_SPAN: Final = nullcontext()
+
+
+class _Span:
+    __slots__ = ("name", "args", "start")
+
+    def __init__(self, name: str, args: dict[str, Any]) -> None:
+        self.name = name
+        self.args = args
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc: object) -> None:
+        end = time.perf_counter_ns()
+        session = _session
+        if session is None:
+            return
+        event = {
+            "name": self.name,
+            "ph": "X",
+            "ts": session.us(self.start),
+            "dur": (end - self.start) / 1000,
+            "pid": session.pid,
+            "tid": threading.get_ident(),
+        }
+        if self.args:
+            event["args"] = self.args
+        session.events.append(event)
+
+
+def enabled() -> bool:
+    return _session is not None
+
+
+def span(name: str, **args: Any) -> _Span | nullcontext:
+    """Time a block as a named span. A shared no-op when profiling is off."""
+    return _Span(name, args) if _session is not None else _NULL_SPAN
+
+
+def count(name: str, n: int = 1) -> None:
+    """Add n to a named counter."""
+    session = _session
+    if session is not None:
+        with session.lock:
+            session.counters[name] = session.counters.get(name, 0) + n
+
+
+def peak_rss_kb() -> int | None:
+    """Peak resident set size of this process in KiB, None where unsupported."""
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux and the BSDs KiB.
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _take_flags(argv: list[str]) -> tuple[str | None, bool, bool]:
+    """Remove profiling flags from argv; return (trace, cprofile, tracemalloc)."""
+    trace: str | None = None
+    use_cprofile = use_tracemalloc = False
+    rest: list[str] = []
+    for arg in argv:
+        if arg == "--profile":
+            trace = trace or ""
+        elif arg.startswith("--profile="):
+            trace = arg.split("=", 1)[1]
+        elif arg == "--profile-cprofile":
+            use_cprofile = True
+        elif arg == "--profile-tracemalloc":
+            use_tracemalloc = True
+        else:
+            rest.append(arg)
+    argv[:] = rest
+    return trace, use_cprofile, use_tracemalloc
+
+
+def _trace_path(tool: str, trace: str | None) -> Path | None:
+    if trace:
+        return Path(trace)
+    env = os.environ.get("ADBLOCK_PROFILE", "")
+    if trace is None and env in ("", "0"):
+        return None
+    # A directory keeps traces of nested tools (e.g. update_lists --dedupe) apart;
+    # "0" with --profile means the default directory, not one named "0".
+    directory = Path(env) if env not in ("", "0", "1") else PROFILE_DIR
+    return directory / f"{tool}.trace.json"
+
+
+def run(tool: str, main: Callable[[], T], argv: list[str] | None = None) -> T:
+    """Run an entry point, profiling it when asked via flags or environment.
+
+    Profiling flags are stripped from argv (sys.argv by default) before main
+    parses its arguments.
+    """
+    global _session
+    trace, use_cprofile, use_tracemalloc = _take_flags(sys.argv if argv is None else argv)
+    path = _trace_path(tool, trace)
+    if path is None:
+        return main()
+
+    use_cprofile = use_cprofile or os.environ.get("ADBLOCK_PROFILE_CPROFILE") == "1"
+    use_tracemalloc = use_tracemalloc or os.environ.get("ADBLOCK_PROFILE_TRACEMALLOC") == "1"
+    profiler = None
+    if use_cprofile:
+        import cProfile
+
+        profiler = cProfile.Profile()
+    if use_tracemalloc:
+        import tracemalloc
+
+        tracemalloc.start()
+
+    _session = session = _Session(tool)
+    try:
+        with span(tool):
+            if profiler is None:
+                return main()
+            return profiler.runcall(main)
+    finally:
+        _session = None
+        snapshot = None
+        if use_tracemalloc:
+            snapshot = tracemalloc.take_snapshot()
+            tracemalloc.stop()
+        _write_trace(session, path, snapshot)
+        if profiler is not None:
+            prof = path.with_suffix(".prof")
+            profiler.dump_stats(prof)
+            log("profile", f"cProfile stats: {prof}")
+
+
+def _write_trace(session: _Session, path: Path, snapshot: Any = None) -> None:
+    import json
+
+    rss = peak_rss_kb()
+    end = session.us(time.perf_counter_ns())
+    events = list(session.events)
+    events.append(
+        {"name": "process_name", "ph": "M", "pid": session.pid, "tid": 0, "args": {"name": session.tool}}
+    )
+    if session.counters:
+        events.append(
+            {"name": "counters", "ph": "C", "ts": end, "pid": session.pid, "tid": 0, "args": session.counters}
+        )
+    other: dict[str, Any] = {"tool": session.tool, "peak_rss_kb": rss, "counters": session.counters}
+    if snapshot is not None:
+        other["tracemalloc_top"] = [
+            {"where": str(stat.traceback[0]), "size": stat.size, "count": stat.count}
+            for stat in snapshot.statistics("lineno")[:TRACEMALLOC_TOP]
+        ]
+
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps({"traceEvents": events, "otherData": other}) + "\n", encoding="utf-8")
+    except OSError as e:
+        print(f"  Could not write trace {path}: {e}", file=sys.stderr)
+        return
+
+    totals: dict[str, float] = {}
+    for event in session.events:
+        totals[event["name"]] = totals.get(event["name"], 0.0) + event["dur"]
+    for name, dur in sorted(totals.items(), key=lambda item: -item[1])[:10]:
+        log("profile", f"{name}: {dur / 1000:.1f} ms")
+    for name, value in sorted(session.counters.items()):
+        log("profile", f"{name} = {value}")
+    if rss is not None:
+        log("profile", f"peak RSS: {rss / 1024:.1f} MiB")
+    log("profile", f"trace: {path}")
@@ -0,0 +1,137 @@
+"""
+Release artifact publishing for lists/releases.
+Adds an Adblock Plus checksum header, writes deterministic .gz/.br siblings
+on a thread pool and records sizes and SHA-256 hashes in manifest.json.
+Brotli output comes from the ``brotli`` dependency; an environment without
+it still gets the .gz files and a manifest.
+"""
+
+import base64
+import gzip
+import hashlib
+import json
+import os
+import re
+import tempfile
+import zlib
+from pathlib import Path
+from typing import TYPE_CHECKING, Final
+
+from Scripts.common import ts_read, warn
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+if TYPE_CHECKING:
+    from concurrent.futures import Future
+
+MANIFEST_NAME: Final[str] = "manifest.json"
+GZIP_LEVEL: Final[int] = 9
+BROTLI_QUALITY: Final[int] = 11
+# What a failed compression can raise: I/O errors and the compressors' own.
+COMPRESS_ERRORS: Final[tuple[type[Exception], ...]] = (
+    (OSError, zlib.error) if brotli is None else (OSError, zlib.error, brotli.error)
+)
+
+_CHECKSUM_RE = re.compile(r"^\s*!\s*checksum[\s\-:]+([\w\+\/=]+).*\n", re.MULTILINE | re.IGNORECASE)
+
+
+def compute_checksum(content: str) -> str:
+    """Adblock Plus checksum of content, as verified by update_lists.validate_checksum."""
+    body = content.rstrip("\r\n").replace("\r", "") + "\n"
+    return base64.b64encode(hashlib.sha256(body.encode("utf-8")).digest()).decode().rstrip("=")
+
+
+def add_checksum(path: Path) -> str:
+    """Insert or refresh the ``! Checksum:`` line after the first header line."""
+    content = path.read_text(encoding="utf-8")
+    content = _CHECKSUM_RE.sub("", content, count=1)
+    checksum = compute_checksum(content)
+    first, sep, rest = content.partition("\n")
+    _atomic_write(path, f"{first}{sep}! Checksum: {checksum}\n{rest}".encode())
+    return checksum
+
+
+def _atomic_write(path: Path, data: bytes) -> None:
+    fd, temp_path = tempfile.mkstemp(dir=path.parent)
+    try:
+        with open(fd, "wb") as f:
+            f.write(data)
+        # mkstemp creates 0600 files; release artifacts are served publicly.
+        os.chmod(temp_path, 0o644)
+        os.replace(temp_path, path)
+    except Exception:
+        os.unlink(temp_path)
+        raise
+
+
+def _is_adblock_syntax(path: Path) -> bool:
+    with path.open("r", encoding="utf-8") as f:
+        return f.readline().startswith(("!", "["))
+
+
+def _describe(data: bytes) -> dict:
+    return {"size": len(data), "sha256": hashlib.sha256(data).hexdigest()}
+
+
+def compress_artifact(path: Path) -> dict:
+    """Write .gz (and .br when available) siblings; return manifest info for path."""
+    data = path.read_bytes()
+    info = _describe(data)
+
+    gz = path.with_name(path.name + ".gz")
+    # Fixed mtime and no embedded filename keep the archive byte-for-byte reproducible.
+    gz_data = gzip.compress(data, compresslevel=GZIP_LEVEL, mtime=0)
+    _atomic_write(gz, gz_data)
+    info["gzip"] = {"file": gz.name, **_describe(gz_data)}
+
+    if brotli is not None:
+        br = path.with_name(path.name + ".br")
+        br_data = brotli.compress(data, quality=BROTLI_QUALITY)
+        _atomic_write(br, br_data)
+        info["brotli"] = {"file": br.name, **_describe(br_data)}
+    return info
+
+
+class ReleasePublisher:
+    """Checksum and compress release files in the background, then write the manifest."""
+
+    def __init__(self, out_dir: Path, max_workers: int | None = None) -> None:
+        from concurrent.futures import ThreadPoolExecutor
+
+        self.out_dir = out_dir
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="release")
+        self._pending: dict[str, "Future[dict]"] = {}
+
+    def submit(self, path: Path) -> None:
+        # Checksums are an Adblock Plus convention; hosts-style files are left untouched.
+        if _is_adblock_syntax(path):
+            add_checksum(path)
+        self._pending[path.name] = self._pool.submit(compress_artifact, path)
+
+    def close(self) -> Path | None:
+        """Wait for compression and merge results into manifest.json."""
+        self._pool.shutdown(wait=True)
+        if not self._pending:
+            return None
+
+        manifest_path = self.out_dir / MANIFEST_NAME
+        files: dict[str, dict] = {}
+        if manifest_path.exists():
+            try:
+                files = json.loads(manifest_path.read_text(encoding="utf-8")).get("files", {})
+            except (OSError, json.JSONDecodeError) as e:
+                warn(f"Ignoring unreadable {manifest_path}: {e}")
+        for name, future in self._pending.items():
+            try:
+                files[name] = future.result()
+            except COMPRESS_ERRORS as e:
+                warn(f"Compression failed for {name}: {e}")
+        files = {name: info for name, info in files.items() if (self.out_dir / name).exists()}
+
+        manifest = {"generated": ts_read(), "files": dict(sorted(files.items()))}
+        _atomic_write(manifest_path, (json.dumps(manifest, indent=2) + "\n").encode())
+        self._pending.clear()
+        return manifest_path
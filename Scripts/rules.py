@@ -0,0 +1,225 @@
+"""
+Filter rule parsing shared by the build and maintenance scripts.
+Lines are parsed once into compact, slotted Rule objects with interned
+strings; parse_file caches whole-file results by content hash.
+"""
+
+import hashlib
+import os
+import pickle
+import re
+import sys
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Final
+
+from Scripts.common import CACHE_DIR, is_valid_domain
+
+# Bump whenever Rule or parse_line changes so stale caches are ignored.
+PARSER_VERSION: Final[str] = "3"
+RULES_CACHE: Final[Path] = CACHE_DIR / "rules"
+
+EMPTY: Final[str] = "empty"
+COMMENT: Final[str] = "comment"
+NETWORK: Final[str] = "network"
+COSMETIC: Final[str] = "cosmetic"
+SCRIPTLET: Final[str] = "scriptlet"
+HOSTNAME: Final[str] = "hostname"
+
+# Longest markers first so "#@#" is not read as "##".
+COSMETIC_MARKERS: Final[tuple[str, ...]] = (
+    "#@$?#",
+    "#@%#",
+    "#@$#",
+    "#@?#",
+    "#$?#",
+    "#@#",
+    "#%#",
+    "#$#",
+    "#?#",
+    "##",
+)
+# Modifiers that do not narrow a ``||host^`` rule below the whole hostname.
+HOST_LEVEL_MODIFIERS: Final[frozenset[str]] = frozenset({"important", "all", "document", "doc"})
+
+_HOST_RE = re.compile(r"[a-z0-9.-]+", re.IGNORECASE)
+_HOST_END: Final[str] = "^/$|:"
+_intern = sys.intern
+
+
+@dataclass(slots=True)
+class Rule:
+    kind: str
+    text: str
+    exception: bool = False
+    # Network rules: hostname anchored by ``||`` and whether the rule covers
+    # exactly that hostname (``||host^`` with host-level modifiers only).
+    hostname: str | None = None
+    host_level: bool = False
+    pattern: str = ""
+    options: tuple[str, ...] = ()
+    # Cosmetic and scriptlet rules: domains before the marker and the body after it.
+    domains: tuple[str, ...] = ()
+    marker: str = ""
+    selector: str = ""
+
+    def option(self, name: str) -> str | None:
+        """Value of a ``name=value`` modifier, ``""`` for a bare flag, None if absent."""
+        prefix = name + "="
+        for opt in self.options:
+            if opt == name:
+                return ""
+            if opt.startswith(prefix):
+                return opt[len(prefix) :]
+        return None
+
+    def option_domains(self) -> tuple[str, ...]:
+        """Domains listed in ``domain=``/``from=`` modifiers, ``~`` negations included."""
+        value = self.option("domain") or self.option("from")
+        return tuple(_intern(d) for d in value.split("|") if d) if value else ()
+
+
+def _cosmetic_split(line: str) -> tuple[int, str] | None:
+    idx = line.find("#")
+    while idx != -1:
+        for marker in COSMETIC_MARKERS:
+            if line.startswith(marker, idx):
+                return idx, marker
+        idx = line.find("#", idx + 1)
+    return None
+
+
+def split_options(line: str) -> tuple[str, tuple[str, ...]]:
+    """Split a network rule into pattern and modifiers; regex rules keep their ``$``."""
+    if len(line) > 2 and line[0] == "/" and line[-1] == "/":
+        return line, ()
+    idx = line.rfind("$")
+    if idx == -1:
+        return line, ()
+    return line[:idx], tuple(_intern(opt) for opt in line[idx + 1 :].split(",") if opt)
+
+
+def _parse_network(line: str, exception: bool) -> Rule:
+    pattern, options = split_options(line[2:] if exception else line)
+    hostname = None
+    host_level = False
+    if pattern.startswith("||"):
+        m = _HOST_RE.match(pattern, 2)
+        if m and (m.end() == len(pattern) or pattern[m.end()] in _HOST_END):
+            host = m.group(0).lower()
+            if is_valid_domain(host):
+                hostname = _intern(host)
+                host_level = pattern[m.end() :] in ("^", "^|") and (
+                    not options or HOST_LEVEL_MODIFIERS.issuperset(opt.lower() for opt in options)
+                )
+    return Rule(NETWORK, line, exception, hostname, host_level, pattern, options)
+
+
+def parse_line(raw: str) -> Rule:
+    """Parse one filter line into a Rule."""
+    line = raw.strip()
+    if not line:
+        return Rule(EMPTY, line)
+    first = line[0]
+    cosmetic = _cosmetic_split(line) if "#" in line else None
+    if first in "![" or (first == "#" and cosmetic is None):
+        return Rule(COMMENT, line)
+
+    if cosmetic is not None:
+        idx, marker = cosmetic
+        head = line[:idx]
+        if not any(c in head for c in "/|$^"):
+            selector = line[idx + len(marker) :]
+            kind = SCRIPTLET if "%" in marker or selector.startswith("+js(") else COSMETIC
+            domains = tuple(_intern(d.strip().lower()) for d in head.split(",") if d.strip())
+            return Rule(kind, line, "@" in marker, domains=domains, marker=marker, selector=selector)
+
+    if line.startswith("@@"):
+        return _parse_network(line, exception=True)
+    if first.isalnum() and is_valid_domain(line):
+        host = _intern(line.lower())
+        return Rule(HOSTNAME, line, hostname=host, host_level=True, pattern=line)
+    return _parse_network(line, exception=False)
+
+
+def parse_lines(lines: Iterable[str]) -> list[Rule]:
+    return [parse_line(line) for line in lines]
+
+
+_memory_cache: dict[str, list[Rule]] = {}
+
+
+def parse_file(path: Path, cache_dir: Path | None = RULES_CACHE) -> list[Rule]:
+    """Parse a whole file once. Results are cached in memory and on disk by content hash."""
+    data = path.read_bytes()
+    key = hashlib.sha256(PARSER_VERSION.encode() + b"\0" + data).hexdigest()
+    cached = _memory_cache.get(key)
+    if cached is not None:
+        return cached
+
+    cache_file = cache_dir / f"{key[:32]}.pickle" if cache_dir is not None else None
+    if cache_file is not None and cache_file.exists():
+        try:
+            with cache_file.open("rb") as f:
+                rules = pickle.load(f)
+            _memory_cache[key] = rules
+            return rules
+        except (OSError, pickle.UnpicklingError, EOFError, AttributeError):
+            cache_file.unlink(missing_ok=True)
+
+    rules = parse_lines(data.decode("utf-8").splitlines())
+    _memory_cache[key] = rules
+    if cache_file is not None:
+        import tempfile
+
+        try:
+            cache_file.parent.mkdir(parents=True, exist_ok=True)
+            # A private temp file per writer, so concurrent parses never share one.
+            fd, temp_path = tempfile.mkstemp(dir=cache_file.parent, suffix=".tmp")
+            try:
+                with open(fd, "wb") as f:
+                    pickle.dump(rules, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.replace(temp_path, cache_file)
+            except BaseException:
+                os.unlink(temp_path)
+                raise
+        except OSError as e:
+            print(f"  Could not cache rules for {path}: {e}", file=sys.stderr)
+    return rules
+
+
+def _covered(host: str, domains: set[str]) -> bool:
+    """Check whether host or one of its parent domains is in domains."""
+    if host in domains:
+        return True
+    idx = host.find(".")
+    while idx != -1:
+        if host[idx + 1 :] in domains:
+            return True
+        idx = host.find(".", idx + 1)
+    return False
+
+
+def blocked_hostnames(rules: Iterable[Rule | str]) -> set[str]:
+    """Collect hostnames blocked at DNS level, in a single pass.
+
+    Only plain ``||host^`` block rules and pure-domain lines count. Cosmetic
+    rules, ``domain=`` options and path rules are ignored, and a
+    ``@@||host^`` exception with host-level modifiers only unblocks host and
+    its subdomains.
+    """
+    blocked: set[str] = set()
+    allowed: set[str] = set()
+    for item in rules:
+        rule = parse_line(item) if isinstance(item, str) else item
+        if not rule.host_level:
+            continue
+        if rule.exception:
+            allowed.add(rule.hostname)
+        else:
+            blocked.add(rule.hostname)
+
+    if not allowed:
+        return blocked
+    return {host for host in blocked if not _covered(host, allowed)}
@@ -0,0 +1,85 @@
+"""
+Reversed-label suffix trie for domain lookups.
+A value stored for ``example.com`` applies to ``example.com`` and every
+subdomain of it; lookups walk at most one node per label.
+"""
+
+from collections.abc import Iterable, Iterator
+from typing import Generic, TypeVar
+
+V = TypeVar("V")
+
+# Key under which a node stores its value; labels never contain a dot.
+_VALUE = "."
+
+
+class SuffixTrie(Generic[V]):
+    """Map domain suffixes to values, matching on whole labels."""
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, items: Iterable[tuple[str, V]] = ()) -> None:
+        self._root: dict = {}
+        self._size = 0
+        for domain, value in items:
+            self.insert(domain, value)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def insert(self, domain: str, value: V) -> None:
+        node = self._root
+        for label in reversed(domain.lower().split(".")):
+            node = node.setdefault(label, {})
+        if _VALUE not in node:
+            self._size += 1
+        node[_VALUE] = value
+
+    def _walk(self, domain: str) -> Iterator[tuple[int, V]]:
+        """Yield (label count, value) for every stored suffix of domain, shortest first."""
+        node = self._root
+        labels = domain.lower().split(".")
+        for depth, label in enumerate(reversed(labels), 1):
+            node = node.get(label)
+            if node is None:
+                return
+            if _VALUE in node:
+                yield depth, node[_VALUE]
+
+    def matches(self, domain: str) -> Iterator[tuple[str, V]]:
+        """Yield every stored suffix of domain with its value, shortest first."""
+        labels = domain.lower().split(".")
+        for depth, value in self._walk(domain):
+            yield ".".join(labels[-depth:]), value
+
+    def longest(self, domain: str) -> tuple[str, V] | None:
+        """Most specific stored suffix of domain and its value."""
+        # Inlined walk: this is the hot path of categorization.
+        node = self._root
+        labels = domain.lower().split(".")
+        found = 0
+        value = None
+        for depth, label in enumerate(reversed(labels), 1):
+            node = node.get(label)
+            if node is None:
+                break
+            if _VALUE in node:
+                found, value = depth, node[_VALUE]
+        if not found:
+            return None
+        return ".".join(labels[-found:]), value
+
+    def shortest(self, domain: str) -> tuple[str, V] | None:
+        """Least specific stored suffix of domain (the covering parent) and its value."""
+        for depth, value in self._walk(domain):
+            return ".".join(domain.lower().split(".")[-depth:]), value
+        return None
+
+    def get(self, domain: str, default: V | None = None) -> V | None:
+        """Value of the most specific stored suffix of domain."""
+        match = self.longest(domain)
+        return match[1] if match is not None else default
+
+    def __contains__(self, domain: str) -> bool:
+        """Whether domain or one of its parents is stored."""
+        return next(self._walk(domain), None) is not None
@@ -0,0 +1,116 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from Scripts.categorize import build_categorizer, load_categorizer
+from Scripts.suffix_trie import SuffixTrie
+
+# (domain, expected target) for the shipped categories.json; the first block
+# used to be misfiled by the old substring patterns.
+REGRESSION_CORPUS = [
+    ("adobe.com", "Other.txt"),
+    ("download.com", "Other.txt"),
+    ("cdn.download.com", "Other.txt"),
+    ("badge.com", "Other.txt"),
+    ("readme.io", "Other.txt"),
+    ("shadow.tech", "Other.txt"),
+    ("headspace.com", "Other.txt"),
+    ("example.ad", "Other.txt"),
+    ("geometric.org", "Other.txt"),
+    ("ad.example.com", "Ads.txt"),
+    ("ads-1.net", "Ads.txt"),
+    ("google-ads.com", "Ads.txt"),
+    ("ad2.cdn.example.com", "Ads.txt"),
+    ("adserver.example.org", "Ads.txt"),
+    ("advertising.example.com", "Ads.txt"),
+    ("analytics.google.com", "Ads.txt"),
+    ("webanalytics.example.com", "Other.txt"),
+    ("trackers.example.io", "Ads.txt"),
+    ("telemetry.microsoft.com", "Ads.txt"),
+    ("metrics.apple.com", "Ads.txt"),
+    ("stats.g.doubleclick.net", "Ads.txt"),
+    ("www.google-analytics.com", "Ads.txt"),
+    ("api.facebook.com", "Social-Media.txt"),
+    ("ads.facebook.com", "Ads.txt"),
+    ("static.xx.fbcdn.net", "Social-Media.txt"),
+    ("pbs.twimg.com", "Social-Media.txt"),
+    ("box.com", "Other.txt"),
+    ("instagram-images.net", "Social-Media.txt"),
+    ("social.network.com", "Social-Media.txt"),
+    ("AD.Example.COM", "Ads.txt"),
+]
+
+
+class TestSuffixTrie(unittest.TestCase):
+    def test_lookups_match_whole_labels(self):
+        trie = SuffixTrie([("example.com", 1), ("a.b.example.com", 2)])
+        self.assertEqual(len(trie), 2)
+        self.assertEqual(trie.longest("x.a.b.example.com"), ("a.b.example.com", 2))
+        self.assertEqual(trie.shortest("x.a.b.example.com"), ("example.com", 1))
+        self.assertEqual(trie.get("b.example.com"), 1)
+        self.assertIn("Example.com", trie)
+        self.assertNotIn("badexample.com", trie)
+        self.assertNotIn("com", trie)
+        self.assertIsNone(trie.longest("example.org"))
+
+    def test_insert_replaces_value(self):
+        trie: SuffixTrie[str] = SuffixTrie()
+        trie.insert("example.com", "a")
+        trie.insert("EXAMPLE.com", "b")
+        self.assertEqual(len(trie), 1)
+        self.assertEqual(trie.get("www.example.com"), "b")
+
+
+class TestCategorizer(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.categorizer = load_categorizer()
+
+    def test_regression_corpus(self):
+        for domain, expected in REGRESSION_CORPUS:
+            with self.subTest(domain=domain):
+                self.assertEqual(self.categorizer.categorize(domain), expected)
+
+    def test_source_rules_win(self):
+        self.assertEqual(self.categorizer.categorize("ads.example.com", "Spotify.txt"), "Spotify.txt")
+        self.assertIsNone(self.categorizer.for_source("filters.txt"))
+
+    def test_categorize_many_matches_categorize(self):
+        domains = [domain for domain, _ in REGRESSION_CORPUS]
+        groups = self.categorizer.categorize_many(domains)
+        for target, members in groups.items():
+            for domain in members:
+                self.assertEqual(self.categorizer.categorize(domain), target)
+        self.assertEqual(sum(map(len, groups.values())), len(domains))
+        self.assertEqual(self.categorizer.categorize_many(domains, "game.txt"), {"Games.txt": domains})
+
+    def test_keyword_priority_and_prefixes(self):
+        categorizer = build_categorizer(
+            {
+                "default": "Rest.txt",
+                "categories": [
+                    {"target": "A.txt", "keywords": ["pix*"]},
+                    {"target": "B.txt", "keywords": ["cdn", "pixel"]},
+                ],
+            }
+        )
+        self.assertEqual(categorizer.categorize("cdn.pixels.example.com"), "A.txt")
+        self.assertEqual(categorizer.categorize("cdn.example.com"), "B.txt")
+        self.assertEqual(categorizer.categorize("cdnx.example.com"), "Rest.txt")
+        self.assertEqual(categorizer.categorize("apix.com"), "Rest.txt")
+
+    def test_invalid_config(self):
+        bad = ({"categories": [{"keywords": ["ad"]}]}, {"categories": [{"target": "A.txt", "keywords": ["a.d"]}]})
+        for config in bad:
+            with self.subTest(config=config), self.assertRaises(ValueError):
+                build_categorizer(config)
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "categories.json"
+            path.write_text(json.dumps({"sources": [{"target": "X.txt"}]}), encoding="utf-8")
+            with self.assertRaises(ValueError):
+                load_categorizer(path)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+
+from Scripts.check_dead_domains import extract_hostnames, rewrite
+
+
+class TestExtractHostnames(unittest.TestCase):
+    def test_rule_domains_in_first_seen_order(self):
+        lines = [
+            "! a.com##.comment",
+            "[Adblock Plus 2.0]",
+            "B.com,~c.com##.ad\n",
+            "example.*,d.com#@#.banner",
+            "e.com##+js(set-constant, a, 1)",
+            "||ads.f.com^$script,domain=g.com|~h.com",
+            "@@||i.com^$from=j.com",
+            "||k.com^",
+            "||l.com/path$third-party",
+            "||1.2.3.4^",
+            "||m.onion^",
+            "##.generic",
+            "n.com",
+            "b.com##.again",
+        ]
+        expected = ["b.com", "c.com", "d.com", "e.com", "g.com", "j.com", "k.com", "l.com"]
+        self.assertEqual(extract_hostnames(lines), expected)
+
+
+class TestRewrite(unittest.TestCase):
+    def test_dead_domains_are_dropped(self):
+        lines = [
+            "! dead.com##.comment\n",
+            "a.com,dead.com,~gone.com##.ad\n",
+            "dead.com,gone.com##.ad\n",
+            "dead.com#@#.banner\n",
+            "||x.com^$script,domain=dead.com|b.com|~gone.com\n",
+            "@@||y.com^$from=dead.com\n",
+            "||dead.com^\n",
+            "||alive.com^\n",
+        ]
+        dead = set(extract_hostnames(lines)) & {"dead.com", "gone.com"}
+        self.assertEqual(
+            rewrite(lines, dead),
+            [
+                "! dead.com##.comment\n",
+                "a.com##.ad\n",
+                "! All Dead Kept One Backup\n",
+                "dead.com##.ad\n",
+                "dead.com#@#.banner\n",
+                "||x.com^$script,domain=b.com|~gone.com\n",
+                "@@||y.com^$from=dead.com\n",
+                "! All Dead Kept One Backup\n",
+                "||dead.com^\n",
+                "||alive.com^\n",
+            ],
+        )
+        self.assertEqual(rewrite(lines, set()), lines)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,14 @@
+import asyncio
 import hashlib
 import io
+import os
+import random
 import sys
 import tempfile
 import unittest
+import urllib.error
+import urllib.response
+from email.message import Message
 from pathlib import Path
 from unittest.mock import patch
 
@@ -10,7 +16,18 @@ from unittest.mock import patch
 if str(Path(__file__).parent) not in sys.path:
     sys.path.append(str(Path(__file__).parent))
 
-from common import is_valid_domain, read_lines, sanitize_filename, write_lines
+from common import (
+    DOMAIN_PATTERN,
+    HttpCache,
+    fetch,
+    fetch_async,
+    is_valid_domain,
+    iter_lines,
+    read_lines,
+    sanitize_filename,
+    validate_domains,
+    write_lines,
+)
 
 
 class TestCommon(unittest.TestCase):
@@ -84,6 +101,22 @@ class TestCommon(unittest.TestCase):
         self.assertFalse(is_valid_domain("end-.com"))
         self.assertFalse(is_valid_domain("http://example.com"))
 
+    def test_is_valid_domain_matches_regex_on_fuzz_corpus(self):
+        rng = random.Random(1234)
+        alphabet = "abzAZ09-.-..\n_#|$^*~@ \u0130\u0131\u017f\u212a\u00e9\u00df\u03a9\u0663"
+        corpus = ["", ".", "a.b", "a.bc", "a-.bc", "-a.bc", "a..bc", "a.b1", "ex.com\n", "ex.com\n\n"]
+        corpus += ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 14))) for _ in range(50_000)]
+        # Structured near-misses hit the interesting branches far more often.
+        parts = ["a", "ab", "a-b", "-a", "a-", "0", "x1", "\u212a", ""]
+        for _ in range(20_000):
+            labels = [rng.choice(parts) for _ in range(rng.randint(1, 4))]
+            corpus.append(".".join(labels) + rng.choice(["", "\n", ".", "-"]))
+
+        for candidate in corpus:
+            expected = bool(DOMAIN_PATTERN.match(candidate))
+            self.assertEqual(is_valid_domain(candidate), expected, repr(candidate))
+        self.assertEqual(validate_domains(corpus), [c for c in corpus if DOMAIN_PATTERN.match(c)])
+
     def test_read_lines(self):
         with tempfile.TemporaryDirectory() as temp_dir:
             temp_dir_path = Path(temp_dir)
@@ -95,6 +128,21 @@ class TestCommon(unittest.TestCase):
             lines = read_lines(target_file)
             self.assertEqual(lines, ["line1", "line2", "line3"])
 
+    def test_iter_lines(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            target_file = Path(temp_dir) / "test.txt"
+            content = "! title\r\n\n||a.com^\r\n# c\nb.com\n\nünï.com"
+            target_file.write_text(content, encoding="utf-8", newline="")
+
+            self.assertEqual(list(iter_lines(target_file)), content.splitlines())
+            self.assertEqual(list(iter_lines(target_file, "!#", skip_empty=True)), ["||a.com^", "b.com", "ünï.com"])
+            # Tiny blocks force splits inside lines and inside multi-byte characters.
+            with patch("common._MMAP_BLOCK", 3):
+                self.assertEqual(list(iter_lines(target_file)), content.splitlines())
+
+            target_file.write_bytes(b"")
+            self.assertEqual(list(iter_lines(target_file)), [])
+
     @patch("pathlib.Path.open")
     def test_read_lines_unicode_error(self, mock_open):
         mock_open.side_effect = UnicodeError("mock unicode error")
@@ -137,6 +185,29 @@ class TestCommon(unittest.TestCase):
                 target_file.read_text(encoding="utf-8"), "line3\nline4\nline5\n"
             )
 
+    def test_write_lines_streams_iterables(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            target_file = Path(temp_dir) / "target.txt"
+            with patch("common._WRITE_CHUNK", 2):
+                self.assertTrue(write_lines(target_file, (f"l{i}" for i in range(5))))
+            self.assertEqual(target_file.read_text(encoding="utf-8"), "l0\nl1\nl2\nl3\nl4\n")
+
+            self.assertTrue(write_lines(target_file, iter([])))
+            self.assertEqual(target_file.read_bytes(), b"")
+
+    def test_write_lines_skips_unchanged(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            target_file = Path(temp_dir) / "target.txt"
+            write_lines(target_file, ["a", "b"])
+            with patch("os.replace") as mock_replace, patch("os.fsync") as mock_fsync:
+                self.assertTrue(write_lines(target_file, iter(["a", "b"]), fsync=True))
+                mock_replace.assert_not_called()
+                mock_fsync.assert_called_once()
+                # The unused temp file is removed.
+                self.assertEqual([p.name for p in Path(temp_dir).iterdir()], ["target.txt"])
+            self.assertTrue(write_lines(target_file, ["a", "c"]))
+            self.assertEqual(target_file.read_text(encoding="utf-8"), "a\nc\n")
+
     @patch("pathlib.Path.open")
     def test_write_lines_os_error_append(self, mock_open):
         from common import write_lines
@@ -160,5 +231,165 @@ class TestCommon(unittest.TestCase):
             self.assertIn("mock os error atomic", mock_stderr.getvalue())
 
 
+def _headers(**fields: str) -> Message:
+    msg = Message()
+    for name, value in fields.items():
+        msg[name.replace("_", "-")] = value
+    return msg
+
+
+class FakeServer:
+    """urlopen stand-in serving one body with fixed headers, honouring If-None-Match."""
+
+    def __init__(self, body: bytes, **headers: str) -> None:
+        self.body = body
+        self.headers = headers
+        self.requests: list[dict[str, str]] = []
+        self.down = False
+
+    def urlopen(self, req, timeout=None):
+        self.requests.append(dict(req.header_items()))
+        if self.down:
+            raise urllib.error.URLError("unreachable")
+        etag = self.headers.get("ETag")
+        if etag is not None and req.get_header("If-none-match") == etag:
+            raise urllib.error.HTTPError(req.full_url, 304, "Not Modified", _headers(ETag=etag), None)
+        return urllib.response.addinfourl(io.BytesIO(self.body), _headers(**self.headers), req.full_url, 200)
+
+
+class FakeResponse:
+    def __init__(self, status: int, body: bytes, headers: dict[str, str]) -> None:
+        self.status = status
+        self.headers = headers
+        chunks = [body[i : i + 3] for i in range(0, len(body), 3)]
+
+        async def iter_chunked(size):
+            for chunk in chunks:
+                yield chunk
+
+        self.content = type("Content", (), {"iter_chunked": staticmethod(iter_chunked)})
+
+    def raise_for_status(self) -> None:
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+
+class TestHttpCache(unittest.TestCase):
+    URL = "https://lists.test/hosts.txt"
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def fetch_twice(self, server: FakeServer) -> tuple[Path, Path]:
+        """Fetch URL, then again as a fresh process would (a new cache on the same directory)."""
+        with patch("urllib.request.urlopen", server.urlopen):
+            first = fetch(self.URL, cache=HttpCache(self.root))
+            second = fetch(self.URL, cache=HttpCache(self.root))
+        return first, second
+
+    def test_fresh_response_is_not_requested_again(self):
+        server = FakeServer(b"a.com\n", Cache_Control="max-age=600")
+        first, second = self.fetch_twice(server)
+        self.assertEqual(first, second)
+        self.assertEqual(second.read_bytes(), b"a.com\n")
+        self.assertEqual(len(server.requests), 1)
+        self.assertIn("Mozilla", server.requests[0]["User-agent"])
+
+    def test_same_process_never_asks_twice(self):
+        server = FakeServer(b"a.com\n", Cache_Control="no-cache", ETag='"v1"')
+        cache = HttpCache(self.root)
+        with patch("urllib.request.urlopen", server.urlopen):
+            fetch(self.URL, cache=cache)
+            fetch(self.URL, cache=cache)
+        self.assertEqual(len(server.requests), 1)
+
+    def test_stale_entry_is_revalidated(self):
+        server = FakeServer(b"a.com\n", Cache_Control="no-cache", ETag='"v1"')
+        _, second = self.fetch_twice(server)
+        self.assertEqual(second.read_bytes(), b"a.com\n")
+        self.assertEqual(len(server.requests), 2)
+        self.assertEqual(server.requests[1]["If-none-match"], '"v1"')
+
+    def test_no_store_is_never_served_again(self):
+        server = FakeServer(b"a.com\n", Cache_Control="no-store", ETag='"v1"')
+        self.fetch_twice(server)
+        self.assertEqual(len(server.requests), 2)
+        self.assertNotIn("If-none-match", server.requests[1])
+
+    def test_stale_copy_stands_in_when_offline(self):
+        server = FakeServer(b"a.com\n", Cache_Control="max-age=0", Last_Modified="Mon, 01 Jan 2024 00:00:00 GMT")
+        with patch("urllib.request.urlopen", server.urlopen):
+            fetch(self.URL, cache=HttpCache(self.root))
+            server.down = True
+            with patch("sys.stderr", new_callable=io.StringIO):
+                self.assertEqual(fetch(self.URL, cache=HttpCache(self.root)).read_bytes(), b"a.com\n")
+            self.assertEqual(server.requests[1]["If-modified-since"], "Mon, 01 Jan 2024 00:00:00 GMT")
+            with self.assertRaises(OSError):
+                fetch("https://lists.test/other.txt", cache=HttpCache(self.root))
+
+    def test_evicts_least_recently_used(self):
+        cache = HttpCache(self.root, max_bytes=12)
+        bodies = []
+        for n in range(3):
+            server = FakeServer(b"x" * 4, Cache_Control="max-age=600")
+            with patch("urllib.request.urlopen", server.urlopen):
+                bodies.append(fetch(f"https://lists.test/{n}", cache=cache))
+            os.utime(bodies[-1], (n, n))
+        cache.fresh("https://lists.test/0")
+        server = FakeServer(b"x" * 4, Cache_Control="max-age=600")
+        with patch("urllib.request.urlopen", server.urlopen):
+            fetch("https://lists.test/3", cache=cache)
+        self.assertEqual([b.exists() for b in bodies], [True, False, True])
+        self.assertIsNone(cache.meta("https://lists.test/1"))
+
+    def test_evict_keeps_entries_written_since_open(self):
+        cache = HttpCache(self.root, max_bytes=4)
+        # A concurrent fetch through another cache stores two bodies after this one was opened.
+        other = HttpCache(self.root)
+        bodies = []
+        for n in range(2):
+            server = FakeServer(b"x" * 4, Cache_Control="max-age=600")
+            with patch("urllib.request.urlopen", server.urlopen):
+                bodies.append(fetch(f"https://lists.test/{n}", cache=other))
+        self.assertEqual(cache.evict(), 0)
+        os.utime(bodies[0], (0, 0))
+        self.assertEqual(cache.evict(), 4)
+        self.assertEqual([b.exists() for b in bodies], [False, True])
+
+    def test_fetch_async(self):
+        cache = HttpCache(self.root)
+        calls = []
+
+        class Session:
+            def get(self, url, timeout=None, headers=None):
+                calls.append(headers)
+                if headers.get("If-None-Match") == '"v1"':
+                    return FakeResponse(304, b"", {"ETag": '"v1"'})
+                return FakeResponse(200, b"a.com\nb.com\n", {"ETag": '"v1"', "Cache-Control": "no-cache"})
+
+        async def run():
+            first = await fetch_async(Session(), self.URL, cache=cache)
+            second = await fetch_async(Session(), self.URL, cache=HttpCache(self.root))
+            return first, second
+
+        with patch.dict(sys.modules, {"aiohttp": type(sys)("aiohttp")}):
+            aiohttp = sys.modules["aiohttp"]
+            aiohttp.ClientTimeout = lambda total: total
+            aiohttp.ClientError = type("ClientError", (Exception,), {})
+            first, second = asyncio.run(run())
+        self.assertEqual(first, second)
+        self.assertEqual(second.read_bytes(), b"a.com\nb.com\n")
+        self.assertEqual(calls[1]["If-None-Match"], '"v1"')
+
+
 if __name__ == "__main__":
     unittest.main()
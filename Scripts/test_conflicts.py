@@ -0,0 +1,103 @@
+import io
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from pathlib import Path
+
+from Scripts.conflicts import CONTRADICTION, DUPLICATE, OVERRIDE, SHADOWED, build_index, entry, load_baseline
+from Scripts.rules import parse_line
+
+ADBLOCK = """! Adblock test list
+@@||cdn.test^
+||ads.test^
+||tracker.test^$important
+@@||tracker.test^
+||x.ads.test^$script
+||img.test/banner.png$image
+||redirect.ads.test^$redirect=noopjs
+"""
+
+HOSTLIST = """! Hostlist test list
+ads.test
+sub.ads.test
+static.cdn.test
+0.0.0.0 pixel.test
+pixel.test
+a.pixel.test
+||ads.test^
+"""
+
+
+class TestConflicts(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        root = Path(self.temp_dir.name)
+        (root / "adblock.txt").write_text(ADBLOCK, encoding="utf-8")
+        (root / "hosts.txt").write_text(HOSTLIST, encoding="utf-8")
+        self.index = build_index([root / "adblock.txt", root / "hosts.txt"])
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def findings(self):
+        return {(f.kind, f.rule.origin, f.by.origin) for f in self.index.findings()}
+
+    def test_entries(self):
+        self.assertIsNone(entry(parse_line("||ads.test^$redirect=noopjs"), "l:1"))
+        self.assertIsNone(entry(parse_line("||ads.test^$badfilter"), "l:1"))
+        self.assertIsNone(entry(parse_line("/banner/*"), "l:1"))
+        hosts = entry(parse_line("127.0.0.1 ads.test"), "l:1")
+        self.assertEqual((hosts.host, hosts.full, hosts.subdomains), ("ads.test", True, False))
+        narrow = entry(parse_line("||ads.test^$script,third-party"), "l:1")
+        self.assertEqual((narrow.host, narrow.full, narrow.subdomains), ("ads.test", False, True))
+
+    def test_findings(self):
+        self.assertEqual(
+            self.findings(),
+            {
+                # Blocks under an excepted domain, across files.
+                (OVERRIDE, "hosts.txt:4", "adblock.txt:2"),
+                # Narrower rules under a blocked domain; the $important block of
+                # tracker.test is not overridden by its plain exception.
+                (SHADOWED, "adblock.txt:6", "adblock.txt:3"),
+                (DUPLICATE, "hosts.txt:2", "adblock.txt:3"),
+                (SHADOWED, "hosts.txt:3", "adblock.txt:3"),
+                (DUPLICATE, "hosts.txt:8", "adblock.txt:3"),
+                # Hosts entries cover their own hostname only, not a.pixel.test.
+                (DUPLICATE, "hosts.txt:6", "hosts.txt:5"),
+            },
+        )
+
+    def test_contradiction(self):
+        index = build_index([])
+        block = entry(parse_line("ads.test"), "a:1")
+        exception = entry(parse_line("@@||ads.test^"), "b:1")
+        index.add(block)
+        index.add(exception)
+        finding = index.check(block)
+        self.assertEqual((finding.kind, finding.by), (CONTRADICTION, exception))
+        self.assertIsNone(index.check(exception))
+
+    def test_important_exception_overrides_important_block(self):
+        index = build_index([])
+        block = entry(parse_line("||a.ads.test^$important"), "a:1")
+        index.add(block)
+        index.add(entry(parse_line("@@||ads.test^"), "b:1"))
+        self.assertIsNone(index.check(block))
+        index.add(entry(parse_line("@@||ads.test^$important"), "b:2"))
+        self.assertEqual(index.check(block).kind, OVERRIDE)
+
+    def test_baseline_ignores_line_numbers(self):
+        baseline = Path(self.temp_dir.name) / "baseline.tsv"
+        baseline.write_text(
+            "# accepted\noverride\thosts.txt:40\tstatic.cdn.test\tadblock.txt:1\t@@||cdn.test^\nnot a finding\n",
+            encoding="utf-8",
+        )
+        with redirect_stderr(io.StringIO()):
+            keys = load_baseline(baseline)
+        accepted = {(f.kind, f.rule.origin) for f in self.index.findings() if f.key() in keys}
+        self.assertEqual(accepted, {(OVERRIDE, "hosts.txt:4")})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from Scripts.cosmetic_index import HIDE, PROCEDURAL, STYLE, CosmeticIndex, build_index, css_bytes, selector_type
+from Scripts.rules import parse_line
+
+LIST = """! Cosmetic test list
+##.banner
+~quiet.test##.cookie
+example.test##.promo
+example.test,~shop.example.test##.sidebar
+*.wild.test##.only-sub
+news.*##.paywall
+*##.everywhere:style(height: 1px !important)
+example.test##.banner
+example.test#?#div:has-text(Sponsored)
+example.test#@#.banner
+#@#.cookie
+||ads.test^
+"""
+
+
+class TestCosmeticIndex(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_dir = tempfile.TemporaryDirectory()
+        path = Path(cls.temp_dir.name) / "cosmetic.txt"
+        path.write_text(LIST, encoding="utf-8")
+        cls.index = build_index([path])
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.temp_dir.cleanup()
+
+    def test_selector_types(self):
+        self.assertEqual(selector_type("##", ".ad"), HIDE)
+        self.assertEqual(selector_type("##", ".ad:style(color: red)"), STYLE)
+        self.assertEqual(selector_type("##", "div:has-text(Ad)"), PROCEDURAL)
+        self.assertEqual(selector_type("#$#", ".ad { color: red }"), STYLE)
+        self.assertEqual(selector_type("#?#", "div:has(.ad)"), PROCEDURAL)
+        self.assertEqual(css_bytes(HIDE, ".ad"), len(".ad\n{display:none!important;}\n"))
+
+    def test_generic_payload(self):
+        # .cookie is lifted everywhere by the generic exception.
+        self.assertEqual(self.index.generic, 2)
+        cost = self.index.cost("unrelated.test")
+        self.assertEqual((cost.selectors, cost.specific), (2, 0))
+        everywhere = css_bytes(STYLE, ".everywhere:style(height: 1px !important)")
+        self.assertEqual(cost.css_bytes, css_bytes(HIDE, ".banner") + everywhere)
+
+    def test_specific_rules_and_exceptions(self):
+        cost = self.index.cost("www.example.test")
+        # .banner is excepted on example.test; .promo, .sidebar and the procedural rule apply.
+        self.assertEqual((cost.selectors, cost.specific, cost.procedural), (4, 3, 1))
+        self.assertEqual(cost.origins, ["cosmetic.txt:4", "cosmetic.txt:5", "cosmetic.txt:10"])
+
+    def test_negations(self):
+        self.assertEqual(self.index.cost("shop.example.test").specific, 2)
+        self.assertEqual(self.index.cost("quiet.test").selectors, 2)
+
+    def test_wildcards_and_entities(self):
+        self.assertEqual(self.index.cost("wild.test").specific, 0)
+        self.assertEqual(self.index.cost("a.wild.test").specific, 1)
+        self.assertEqual(self.index.cost("www.news.co.uk").specific, 1)
+        self.assertEqual(self.index.cost("news.de").origins, ["cosmetic.txt:7"])
+
+    def test_generic_negation_only_applies_to_its_rule(self):
+        index = CosmeticIndex()
+        index.add(parse_line("~a.test##.x"), "1")
+        index.add(parse_line("##.x"), "2")
+        index.finish()
+        self.assertEqual(index.cost("a.test").selectors, 1)
+
+    def test_worst_sites(self):
+        worst = self.index.worst(2)
+        self.assertEqual(worst[0].host, "example.test")
+        self.assertGreaterEqual(worst[0].css_bytes, worst[1].css_bytes)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+import json
+import tempfile
+import unittest
+from collections import Counter
+from pathlib import Path
+from unittest.mock import patch
+
+from Scripts import dead_rules
+from Scripts.dead_rules import _batches, iter_log, replay
+from Scripts.dead_rules import dead_rules as find_dead
+from Scripts.matcher import load_matcher
+
+RULES = "! Test list\n||ads.test^\n||unused.test^\n/pixel.gif$image\n@@||ads.test/ok^\n@@||never.test^\n"
+
+HAR = {
+    "log": {
+        "version": "1.2",
+        "pages": [{"id": "page_1", "title": "https://news.test/"}, {"id": "page_2", "title": "News"}],
+        "entries": [
+            {
+                "pageref": "page_1",
+                "_resourceType": "script",
+                "request": {"method": "GET", "url": "https://ads.test/a.js"},
+            },
+            {
+                "pageref": "page_2",
+                "request": {
+                    "method": "GET",
+                    "url": "https://cdn.test/pixel.gif",
+                    "headers": [{"name": "Referer", "value": "https://blog.test/"}],
+                },
+                "response": {"content": {"mimeType": "image/gif", "text": "x" * 100}},
+            },
+            {"request": {"method": "POST", "url": "https://ads.test/ok/x"}, "_resourceType": "xhr"},
+            {"request": {}},
+        ],
+    }
+}
+
+
+class TestDeadRules(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.root = Path(self.temp_dir.name)
+        self.list_path = self.root / "list.txt"
+        self.list_path.write_text(RULES, encoding="utf-8")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_har_is_streamed_entry_by_entry(self):
+        har = self.root / "session.json"
+        har.write_text(json.dumps(HAR, indent=1), encoding="utf-8")
+        with patch.object(dead_rules, "HAR_CHUNK", 16):
+            fields = list(iter_log(har))
+        self.assertEqual(
+            fields,
+            [
+                ("https://ads.test/a.js", "https://news.test/", "script", "GET"),
+                ("https://cdn.test/pixel.gif", "https://blog.test/", "image", "GET"),
+                ("https://ads.test/ok/x", "", "xhr", "POST"),
+                None,
+            ],
+        )
+
+    def test_jsonl_log(self):
+        corpus = self.root / "log.jsonl"
+        corpus.write_text('{"url": "https://ads.test/", "type": "script"}\n{"url": 1}\n', encoding="utf-8")
+        self.assertEqual(list(iter_log(corpus)), [("https://ads.test/", "", "script", "get"), None])
+
+    def test_replay_lists_rules_without_hits(self):
+        har = self.root / "session.har"
+        har.write_text(json.dumps(HAR), encoding="utf-8")
+        matcher = load_matcher([self.list_path])
+        invalid: Counter[str] = Counter()
+        for workers in (1, 2):
+            with self.subTest(workers=workers):
+                batches = _batches(iter_log(har), 2, invalid)
+                hits, requests = replay(matcher, [self.list_path], batches, workers)
+                self.assertEqual(requests, 3)
+                self.assertEqual(hits, {"list.txt:2": 2, "list.txt:4": 1, "list.txt:5": 1})
+                dead = find_dead(matcher, hits)
+                self.assertEqual(dead, [("list.txt:3", "||unused.test^"), ("list.txt:6", "@@||never.test^")])
+        self.assertEqual(invalid["entries"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
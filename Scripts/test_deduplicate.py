@@ -88,6 +88,9 @@ class TestDeduplicate(unittest.TestCase):
         self.assertFalse(is_valid_rule("||-start.com^"))
         self.assertFalse(is_valid_rule("||end-.com^"))
 
+        # Paths after the anchored hostname are kept
+        self.assertTrue(is_valid_rule("||example.com/ads.js$script"))
+
     def test_find_cross_file_duplicates(self):
         file_rules = {
             "file1.txt": ["rule1.com", "rule2.com", "rule3.com"],
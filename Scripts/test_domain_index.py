@@ -0,0 +1,113 @@
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from Scripts import domain_index
+from Scripts.domain_index import DomainIndex, parent_domains, sorted_lookup
+from Scripts.move_pure_domains import apply_updates, scan_adblock_files
+
+
+class TestSortedLookup(unittest.TestCase):
+    def test_every_key_and_gaps(self):
+        lines = sorted(f"d{i}.com\tf{i}.txt" for i in range(50))
+        buf = "\n".join(lines).encode()
+        for line in lines:
+            key, value = line.encode().split(b"\t")
+            self.assertEqual(sorted_lookup(buf, key), value)
+            self.assertEqual(sorted_lookup(buf + b"\n", key), value)
+        for missing in (b"", b"a.com", b"d1.co", b"d10.com0", b"zz.com"):
+            self.assertIsNone(sorted_lookup(buf, missing), missing)
+        self.assertIsNone(sorted_lookup(b"", b"a.com"))
+
+    def test_parent_domains(self):
+        self.assertEqual(parent_domains("a.b.example.com"), ["a.b.example.com", "b.example.com", "example.com"])
+        self.assertEqual(parent_domains("localhost"), ["localhost"])
+
+
+class TestDomainIndex(unittest.TestCase):
+    def setUp(self):
+        self._temp = tempfile.TemporaryDirectory()
+        self.root = Path(self._temp.name)
+        self.hostlist_dir = self.root / "hostlist"
+        self.hostlist_dir.mkdir()
+        (self.hostlist_dir / "Ads.txt").write_text("! comment\nb.com\n||x.com^\na.com\n", encoding="utf-8")
+        (self.hostlist_dir / "Other.txt").write_text("example.org\na.com\n", encoding="utf-8")
+        (self.hostlist_dir / "exclusions.txt").write_text("keep.com\n", encoding="utf-8")
+
+    def tearDown(self):
+        self._temp.cleanup()
+
+    def test_lookup_spans_all_hostlists(self):
+        index = DomainIndex.open(self.hostlist_dir, self.root / "idx")
+        self.assertEqual(
+            index.lookup(["a.com", "b.com", "example.org", "x.com", "keep.com"]),
+            {"a.com": "Ads.txt", "b.com": "Ads.txt", "example.org": "Other.txt"},
+        )
+        self.assertIn("example.org", index)
+        self.assertNotIn("cdn.example.org", index)
+        self.assertEqual(index.covering("cdn.example.org"), ("example.org", "Other.txt"))
+        self.assertIsNone(index.covering("example.net"))
+
+    def test_missing_skips_covered_domains(self):
+        index = DomainIndex.open(self.hostlist_dir, self.root / "idx")
+        batch = ["c.com", "a.com", "c.com", "ads.b.com", "new.net", "cdn.new.net", "keep.com"]
+        self.assertEqual(index.missing(batch), ["c.com", "keep.com", "new.net"])
+
+    def test_add_and_compact_without_rereading(self):
+        index = DomainIndex.open(self.hostlist_dir, self.root / "idx")
+        with (self.hostlist_dir / "Other.txt").open("a", encoding="utf-8") as f:
+            f.write("c.com\n")
+        index.add(["c.com"], "Other.txt")
+
+        # A valid index is reused without re-reading the hostlists.
+        with patch.object(domain_index, "validate_domains", side_effect=AssertionError):
+            reopened = DomainIndex.open(self.hostlist_dir, self.root / "idx")
+            self.assertEqual(reopened.get("c.com"), "Other.txt")
+            reopened.compact()
+            self.assertEqual(
+                reopened.base.read_text(encoding="utf-8"),
+                "a.com\tAds.txt\nb.com\tAds.txt\nc.com\tOther.txt\nexample.org\tOther.txt\n",
+            )
+            self.assertEqual(reopened.missing(["www.c.com", "d.com"]), ["d.com"])
+
+    def test_rebuilds_after_external_change(self):
+        DomainIndex.open(self.hostlist_dir, self.root / "idx")
+        (self.hostlist_dir / "Other.txt").write_text("z.com\n", encoding="utf-8")
+        (self.hostlist_dir / "New.txt").write_text("n.com\n", encoding="utf-8")
+        index = DomainIndex.open(self.hostlist_dir, self.root / "idx")
+        self.assertEqual(index.missing(["example.org", "z.com", "n.com"]), ["example.org"])
+
+    def test_apply_updates_dedupes_across_hostlists(self):
+        moves = {
+            "Ads.txt": {"a.txt": ["ads.example.org", "new.com"]},
+            "Other.txt": {"b.txt": ["new.com", "b.com", "fresh.io", "cdn.fresh.io"]},
+        }
+        self.assertEqual(apply_updates(self.hostlist_dir, moves, {}, self.root / "idx"), 2)
+        with patch.object(domain_index, "validate_domains", side_effect=AssertionError):
+            moves = {"Games.txt": {"c.txt": ["new.com", "play.fresh.io", "game.net"]}}
+            self.assertEqual(apply_updates(self.hostlist_dir, moves, {}, self.root / "idx"), 1)
+        self.assertEqual((self.hostlist_dir / "Ads.txt").read_text(encoding="utf-8").splitlines()[-1], "new.com")
+        other = (self.hostlist_dir / "Other.txt").read_text(encoding="utf-8")
+        self.assertEqual(other, "example.org\na.com\nfresh.io\n")
+        self.assertEqual((self.hostlist_dir / "Games.txt").read_text(encoding="utf-8"), "game.net\n")
+
+
+class TestParallelScan(unittest.TestCase):
+    def test_workers_match_single_process(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            adblock_dir = Path(temp_dir)
+            for i in range(3):
+                content = f"! list {i}\n||ads{i}.com^\npure{i}.com\nads-{i}.net\n##.banner\n"
+                (adblock_dir / f"list{i}.txt").write_text(content, encoding="utf-8")
+            (adblock_dir / "Spotify.txt").write_text("||only.rules^\n", encoding="utf-8")
+
+            single = scan_adblock_files(adblock_dir, workers=1)
+            parallel = scan_adblock_files(adblock_dir, workers=2)
+        self.assertEqual(parallel, single)
+        self.assertEqual(single[0]["Ads.txt"]["list1.txt"], ["ads-1.net"])
+        self.assertNotIn(adblock_dir / "Spotify.txt", single[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
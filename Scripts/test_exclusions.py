@@ -0,0 +1,85 @@
+import io
+import json
+import tempfile
+import unittest
+from contextlib import redirect_stderr
+from pathlib import Path
+
+from Scripts.exclusions import Exclusions, config_sources, load_exclusions
+
+
+class TestExclusions(unittest.TestCase):
+    def test_entry_kinds(self):
+        exclusions = Exclusions(
+            [
+                "! comment",
+                "example.com",
+                "@@||allowed.net^$important",
+                "*.cdn.org",
+                "ads*.tracker.io",
+                "/^telemetry[0-9]*\\./",
+                "/(?i)Shop/",
+                "not a domain",
+            ]
+        )
+        cases = {
+            "example.com": "example.com",
+            "www.example.com": "example.com",
+            "badexample.com": None,
+            "allowed.net": "@@||allowed.net^$important",
+            "cdn.org": None,
+            "img.cdn.org": "*.cdn.org",
+            "ads1.tracker.io": "ads*.tracker.io",
+            "x.ads1.tracker.io": None,
+            "telemetry2.example.org": "/^telemetry[0-9]*\\./",
+            "a.telemetry.org": None,
+            "myshop.io": "/(?i)Shop/",
+        }
+        for host, entry in cases.items():
+            with self.subTest(host=host):
+                self.assertEqual(exclusions.match(host), entry)
+        self.assertEqual(len(exclusions), 6)
+        self.assertEqual(exclusions.skipped, ["not a domain"])
+
+    def test_unanchored_alternation_is_searched(self):
+        exclusions = Exclusions(["/^a\\.com|promo/"])
+        self.assertEqual(exclusions.match("x.promo.net"), "/^a\\.com|promo/")
+
+    def test_filter_counts_hits(self):
+        exclusions = Exclusions(["example.com", "*.b.org"])
+        kept = list(exclusions.filter(["a.com", "example.com", "x.example.com", "b.org", "c.b.org"]))
+        self.assertEqual(kept, ["a.com", "b.org"])
+        self.assertEqual(exclusions.hits, {"example.com": 2, "*.b.org": 1})
+        self.assertEqual(exclusions.dropped, {"example.com", "x.example.com", "c.b.org"})
+
+    def test_load_from_config(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "Filters").mkdir()
+            (root / "Filters" / "exclusions.txt").write_text("! allow\n||keep.com^\n", encoding="utf-8")
+            (root / "extra.txt").write_text("extra.net\n", encoding="utf-8")
+            config = {
+                "exclusions": ["inline.org"],
+                "exclusions_sources": ["Filters/exclusions.txt"],
+                "sources": [{"source": "a.txt", "exclusions_sources": ["Filters/exclusions.txt", "missing.txt"]}],
+            }
+            (root / "conf.json").write_text(json.dumps(config), encoding="utf-8")
+
+            self.assertEqual(
+                config_sources(root / "conf.json"), (["inline.org"], ["Filters/exclusions.txt", "missing.txt"])
+            )
+            stderr = io.StringIO()
+            with redirect_stderr(stderr):
+                exclusions = load_exclusions(root / "conf.json", [str(root / "extra.txt")])
+            # A missing file named by the config is optional; a missing extra source is an error.
+            self.assertEqual(stderr.getvalue(), "")
+            with redirect_stderr(stderr):
+                load_exclusions(None, [str(root / "gone.txt")])
+            self.assertIn("gone.txt", stderr.getvalue())
+        for host in ("keep.com", "inline.org", "a.extra.net"):
+            self.assertIsNotNone(exclusions.match(host), host)
+        self.assertIsNone(exclusions.match("other.com"))
+
+
+if __name__ == "__main__":
+    unittest.main()
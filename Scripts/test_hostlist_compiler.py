@@ -0,0 +1,148 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from Scripts.hostlist_compiler import (
+    apply_transformations,
+    compile_config,
+    compile_file,
+    compress,
+    filter_patterns,
+    remove_modifiers,
+    validate,
+)
+
+
+class TestTransformations(unittest.TestCase):
+    def test_compress_converts_and_drops_covered_subdomains(self):
+        lines = [
+            "0.0.0.0 ads.example.com tracker.example.org",
+            "example.com",
+            "||sub.example.org^",
+            "example.org##.banner",
+        ]
+        self.assertEqual(
+            compress(lines),
+            ["||tracker.example.org^", "||example.com^", "||sub.example.org^", "example.org##.banner"],
+        )
+
+    def test_compress_deduplicates_hosts(self):
+        self.assertEqual(compress(["ads.com", "||ads.com^", "127.0.0.1 ads.com"]), ["||ads.com^"])
+
+    def test_remove_modifiers(self):
+        lines = ["||ads.com^$third-party", "||ads.com^$3p,important", "||x.com^$popup,doc", "example.com##.ad$"]
+        self.assertEqual(
+            list(remove_modifiers(lines)),
+            ["||ads.com^", "||ads.com^$important", "||x.com^", "example.com##.ad$"],
+        )
+
+    def test_validate(self):
+        lines = [
+            "! comment",
+            "||ads.example.com^",
+            "||ads.example.com^$important",
+            "||ads.example.com^$script",
+            "||ads.example.com/path^",
+            "example.com##.banner",
+            "/banner.js",
+            "/^ad[0-9]+\\.example\\.com$/",
+            "||*.com^",
+            "||*.ads.com^",
+            "||1.2.3.4^",
+            "@@||allowed.example.com^",
+            "0.0.0.0 ads.com",
+        ]
+        self.assertEqual(
+            list(validate(lines)),
+            [
+                "! comment",
+                "||ads.example.com^",
+                "||ads.example.com^$important",
+                "/^ad[0-9]+\\.example\\.com$/",
+                "||*.ads.com^",
+                "@@||allowed.example.com^",
+                "0.0.0.0 ads.com",
+            ],
+        )
+        self.assertIn("||1.2.3.4^", list(validate(["||1.2.3.4^"], allow_ip=True)))
+
+    def test_fixed_transformation_order(self):
+        # RemoveModifiers runs after Compress, so the stripped rule is not compressed,
+        # but Validate still sees the cleaned rule.
+        lines = ["! c", "||a.example.com^$third-party", "example.com", "  b.example.com  "]
+        out = list(
+            apply_transformations(lines, ["Validate", "RemoveModifiers", "Compress", "RemoveComments", "TrimLines"])
+        )
+        self.assertEqual(out, ["||a.example.com^", "||example.com^"])
+
+    def test_unknown_transformation(self):
+        with self.assertRaises(ValueError):
+            list(apply_transformations([], ["Bogus"]))
+
+    def test_convert_to_ascii(self):
+        out = list(apply_transformations(["||пример.рф^"], ["ConvertToAscii"]))
+        self.assertEqual(out, ["||xn--e1afmkfd.xn--p1ai^"])
+
+    def test_filter_patterns(self):
+        lines = ["||ads.com^", "||good.com^", "||tracker.net^", "||cdn.ads.org^"]
+        self.assertEqual(
+            list(filter_patterns(lines, exclusions=["good", "/^\\|\\|tracker/"])),
+            ["||ads.com^", "||cdn.ads.org^"],
+        )
+        self.assertEqual(list(filter_patterns(lines, inclusions=["*ads.*"])), ["||ads.com^", "||cdn.ads.org^"])
+
+
+class TestCompileConfig(unittest.TestCase):
+    def test_compile_config_file(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "a.txt").write_text(
+                "! Title: A\n||ads.example.com^$third-party\nexample.com##.ad\nexample.com\n", encoding="utf-8"
+            )
+            (root / "b.txt").write_text("0.0.0.0 tracker.net\n||ads.example.com^\n", encoding="utf-8")
+            (root / "exclusions.txt").write_text("! allow\ntracker.net\n", encoding="utf-8")
+            config = {
+                "name": "Test",
+                "sources": [
+                    {"source": "a.txt", "type": "adblock"},
+                    {"source": "b.txt", "type": "hosts", "exclusions_sources": ["exclusions.txt"]},
+                ],
+                "transformations": [
+                    "RemoveComments",
+                    "RemoveModifiers",
+                    "Validate",
+                    "Deduplicate",
+                    "Compress",
+                    "InsertFinalNewLine",
+                ],
+            }
+            config_path = root / "config.json"
+            config_path.write_text(json.dumps(config), encoding="utf-8")
+            output = root / "out" / "hostlist.txt"
+
+            self.assertTrue(compile_file(config_path, output))
+            text = output.read_text(encoding="utf-8")
+            self.assertTrue(text.startswith("!\n! Title: Test\n"))
+            self.assertTrue(text.endswith("\n"))
+            rules = [line for line in text.splitlines() if not line.startswith("!")]
+            self.assertEqual(rules, ["||ads.example.com^", "||example.com^"])
+
+    def test_output_without_final_newline(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            (root / "a.txt").write_text("||ads.example.com^\n", encoding="utf-8")
+            config_path = root / "config.json"
+            config_path.write_text(json.dumps({"name": "T", "sources": [{"source": "a.txt"}]}), encoding="utf-8")
+            output = root / "hostlist.txt"
+
+            self.assertTrue(compile_file(config_path, output))
+            self.assertTrue(output.read_text(encoding="utf-8").endswith("!\n||ads.example.com^"))
+
+    def test_missing_source_is_skipped(self):
+        lines = compile_config({"name": "T", "sources": [{"source": "/nonexistent/list.txt"}]})
+        self.assertEqual([line for line in lines if not line.startswith("!")], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
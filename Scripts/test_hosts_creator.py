@@ -0,0 +1,195 @@
+import gzip
+import io
+import tempfile
+import time
+import unittest
+import urllib.response
+from email.message import Message
+from pathlib import Path
+from unittest.mock import patch
+
+from Scripts import hosts_creator
+from Scripts.common import HttpCache
+from Scripts.exclusions import Exclusions
+from Scripts.hosts_creator import (
+    LOCAL_LINES,
+    collapse_subdomains,
+    download,
+    parse_hosts_line,
+    process,
+    replace,
+    summarize,
+)
+
+SOURCES = {
+    "https://a.test/hosts": b"# A\r\n127.0.0.1 localhost\r\n0.0.0.0 ads.com\r\n0.0.0.0 tracker.net # inline\r\n"
+    b"127.0.0.1 ADS.com\n",
+    "https://b.test/hosts": b"ads.com\n0.0.0.0  tracker.net cdn.ads.com\n\n:: b.org.",
+    "https://c.test/hosts": b"0.0.0.0 c.com\n",
+}
+
+
+def fake_urlopen(req, timeout=None):
+    body = SOURCES.get(req.full_url)
+    if body is None:
+        raise OSError("unreachable")
+    return urllib.response.addinfourl(io.BytesIO(body), Message(), req.full_url, 200)
+
+
+class TestProcess(unittest.TestCase):
+    def test_parse_hosts_line(self):
+        self.assertEqual(parse_hosts_line("0.0.0.0  Ads.com  b.com. # x"), ("0.0.0.0", ["ads.com", "b.com"]))
+        self.assertEqual(parse_hosts_line("::1 localhost ip6-loopback"), ("::1", []))
+        self.assertEqual(parse_hosts_line("1hosts.cf"), (None, ["1hosts.cf"]))
+        self.assertEqual(parse_hosts_line("0.0.0.0 0.0.0.0"), ("0.0.0.0", []))
+        self.assertEqual(parse_hosts_line("# only a comment"), (None, []))
+
+    def test_dedupes_on_hostnames_across_calls(self):
+        seen: set[str] = set()
+        lines = ["# c", " 0.0.0.0 a.com ", "", "127.0.0.1 localhost", "0.0.0.0 a.com b.com # x"]
+        first = list(process(lines, seen, True, True, True))
+        second = list(process(["127.0.0.1 A.com", "c.com", "10.0.0.1 a.com"], seen, True, True, True, sink="::"))
+        self.assertEqual(first, ["0.0.0.0 a.com", "0.0.0.0 b.com"])
+        self.assertEqual(second, [":: c.com"])
+        self.assertEqual(seen, {"a.com", "b.com", "c.com"})
+
+    def test_drops_tokens_that_are_not_domains(self):
+        lines = ["0.0.0.0 ads.com bad_host.com -x.com", "0.0.0.0 intranet", "+garbage$"]
+        self.assertEqual(list(process(lines, set(), True, True, True)), ["0.0.0.0 ads.com"])
+
+    def test_keeps_comments_redirects_and_duplicates_when_asked(self):
+        lines = ["# c", "", "0.0.0.0 a.com", "127.0.0.1 a.com", "10.0.0.1 lan.example"]
+        out = list(process(lines, set(), False, True, False))
+        self.assertEqual(out, ["# c", "", "0.0.0.0 a.com", "0.0.0.0 a.com", "10.0.0.1 lan.example"])
+
+    def test_exclusions_apply_in_the_same_pass(self):
+        exclusions = Exclusions(["good.com", "/^cdn\\./"])
+        seen: set[str] = set()
+        lines = [
+            "0.0.0.0 good.com a.good.com ads.com",
+            "cdn.ads.com",
+            "good.com",
+            "10.0.0.1 nas.good.com",
+            "10.0.0.2 lan.good.com nas.home # inline",
+        ]
+        out = list(process(lines, seen, True, True, True, exclusions=exclusions))
+        self.assertEqual(out, ["0.0.0.0 ads.com", "10.0.0.2 nas.home"])
+        self.assertEqual(exclusions.hits, {"good.com": 4, "/^cdn\\./": 1})
+
+    def test_collapse_subdomains(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "hosts-new"
+            path.write_text("127.0.0.1 box\n0.0.0.0 a.ads.com\n0.0.0.0 ads.com\n0.0.0.0 x.com\n", encoding="utf-8")
+            self.assertEqual(collapse_subdomains(path, {"ads.com", "a.ads.com", "x.com"}), 1)
+            self.assertEqual(path.read_text(encoding="utf-8"), "127.0.0.1 box\n0.0.0.0 ads.com\n0.0.0.0 x.com\n")
+
+
+def slow_urlopen(req, timeout=None):
+    # b.test finishes last, so arrival order differs from URL order.
+    if req.full_url == "https://b.test/hosts":
+        time.sleep(0.05)
+    return fake_urlopen(req, timeout)
+
+
+class TestDownload(unittest.TestCase):
+    def _download(self, root: Path, urls: list[str], urlopen=fake_urlopen) -> tuple[set[str], bytes]:
+        new_path = root / "hosts-new"
+        with (
+            patch("urllib.request.urlopen", urlopen),
+            patch("Scripts.common.http_cache", return_value=HttpCache(root / "http")),
+            patch.object(hosts_creator, "FETCH_CHUNK", 7),
+            patch.object(hosts_creator, "_resolve_host", return_value="127.0.0.1 box localhost"),
+        ):
+            hosts = download(urls, new_path)
+        return hosts, new_path.read_bytes()
+
+    def test_streams_all_sources_into_one_file_in_url_order(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            hosts, data = self._download(Path(temp_dir), [*SOURCES, "https://down.test/hosts"], slow_urlopen)
+        lines = data.decode().splitlines()
+        self.assertEqual(lines[:3], ["127.0.0.1 box localhost", *LOCAL_LINES])
+        expected = ["ads.com", "tracker.net", "cdn.ads.com", "b.org", "c.com"]
+        self.assertEqual(lines[3:], [f"0.0.0.0 {h}" for h in expected])
+        self.assertEqual(hosts, set(expected))
+
+    def test_collapse_ignores_redirect_only_parents(self):
+        source = b"10.0.0.1 example.com\n0.0.0.0 ads.example.com\n0.0.0.0 example.net\n0.0.0.0 a.example.net\n"
+        with tempfile.TemporaryDirectory() as temp_dir, patch.dict(SOURCES, {"https://r.test/hosts": source}):
+            root = Path(temp_dir)
+            blocked, _ = self._download(root, ["https://r.test/hosts"])
+            self.assertEqual(blocked, {"ads.example.com", "example.net", "a.example.net"})
+            self.assertEqual(collapse_subdomains(root / "hosts-new", blocked), 1)
+            lines = (root / "hosts-new").read_text(encoding="utf-8").splitlines()
+        self.assertEqual(lines[3:], ["10.0.0.1 example.com", "0.0.0.0 ads.example.com", "0.0.0.0 example.net"])
+
+    def test_runs_are_byte_identical(self):
+        outputs = []
+        for urlopen in (fake_urlopen, slow_urlopen):
+            with tempfile.TemporaryDirectory() as temp_dir:
+                outputs.append(self._download(Path(temp_dir), list(SOURCES), urlopen)[1])
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_worker_errors_propagate(self):
+        def broken_urlopen(req, timeout=None):
+            if req.full_url == "https://b.test/hosts":
+                raise ValueError("bad response")
+            return fake_urlopen(req, timeout)
+
+        with tempfile.TemporaryDirectory() as temp_dir, self.assertRaisesRegex(ValueError, "bad response"):
+            self._download(Path(temp_dir), list(SOURCES), broken_urlopen)
+
+    def test_second_run_with_unchanged_sources_installs_nothing(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            hosts_file = root / "hosts"
+            hosts_file.write_text("127.0.0.1 box localhost\n0.0.0.0 old.com\n", encoding="utf-8")
+            installed = []
+            with patch.object(hosts_creator, "BACKUP_DIR", root / "backups"):
+                for n, urlopen in enumerate((fake_urlopen, slow_urlopen)):
+                    run = root / str(n)
+                    run.mkdir()
+                    self._download(run, list(SOURCES), urlopen)
+                    installed.append(replace(run / "hosts-new", hosts_file, "hosts.backup"))
+            self.assertEqual(installed, [True, False])
+            self.assertIn("0.0.0.0 c.com", hosts_file.read_text(encoding="utf-8"))
+
+
+class TestReplace(unittest.TestCase):
+    def test_installs_only_changes_and_rotates_backups(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            hosts_file = root / "etc" / "hosts"
+            hosts_file.parent.mkdir()
+            hosts_file.write_text("127.0.0.1 box\n0.0.0.0 old.com\n0.0.0.0 kept.com\n", encoding="utf-8")
+            new_path = root / "hosts-new"
+            with patch.object(hosts_creator, "BACKUP_DIR", root / "backups"):
+                for n in range(3):
+                    new_path.write_text(f"127.0.0.1 box\n0.0.0.0 kept.com\n0.0.0.0 new{n}.com\n", encoding="utf-8")
+                    self.assertTrue(replace(new_path, hosts_file, "hosts.backup", keep=2))
+                    self.assertFalse(new_path.exists())
+
+                new_path.write_text(hosts_file.read_text(encoding="utf-8"), encoding="utf-8")
+                before = hosts_file.stat().st_mtime_ns
+                self.assertFalse(replace(new_path, hosts_file, "hosts.backup", keep=2))
+                self.assertEqual(hosts_file.stat().st_mtime_ns, before)
+
+            backups = sorted((root / "backups").iterdir())
+            self.assertEqual(len(backups), 2)
+            self.assertFalse(new_path.exists())
+            self.assertIn("new2.com", hosts_file.read_text(encoding="utf-8"))
+            self.assertEqual(list(hosts_file.parent.iterdir()), [hosts_file])
+            with gzip.open(backups[-1], "rt", encoding="utf-8") as f:
+                self.assertIn("new1.com", f.read())
+
+    def test_summarize(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            old = Path(temp_dir) / "old"
+            new = Path(temp_dir) / "new"
+            old.write_text("0.0.0.0 a.com b.com\n", encoding="utf-8")
+            new.write_text("# x\n0.0.0.0 b.com\n0.0.0.0 c.com\n", encoding="utf-8")
+            self.assertEqual(summarize(old, new), (["c.com"], ["a.com"]))
+            self.assertEqual(summarize(Path(temp_dir) / "missing", old), (["a.com", "b.com"], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
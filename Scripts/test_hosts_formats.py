@@ -0,0 +1,45 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from Scripts.hosts_formats import FORMATS, parse_formats, write_formats
+
+
+class TestHostsFormats(unittest.TestCase):
+    def test_parse_formats(self):
+        self.assertEqual(parse_formats("hosts, dnsmasq,hosts"), ["hosts", "dnsmasq"])
+        with self.assertRaises(ValueError):
+            parse_formats("hosts,bogus")
+        with self.assertRaises(ValueError):
+            parse_formats(" , ")
+
+    def test_write_all_formats(self):
+        domains = ["a.com", "b.com", "c.com"]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            out_dir = Path(temp_dir)
+            paths = write_formats(domains, out_dir, list(FORMATS), ("Title",), hosts_per_line=2)
+
+            def body(name: str) -> list[str]:
+                return paths[name].read_text(encoding="utf-8").splitlines()
+
+            self.assertEqual(body("hosts"), ["# Title", "0.0.0.0 a.com", "0.0.0.0 b.com", "0.0.0.0 c.com"])
+            self.assertEqual(body("compressed"), ["# Title", "0.0.0.0 a.com b.com", "0.0.0.0 c.com"])
+            self.assertEqual(body("dnsmasq")[1:], ["local=/a.com/", "local=/b.com/", "local=/c.com/"])
+            self.assertEqual(body("unbound")[1], 'local-zone: "a.com." always_null')
+            self.assertEqual(body("adguard"), ["! Title", "||a.com^", "||b.com^", "||c.com^"])
+
+            rpz = body("rpz")
+            self.assertEqual(rpz[0], "; Title")
+            self.assertTrue(rpz[1].startswith("$TTL"))
+            self.assertIn("a.com CNAME .", rpz)
+            self.assertIn("*.a.com CNAME .", rpz)
+
+    def test_single_pass_over_generator(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            paths = write_formats((d for d in ["x.org", "y.org"]), Path(temp_dir), ["hosts", "adguard"])
+            self.assertEqual(paths["adguard"].read_text(encoding="utf-8"), "||x.org^\n||y.org^\n")
+            self.assertEqual(paths["hosts"].read_text(encoding="utf-8"), "0.0.0.0 x.org\n0.0.0.0 y.org\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
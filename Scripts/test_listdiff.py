@@ -0,0 +1,74 @@
+import unittest
+from unittest.mock import patch
+
+from Scripts import listdiff
+from Scripts.listdiff import diff, host_change, normalize
+from Scripts.rules import COSMETIC, HOSTNAME, NETWORK, parse_line
+
+OLD = """! Title: Old
+||ads.test^
+||tracker.test^$script,third-party,domain=b.test|a.test
+example.test,news.test##.banner
+0.0.0.0 pixel.test
+||parent.test^
+||gone.test^
+@@||cdn.test^
+||cdn.test^
+||moved.test^
+"""
+
+NEW = """! Title: New
+||Tracker.test^$third-party,script,domain=a.test|b.test
+news.test,example.test##.banner
+||ads.test^
+pixel.test
+||parent.test^
+sub.parent.test
+||fresh.test^
+||cdn.test^
+moved.test
+example.test##.promo
+"""
+
+
+class TestListDiff(unittest.TestCase):
+    def test_normalize(self):
+        self.assertEqual(
+            normalize(parse_line("||Ads.test^$Script,domain=b.test|a.test")),
+            (NETWORK, "||ads.test^$domain=a.test|b.test,script"),
+        )
+        self.assertEqual(normalize(parse_line("127.0.0.1 ads.test")), (HOSTNAME, "ads.test"))
+        self.assertEqual(normalize(parse_line("b.test,a.test##.ad")), (COSMETIC, "a.test,b.test##.ad"))
+        self.assertIsNone(normalize(parse_line("! comment")))
+        self.assertEqual(host_change(NETWORK, "@@||ads.test^"), ("ads.test", False))
+        self.assertEqual(host_change(NETWORK, "||ads.test^$important"), ("ads.test", True))
+        self.assertIsNone(host_change(NETWORK, "||ads.test^$script"))
+
+    def check(self, d):
+        self.assertEqual(d.added[NETWORK], ["||fresh.test^"])
+        self.assertEqual(d.removed[NETWORK], ["@@||cdn.test^", "||gone.test^", "||moved.test^"])
+        self.assertEqual(d.added[COSMETIC], ["example.test##.promo"])
+        self.assertEqual(d.added[HOSTNAME], ["moved.test", "sub.parent.test"])
+        self.assertNotIn(COSMETIC, d.removed)
+        # sub.parent.test was already covered and moved.test only changed form;
+        # dropping the exception blocks cdn.test again.
+        self.assertEqual(d.newly_blocked, ["cdn.test", "fresh.test"])
+        self.assertEqual(d.unblocked, ["gone.test"])
+        self.assertEqual((d.old_rules, d.new_rules), (9, 10))
+
+    def test_diff_in_memory(self):
+        self.check(diff(OLD.splitlines(), NEW.splitlines()))
+
+    def test_diff_spills_to_buckets(self):
+        with patch.object(listdiff, "BUCKET_BYTES", 64):
+            d = diff(OLD.splitlines(), NEW.splitlines(), size=len(OLD) + len(NEW))
+        self.check(d)
+
+    def test_unchanged(self):
+        d = diff(OLD.splitlines(), OLD.splitlines()[::-1])
+        self.assertFalse(d.changed)
+        self.assertEqual((d.newly_blocked, d.unblocked), ([], []))
+
+
+if __name__ == "__main__":
+    unittest.main()
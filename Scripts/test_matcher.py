@@ -0,0 +1,142 @@
+import json
+import tempfile
+import unittest
+from pathlib import Path
+
+from Scripts.matcher import ALLOWED, BLOCKED, Matcher, Request, base_domain, evaluate, iter_corpus, url_host
+from Scripts.rules import parse_line
+
+RULES = [
+    "||ads.example.com^",
+    "tracker.net",
+    "/banner/*/img^",
+    "||cdn.test^$script,3p",
+    "||login.test^$3p,domain=~partner.org",
+    "@@||login.test^$domain=friend.com",
+    "||widgets.test^$subdocument,~3p",
+    "||post.test/api$method=post",
+    "||x.test^$important",
+    "@@||x.test^",
+    "||y.test^$important",
+    "@@||y.test^$important,domain=friend.com",
+    "@@||safe-site.org^$document",
+    "||unsafe.test^$denyallow=ok.unsafe.test",
+    "||entity.test^$domain=shop.*",
+    "|https://exact.test/path|",
+    "/^https:\\/\\/re[0-9]+\\.test\\//$image",
+    "||dropped.test^",
+    "||dropped.test^$badfilter",
+    "||csp.test^$csp=default-src 'none'",
+    "$removeparam=utm_source",
+    "example.org##.ad",
+]
+
+
+def build(rules=RULES) -> Matcher:
+    return Matcher.from_rules((parse_line(line), f"list.txt:{n}") for n, line in enumerate(rules, 1))
+
+
+class TestRequests(unittest.TestCase):
+    def test_hosts_and_parties(self):
+        self.assertEqual(url_host("https://user@Sub.Example.COM:8443/x?y#z"), "sub.example.com")
+        self.assertEqual(url_host("example.org"), "example.org")
+        self.assertEqual(base_domain("a.b.example.co.uk"), "example.co.uk")
+        self.assertEqual(base_domain("cdn.example.com"), "example.com")
+        self.assertFalse(Request("https://cdn.example.com/a.js", "https://www.example.com/").third_party)
+        self.assertTrue(Request("https://cdn.other.com/a.js", "https://www.example.com/").third_party)
+        self.assertFalse(Request("https://cdn.other.com/a.js").third_party)
+
+
+class TestMatcher(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.matcher = build()
+
+    def verdict(self, url, source="https://page.test/", kind="script", method="get"):
+        verdict = self.matcher.match(Request(url, source, kind, method))
+        if verdict is None:
+            return None
+        exception = verdict.exception.text if verdict.exception else None
+        return verdict.result, verdict.rule.text, exception
+
+    def test_index_contents(self):
+        self.assertEqual(self.matcher.skipped, {"csp": 1, "removeparam": 1})
+        self.assertEqual(self.matcher.badfiltered, 1)
+        self.assertEqual(build(["tracker.net", "||tracker.net^", "tracker.net"]).duplicates, 2)
+
+    def test_patterns(self):
+        cases = [
+            ("https://ads.example.com/x.js", ("blocked", "||ads.example.com^", None)),
+            ("https://a.ads.example.com/x.js", ("blocked", "||ads.example.com^", None)),
+            ("https://badads.example.com/x.js", None),
+            ("https://tracker.net/p", ("blocked", "tracker.net", None)),
+            ("https://s.test/banner/big/img/1.png", ("blocked", "/banner/*/img^", None)),
+            ("https://s.test/banner/big/imgs/1.png", None),
+            ("https://exact.test/path", ("blocked", "|https://exact.test/path|", None)),
+            ("https://exact.test/path/more", None),
+            ("https://re42.test/a.png", None),
+            ("https://dropped.test/", None),
+            ("https://csp.test/", None),
+        ]
+        for url, expected in cases:
+            with self.subTest(url=url):
+                self.assertEqual(self.verdict(url), expected)
+        regex_rule = "/^https:\\/\\/re[0-9]+\\.test\\//$image"
+        self.assertEqual(self.verdict("https://re42.test/a.png", kind="image"), (BLOCKED, regex_rule, None))
+
+    def test_options(self):
+        self.assertIsNotNone(self.verdict("https://cdn.test/a.js"))
+        self.assertIsNone(self.verdict("https://cdn.test/a.png", kind="image"))
+        self.assertIsNone(self.verdict("https://cdn.test/a.js", source="https://www.cdn.test/"))
+        self.assertIsNotNone(self.verdict("https://widgets.test/w", source="https://widgets.test/", kind="subdocument"))
+        self.assertIsNone(self.verdict("https://widgets.test/w", kind="subdocument"))
+        self.assertIsNone(self.verdict("https://login.test/", source="https://partner.org/"))
+        self.assertIsNone(self.verdict("https://post.test/api"))
+        self.assertIsNotNone(self.verdict("https://post.test/api", method="POST"))
+        self.assertIsNotNone(self.verdict("https://unsafe.test/"))
+        self.assertIsNone(self.verdict("https://ok.unsafe.test/"))
+        self.assertIsNotNone(self.verdict("https://entity.test/", source="https://www.shop.co.uk/"))
+        self.assertIsNone(self.verdict("https://entity.test/", source="https://www.shopping.com/"))
+        # Pure hostname rules also block page loads; other rules do not.
+        self.assertIsNotNone(self.verdict("https://ads.example.com/", kind="document"))
+        self.assertIsNone(self.verdict("https://s.test/banner/a/img/", kind="document"))
+
+    def test_exceptions(self):
+        allowed = (ALLOWED, "||login.test^$3p,domain=~partner.org", "@@||login.test^$domain=friend.com")
+        self.assertEqual(self.verdict("https://login.test/", source="https://friend.com/"), allowed)
+        self.assertEqual(self.verdict("https://x.test/"), (BLOCKED, "||x.test^$important", None))
+        # Only an $important exception overrides an $important block.
+        important = (ALLOWED, "||y.test^$important", "@@||y.test^$important,domain=friend.com")
+        self.assertEqual(self.verdict("https://y.test/", source="https://friend.com/"), important)
+        self.assertEqual(self.verdict("https://y.test/")[0], BLOCKED)
+        rules = [f.text for f in self.matcher.matching(Request("https://y.test/", "https://friend.com/"))]
+        self.assertEqual(rules, ["||y.test^$important", "@@||y.test^$important,domain=friend.com"])
+        page = self.verdict("https://tracker.net/p", source="https://www.safe-site.org/")
+        self.assertEqual(page, (ALLOWED, "tracker.net", "@@||safe-site.org^$document"))
+
+    def test_document_exception_covers_the_document_itself(self):
+        matcher = build(["||ads.safe-site.org^", "@@||safe-site.org^$document"])
+        verdict = matcher.match(Request("https://ads.safe-site.org/", type="document"))
+        self.assertEqual((verdict.result, verdict.exception.text), (ALLOWED, "@@||safe-site.org^$document"))
+        self.assertEqual(matcher.match(Request("https://ads.safe-site.org/x.js", type="script")).result, BLOCKED)
+
+    def test_evaluate_corpus(self):
+        lines = [
+            {"url": "https://ads.example.com/a.js", "source": "https://page.test/", "type": "script"},
+            {"url": "https://login.test/", "frameUrl": "https://friend.com/", "cpt": "xhr"},
+            {"url": "https://clean.test/"},
+            {"source": "https://page.test/"},
+        ]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            corpus = Path(temp_dir) / "corpus.jsonl"
+            corpus.write_text("\n".join(map(json.dumps, lines)) + "\nnot json\n", encoding="utf-8")
+            details: list[str] = []
+            report = evaluate(self.matcher, iter_corpus(corpus), details)
+        self.assertEqual((report.requests, report.blocked, report.allowed, report.invalid), (3, 1, 1, 2))
+        self.assertEqual(report.block_hits, {"||ads.example.com^  (list.txt:1)": 1})
+        self.assertEqual([json.loads(line)["result"] for line in details], [BLOCKED, ALLOWED])
+        self.assertEqual(json.loads(details[1])["exception_origin"], "list.txt:6")
+
+
+if __name__ == "__main__":
+    unittest.main()
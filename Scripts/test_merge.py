@@ -0,0 +1,67 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from Scripts.merge import merge_files, merge_unique, sorted_source
+
+
+def _keep(line: str) -> bool:
+    return bool(line) and not line.startswith("!")
+
+
+class TestMerge(unittest.TestCase):
+    def test_merge_unique(self):
+        merged = merge_unique([["a", "c", "e"], ["b", "c", "d"], [], ["a", "f"]])
+        self.assertEqual(list(merged), ["a", "b", "c", "d", "e", "f"])
+
+    def test_merge_files_matches_set_and_sort(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            one = root / "one.txt"
+            two = root / "two.txt"
+            one.write_text("! header\n||b.com^\n||a.com^\n||b.com^\n\n", encoding="utf-8")
+            two.write_text("##.ad\r\n||a.com^\r\n", encoding="utf-8")
+
+            merged = list(merge_files([one, two], _keep, cache_dir=root / "cache"))
+            expected = sorted(
+                {line for f in (one, two) for line in f.read_text(encoding="utf-8").splitlines() if _keep(line)}
+            )
+            self.assertEqual(merged, expected)
+
+    def test_sorted_source_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            cache = root / "cache"
+            src = root / "list.txt"
+            src.write_text("b\na\n", encoding="utf-8")
+
+            first = sorted_source(src, _keep, cache_dir=cache)
+            self.assertEqual(first.read_text(encoding="utf-8"), "a\nb\n")
+            self.assertEqual(sorted_source(src, _keep, cache_dir=cache), first)
+            self.assertNotEqual(sorted_source(src, _keep, tag="other", cache_dir=cache), first)
+            self.assertTrue(first.exists())
+
+            src.write_text("c\na\n", encoding="utf-8")
+            second = sorted_source(src, _keep, cache_dir=cache)
+            self.assertNotEqual(second, first)
+            self.assertFalse(first.exists())
+            self.assertEqual(second.read_text(encoding="utf-8"), "a\nc\n")
+
+    def test_sorted_source_same_name_in_other_directory(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            cache = root / "cache"
+            one, two = root / "a" / "list.txt", root / "b" / "list.txt"
+            for path, text in ((one, "a\n"), (two, "b\n")):
+                path.parent.mkdir()
+                path.write_text(text, encoding="utf-8")
+
+            first = sorted_source(one, _keep, cache_dir=cache)
+            second = sorted_source(two, _keep, cache_dir=cache)
+            self.assertNotEqual(second, first)
+            self.assertEqual(first.read_text(encoding="utf-8"), "a\n")
+            self.assertEqual(sorted_source(one, _keep, cache_dir=cache), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
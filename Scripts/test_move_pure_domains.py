@@ -2,7 +2,7 @@ import importlib.util
 import tempfile
 import unittest
 from pathlib import Path
-from unittest.mock import Mock
+from unittest.mock import Mock, patch
 
 # Import the module dynamically
 file_path = Path(__file__).parent / "move_pure_domains.py"
@@ -64,10 +64,6 @@ class TestIsPureDomain(unittest.TestCase):
 
 class TestScanAdblockFiles(unittest.TestCase):
     def test_scan_adblock_files_logic(self):
-        # Create a mock file object
-        mock_file = Mock(spec=Path)
-        mock_file.name = "test_list.txt"
-
         # Content with pure domains, comments, and adblock rules
         content = """! Title
 ||ad.com^
@@ -76,17 +72,13 @@ another-pure.net
 ! Another comment
 ##.element
 """
-        # Mock the open() context manager
-        # Since the code does `with adblock_file.open(...) as f:`, we need to mock the return value of open()
-        # mock_open returns a file object that also acts as a context manager
-        mock_file.read_text.return_value = content
-
-        # Create a mock directory object
-        mock_dir = Mock(spec=Path)
-        mock_dir.glob.return_value = [mock_file]
+        with tempfile.TemporaryDirectory() as temp_dir:
+            adblock_dir = Path(temp_dir)
+            adblock_file = adblock_dir / "test_list.txt"
+            adblock_file.write_text(content, encoding="utf-8")
 
-        # Run the function
-        domain_moves, file_updates = scan_adblock_files(mock_dir)
+            # Run the function
+            domain_moves, file_updates = scan_adblock_files(adblock_dir)
 
         # 1. Check if pure domains were identified and moved
         # Categorization logic defaults to 'Other.txt' unless filename matches
@@ -97,11 +89,10 @@ another-pure.net
         self.assertEqual(len(moved_domains), 2)
 
         # 2. Check if file updates contain the REST of the file (comments + rules)
-        self.assertIn(mock_file, file_updates)
-        updated_lines = file_updates[mock_file]
+        self.assertIn(adblock_file, file_updates)
+        updated_lines = file_updates[adblock_file]
 
         # Verify specific lines are present/absent
-        # Note: the implementation stores lines rstrip()ed.
         self.assertIn("! Title", updated_lines)
         self.assertIn("||ad.com^", updated_lines)
         self.assertIn("##.element", updated_lines)
@@ -111,15 +102,11 @@ another-pure.net
         self.assertNotIn("another-pure.net", updated_lines)
 
     def test_scan_adblock_files_categorization(self):
-        mock_file = Mock(spec=Path)
-        mock_file.name = "spotify_ads.txt"
-        content = "spotify-tracker.com\n"
-        mock_file.read_text.return_value = content
+        with tempfile.TemporaryDirectory() as temp_dir:
+            adblock_dir = Path(temp_dir)
+            (adblock_dir / "spotify_ads.txt").write_text("spotify-tracker.com\n", encoding="utf-8")
 
-        mock_dir = Mock(spec=Path)
-        mock_dir.glob.return_value = [mock_file]
-
-        domain_moves, _ = scan_adblock_files(mock_dir)
+            domain_moves, _ = scan_adblock_files(adblock_dir)
 
         # Should be categorized into Spotify.txt based on filename
         self.assertIn("Spotify.txt", domain_moves)
@@ -265,10 +252,30 @@ class TestApplyUpdates(unittest.TestCase):
             module.write_lines = Mock(return_value=False)
             try:
                 total_moved = apply_updates(hostlist_dir, domain_moves, file_updates)
-                self.assertEqual(total_moved, 0)
+                self.assertIsNone(total_moved)
+                # The failed append must not be followed by a source rewrite.
+                module.write_lines.assert_called_once()
             finally:
                 module.write_lines = original_write_lines
 
+    def test_apply_updates_index_failure_keeps_sources(self):
+        with tempfile.TemporaryDirectory() as tmpdir:
+            tmpdir_path = Path(tmpdir)
+            hostlist_dir = tmpdir_path / "hostlist"
+            hostlist_dir.mkdir()
+            target_path = hostlist_dir / "Other.txt"
+            target_path.write_text("existing.com\n")
+            source_path = tmpdir_path / "test_list.txt"
+            source_path.write_text("new.com\n||ad.com^\n")
+
+            domain_moves = {"Other.txt": {"test_list.txt": ["new.com"]}}
+            file_updates = {source_path: ["||ad.com^"]}
+
+            with patch.object(module.DomainIndex, "open", return_value=None):
+                self.assertIsNone(apply_updates(hostlist_dir, domain_moves, file_updates))
+            self.assertEqual(target_path.read_text(), "existing.com\n")
+            self.assertEqual(source_path.read_text(), "new.com\n||ad.com^\n")
+
 
 if __name__ == "__main__":
     unittest.main()
@@ -0,0 +1,70 @@
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from pathlib import Path
+from unittest.mock import patch
+
+from Scripts import profiling
+
+
+def _work() -> int:
+    with profiling.span("outer", items=2):
+        with profiling.span("inner"):
+            profiling.count("items", 2)
+    profiling.count("items")
+    return 7
+
+
+class TestProfiling(unittest.TestCase):
+    def test_disabled_is_noop(self):
+        argv = ["tool", "arg"]
+        with patch.dict(os.environ, {"ADBLOCK_PROFILE": ""}):
+            self.assertEqual(profiling.run("tool", _work, argv), 7)
+        self.assertEqual(argv, ["tool", "arg"])
+        self.assertFalse(profiling.enabled())
+        self.assertIs(profiling.span("x"), profiling.span("y"))
+
+    def test_trace_from_flag(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            trace = Path(temp_dir) / "t.json"
+            argv = ["tool", f"--profile={trace}", "--profile-cprofile", "arg"]
+            with redirect_stdout(io.StringIO()):
+                self.assertEqual(profiling.run("tool", _work, argv), 7)
+            self.assertEqual(argv, ["tool", "arg"])
+            self.assertTrue(trace.with_suffix(".prof").exists())
+
+            data = json.loads(trace.read_text(encoding="utf-8"))
+            spans = {e["name"]: e for e in data["traceEvents"] if e["ph"] == "X"}
+            self.assertEqual(set(spans), {"tool", "outer", "inner"})
+            self.assertEqual(spans["outer"]["args"], {"items": 2})
+            self.assertLessEqual(spans["inner"]["dur"], spans["outer"]["dur"])
+            self.assertEqual(data["otherData"]["counters"], {"items": 3})
+        self.assertFalse(profiling.enabled())
+
+    def test_env_directory_and_tracemalloc(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            env = {"ADBLOCK_PROFILE": temp_dir, "ADBLOCK_PROFILE_TRACEMALLOC": "1"}
+            with patch.dict(os.environ, env), redirect_stdout(io.StringIO()):
+                profiling.run("tool", _work, ["tool"])
+            data = json.loads((Path(temp_dir) / "tool.trace.json").read_text(encoding="utf-8"))
+            self.assertIn("tracemalloc_top", data["otherData"])
+
+    def test_flag_with_profile_env_off_uses_default_directory(self):
+        for env in ("", "0", "1"):
+            with self.subTest(env=env), patch.dict(os.environ, {"ADBLOCK_PROFILE": env}):
+                self.assertEqual(profiling._trace_path("tool", ""), profiling.PROFILE_DIR / "tool.trace.json")
+
+    def test_trace_written_when_main_exits(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            trace = Path(temp_dir) / "t.json"
+            with redirect_stdout(io.StringIO()), self.assertRaises(SystemExit):
+                profiling.run("tool", lambda: sys.exit(3), ["tool", f"--profile={trace}"])
+            self.assertTrue(trace.exists())
+
+
+if __name__ == "__main__":
+    unittest.main()
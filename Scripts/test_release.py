@@ -0,0 +1,90 @@
+import asyncio
+import gzip
+import json
+import sys
+import tempfile
+import unittest
+import zlib
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from Scripts import release
+from Scripts.release import ReleasePublisher, add_checksum, compress_artifact
+
+sys.modules.setdefault("aiohttp", MagicMock())
+sys.modules.setdefault("aiofiles", MagicMock())
+from Scripts.update_lists import validate_checksum  # noqa: E402
+
+
+class TestRelease(unittest.TestCase):
+    def test_checksum_round_trips_through_validate_checksum(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "adblock.txt"
+            path.write_text("[Adblock Plus 2.0]\n! Title: T\n||ads.com^\n", encoding="utf-8")
+
+            add_checksum(path)
+            content = path.read_text(encoding="utf-8")
+            self.assertRegex(content.splitlines()[1], r"^! Checksum: [\w+/]+$")
+            self.assertTrue(asyncio.run(validate_checksum(content, "adblock.txt")))
+
+            # Refreshing replaces the old checksum instead of stacking a second one.
+            path.write_text(content + "||more.com^\n", encoding="utf-8")
+            add_checksum(path)
+            content = path.read_text(encoding="utf-8")
+            self.assertEqual(content.count("! Checksum:"), 1)
+            self.assertTrue(asyncio.run(validate_checksum(content, "adblock.txt")))
+
+    def test_gzip_is_deterministic(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = Path(temp_dir) / "hosts.txt"
+            path.write_text("0.0.0.0 ads.com\n", encoding="utf-8")
+            first = compress_artifact(path)
+            gz_bytes = path.with_name("hosts.txt.gz").read_bytes()
+            second = compress_artifact(path)
+            self.assertEqual(first, second)
+            self.assertEqual(path.with_name("hosts.txt.gz").read_bytes(), gz_bytes)
+            self.assertEqual(gzip.decompress(gz_bytes), path.read_bytes())
+
+    def test_publisher_writes_manifest(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            out_dir = Path(temp_dir)
+            adblock = out_dir / "adblock.txt"
+            hosts = out_dir / "hosts.txt"
+            adblock.write_text("! Title: T\n||ads.com^\n", encoding="utf-8")
+            hosts.write_text("# Hosts\n0.0.0.0 ads.com\n", encoding="utf-8")
+
+            publisher = ReleasePublisher(out_dir)
+            publisher.submit(adblock)
+            publisher.submit(hosts)
+            manifest_path = publisher.close()
+
+            manifest = json.loads(manifest_path.read_text(encoding="utf-8"))
+            self.assertEqual(sorted(manifest["files"]), ["adblock.txt", "hosts.txt"])
+            self.assertEqual(manifest["files"]["hosts.txt"]["size"], hosts.stat().st_size)
+            self.assertIn("gzip", manifest["files"]["adblock.txt"])
+            self.assertNotIn("Checksum", hosts.read_text(encoding="utf-8"))
+
+            # A later partial build keeps entries for files that still exist.
+            publisher = ReleasePublisher(out_dir)
+            publisher.submit(hosts)
+            manifest = json.loads(publisher.close().read_text(encoding="utf-8"))
+            self.assertEqual(sorted(manifest["files"]), ["adblock.txt", "hosts.txt"])
+
+    def test_publisher_survives_compressor_errors(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            out_dir = Path(temp_dir)
+            hosts = out_dir / "hosts.txt"
+            hosts.write_text("0.0.0.0 ads.com\n", encoding="utf-8")
+
+            publisher = ReleasePublisher(out_dir)
+            with patch("gzip.compress", side_effect=zlib.error("bad state")), patch.object(release, "warn") as warn:
+                publisher.submit(hosts)
+                manifest_path = publisher.close()
+
+            warn.assert_called_once()
+            self.assertIn("hosts.txt", warn.call_args.args[0])
+            self.assertEqual(json.loads(manifest_path.read_text(encoding="utf-8"))["files"], {})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,149 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from Scripts import rules
+from Scripts.rules import (
+    COMMENT,
+    COSMETIC,
+    EMPTY,
+    HOSTNAME,
+    NETWORK,
+    SCRIPTLET,
+    blocked_hostnames,
+    parse_file,
+    parse_line,
+)
+
+
+class TestParseLine(unittest.TestCase):
+    def test_kinds(self):
+        cases = {
+            "": EMPTY,
+            "! comment": COMMENT,
+            "[Adblock Plus 2.0]": COMMENT,
+            "# hosts comment": COMMENT,
+            "##.ad": COSMETIC,
+            "###banner": COSMETIC,
+            "example.com#@#.ad": COSMETIC,
+            "example.com#?#div:has(> .ad)": COSMETIC,
+            "example.com##+js(set-constant, a, 1)": SCRIPTLET,
+            "example.com#%#//scriptlet('abort-on-property-read', 'x')": SCRIPTLET,
+            "||ads.example.com^": NETWORK,
+            "@@||ads.example.com^": NETWORK,
+            "/banner.js$script": NETWORK,
+            "ads.example.com": HOSTNAME,
+        }
+        for line, kind in cases.items():
+            with self.subTest(line=line):
+                self.assertEqual(parse_line(line).kind, kind)
+
+    def test_network_fields(self):
+        rule = parse_line("||Ads.Example.com^$third-party,domain=a.com|~b.com")
+        self.assertEqual(rule.hostname, "ads.example.com")
+        self.assertFalse(rule.host_level)
+        self.assertEqual(rule.options, ("third-party", "domain=a.com|~b.com"))
+        self.assertEqual(rule.option("third-party"), "")
+        self.assertIsNone(rule.option("script"))
+        self.assertEqual(rule.option_domains(), ("a.com", "~b.com"))
+
+        self.assertTrue(parse_line("||ads.example.com^$important").host_level)
+        self.assertEqual(parse_line("||ads.example.com/path").hostname, "ads.example.com")
+        self.assertIsNone(parse_line("||ads*.example.com^").hostname)
+        self.assertEqual(parse_line("/^ad[0-9]+$/").options, ())
+        generic = parse_line("$removeparam=utm_source")
+        self.assertEqual((generic.pattern, generic.options), ("", ("removeparam=utm_source",)))
+
+        exception = parse_line("@@||ads.example.com^$important")
+        self.assertTrue(exception.exception)
+        self.assertTrue(exception.host_level)
+        self.assertFalse(parse_line("@@||ads.example.com^$subdocument").host_level)
+        self.assertFalse(parse_line("@@||ads.example.com^$domain=site.example").host_level)
+
+    def test_cosmetic_fields(self):
+        rule = parse_line("Example.com,~sub.example.com#@#.banner")
+        self.assertTrue(rule.exception)
+        self.assertEqual(rule.domains, ("example.com", "~sub.example.com"))
+        self.assertEqual(rule.marker, "#@#")
+        self.assertEqual(rule.selector, ".banner")
+
+    def test_strings_are_interned(self):
+        a = parse_line("||" + "shared.example.com" + "^")
+        b = parse_line("".join(["||shared.", "example.com^"]))
+        self.assertIs(a.hostname, b.hostname)
+
+    def test_parse_file_cache(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            root = Path(temp_dir)
+            path = root / "list.txt"
+            path.write_text("! c\n||ads.com^\nexample.com##.ad\n", encoding="utf-8")
+            cache = root / "cache"
+
+            parsed = parse_file(path, cache)
+            self.assertEqual([r.kind for r in parsed], [COMMENT, NETWORK, COSMETIC])
+            self.assertIs(parse_file(path, cache), parsed)
+            # Only the cache entry is left; the temp file it was written to is gone.
+            self.assertEqual([p.suffix for p in cache.iterdir()], [".pickle"])
+
+            # A fresh process would only have the on-disk cache.
+            rules._memory_cache.clear()
+            reloaded = parse_file(path, cache)
+            self.assertIsNot(reloaded, parsed)
+            self.assertEqual(reloaded, parsed)
+
+
+class TestBlockedHostnames(unittest.TestCase):
+    def test_only_host_level_rules(self):
+        lines = [
+            "! comment",
+            "[Adblock Plus 2.0]",
+            "||ads.example.com^",
+            "||Tracker.Example.org^|",
+            "||important.example.net^$important",
+            "||third.example.net^$third-party",
+            "||path.example.com^/banner.js",
+            "||path.example.com/ads/",
+            "||wild*.example.com^",
+            "example.com##.banner",
+            "cosmetic.example.com,other.example.com##.ad",
+            "/ads.js$script,domain=site.example.com",
+            "plain.example.io",
+            "  spaced.example.io  ",
+        ]
+        self.assertEqual(
+            blocked_hostnames(lines),
+            {
+                "ads.example.com",
+                "tracker.example.org",
+                "important.example.net",
+                "plain.example.io",
+                "spaced.example.io",
+            },
+        )
+
+    def test_exceptions_unblock_host_and_subdomains(self):
+        lines = [
+            "||ads.example.com^",
+            "||cdn.ads.example.com^",
+            "||consent.example.org^",
+            "||keep.example.net^",
+            "@@||ads.example.com^",
+            "@@||consent.example.org^$document",
+        ]
+        self.assertEqual(blocked_hostnames(lines), {"keep.example.net"})
+
+    def test_narrowed_exceptions_keep_host_blocked(self):
+        lines = [
+            "||frame.example.com^",
+            "||site.example.org^",
+            "@@||frame.example.com^$subdocument",
+            "@@||site.example.org^$domain=news.example",
+        ]
+        self.assertEqual(blocked_hostnames(lines), {"frame.example.com", "site.example.org"})
+
+    def test_exception_does_not_cover_parent(self):
+        self.assertEqual(blocked_hostnames(["||example.com^", "@@||sub.example.com^"]), {"example.com"})
+
+
+if __name__ == "__main__":
+    unittest.main()
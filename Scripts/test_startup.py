@@ -0,0 +1,65 @@
+import os
+import subprocess
+import sys
+import unittest
+from pathlib import Path
+
+ROOT = Path(__file__).parent.parent
+
+# Import-time budget per entry point in ms (cumulative, from -X importtime).
+# Scale with ADBLOCK_STARTUP_BUDGET_SCALE on slow machines.
+STARTUP_BUDGET_MS = {
+    "build": 150,
+    "update_lists": 120,
+    "deduplicate": 120,
+    "move_pure_domains": 120,
+    "check_dead_domains": 120,
+    "hosts_creator": 120,
+    "hostlist_compiler": 120,
+    "matcher": 120,
+    "dead_rules": 120,
+    "cosmetic_index": 120,
+    "conflicts": 120,
+    "listdiff": 120,
+}
+# Modules only specific code paths need; none may be loaded at import.
+DEFERRED = ("asyncio", "aiohttp", "aiofiles", "urllib.request", "subprocess", "concurrent.futures")
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Cumulative import time in microseconds of every module loaded by importing module."""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    times: dict[str, int] = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+class TestStartup(unittest.TestCase):
+    def test_deferred_imports(self):
+        for tool in STARTUP_BUDGET_MS:
+            with self.subTest(tool=tool):
+                loaded = import_times(f"Scripts.{tool}")
+                self.assertEqual([m for m in DEFERRED if m in loaded], [])
+
+    def test_startup_budget(self):
+        scale = float(os.environ.get("ADBLOCK_STARTUP_BUDGET_SCALE", "1"))
+        for tool, budget in STARTUP_BUDGET_MS.items():
+            with self.subTest(tool=tool):
+                module = f"Scripts.{tool}"
+                # Best of three to keep scheduler noise out.
+                best = min(import_times(module)[module] for _ in range(3)) / 1000
+                self.assertLess(best, budget * scale, f"{module} took {best:.1f} ms to import")
+
+
+if __name__ == "__main__":
+    unittest.main()
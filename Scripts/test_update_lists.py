@@ -59,20 +59,6 @@ count_rules = update_lists.count_rules
 load_sources = update_lists.load_sources
 
 
-class AsyncIterator:
-    def __init__(self, seq):
-        self.iter = iter(seq)
-
-    def __aiter__(self):
-        return self
-
-    async def __anext__(self):
-        try:
-            return next(self.iter)
-        except StopIteration:
-            raise StopAsyncIteration
-
-
 class TestUpdateLists(unittest.IsolatedAsyncioTestCase):
     def setUp(self):
         self.valid_content_body = "||example.comxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxxx^\n"
@@ -156,93 +142,42 @@ class TestUpdateLists(unittest.IsolatedAsyncioTestCase):
         mock_validate.assert_called_once_with("some content", "final.txt")
 
     @patch("update_lists.process_downloaded_file")
-    @patch("tempfile.NamedTemporaryFile")
-    @patch("asyncio.to_thread")
-    async def test_fetch_list_cleanup_logic(
-        self, mock_to_thread, mock_tempfile, mock_process
-    ):
-        """Verify fetch_list handles cleanup in finally block."""
-
-        # Mock session response
-        mock_resp = AsyncMock()
-        mock_resp.raise_for_status = MagicMock()
-        mock_resp.content = MagicMock()
-        mock_resp.content.iter_chunked.return_value = AsyncIterator([b"chunk"])
-
-        # Mock session context manager
-        session_ctx = MagicMock()
-        session_ctx.__aenter__ = AsyncMock(return_value=mock_resp)
-        session_ctx.__aexit__ = AsyncMock()
-
+    @patch("update_lists.fetch_async", new_callable=unittest.mock.AsyncMock)
+    async def test_fetch_list_success(self, mock_fetch, mock_process):
+        """Verify fetch_list processes the cached download in place."""
         mock_session = MagicMock()
-        mock_session.get.return_value = session_ctx
-
-        # Mock temp file creation
-        mock_temp = MagicMock()
-        mock_temp.name = "/tmp/tempfile.txt"
-        mock_tempfile.return_value.__enter__.return_value = mock_temp
-
-        # Mock process_downloaded_file to succeed
+        cached = MagicMock(spec=Path)
+        cached.stat.return_value.st_size = 12
+        mock_fetch.return_value = cached
         mock_process.return_value = Path("/tmp/out/file.txt")
 
-        # Run fetch_list
         result = await update_lists.fetch_list(
             mock_session, "http://url", "file.txt", Path("/tmp/out")
         )
 
-        # Verify process_downloaded_file called ONCE
-        mock_process.assert_called_once()
-
-        # Verify cleanup called
-        self.assertTrue(mock_to_thread.called)
-
-        # Verify return value
         self.assertEqual(result, ("http://url", True))
-
-    @patch("update_lists.process_downloaded_file")
-    @patch("tempfile.NamedTemporaryFile")
-    @patch("asyncio.to_thread")
-    async def test_fetch_list_success(
-        self, mock_to_thread, mock_tempfile, mock_process
-    ):
-        """Verify fetch_list successful download and process."""
-        mock_resp = MagicMock()
-        mock_resp.raise_for_status = MagicMock()
-        mock_resp.content = MagicMock()
-        mock_resp.content.iter_chunked.return_value = AsyncIterator(
-            [b"chunk1", b"chunk2"]
+        mock_fetch.assert_called_once_with(
+            mock_session,
+            "http://url",
+            headers={"Accept": "text/plain,*/*"},
+            timeout=update_lists.TIMEOUT,
+        )
+        mock_process.assert_called_once_with(
+            cached, "http://url", "file.txt", Path("/tmp/out"), False
         )
 
-        session_ctx = MagicMock()
-        session_ctx.__aenter__ = AsyncMock(return_value=mock_resp)
-        session_ctx.__aexit__ = AsyncMock()
-
-        mock_session = MagicMock()
-        mock_session.get.return_value = session_ctx
-
-        mock_temp = MagicMock()
-        mock_temp.name = "/tmp/tempfile.txt"
-        mock_tempfile.return_value.__enter__.return_value = mock_temp
-
-        mock_process.return_value = Path("/tmp/out/file.txt")
+    @patch("update_lists.process_downloaded_file")
+    @patch("update_lists.fetch_async", new_callable=unittest.mock.AsyncMock)
+    async def test_fetch_list_rejected(self, mock_fetch, mock_process):
+        """Verify a list that fails processing is reported as failed."""
+        mock_fetch.return_value = MagicMock(spec=Path)
+        mock_process.return_value = None
 
         result = await update_lists.fetch_list(
-            mock_session, "http://url", "file.txt", Path("/tmp/out")
+            MagicMock(), "http://url", "file.txt", Path("/tmp/out")
         )
 
-        self.assertEqual(result, ("http://url", True))
-        # self.assertEqual(mock_file_write.write.call_count, 2)
-        mock_session.get.assert_called_once_with(
-            "http://url",
-            timeout=update_lists.TIMEOUT,
-            headers={
-                "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
-                "Accept": "text/plain,*/*",
-            },
-        )
-        mock_process.assert_called_once_with(
-            Path("/tmp/tempfile.txt"), "http://url", "file.txt", Path("/tmp/out"), False
-        )
+        self.assertEqual(result, ("http://url", False))
 
     @patch("update_lists.logger.error")
     async def test_fetch_list_timeout(self, mock_logger_error):
@@ -261,7 +196,7 @@ class TestUpdateLists(unittest.IsolatedAsyncioTestCase):
     async def test_fetch_list_http_error(self, mock_logger_error):
         """Verify fetch_list handles aiohttp.ClientError."""
         mock_session = MagicMock()
-        mock_session.get.side_effect = update_lists.aiohttp.ClientError("HTTP failed")
+        mock_session.get.side_effect = aiohttp_mock.ClientError("HTTP failed")
 
         result = await update_lists.fetch_list(
             mock_session, "http://url", "file.txt", Path("/tmp/out")
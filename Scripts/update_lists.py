@@ -6,24 +6,21 @@ and maintains source tracking metadata.
 """
 
 import argparse
-import asyncio
-import base64
-import hashlib
 import io
-import json
 import logging
 import re
-import subprocess
 import sys
-import tempfile
 from datetime import UTC
 from pathlib import Path
-from typing import Final
+from typing import TYPE_CHECKING, Final
 
-import aiofiles
-import aiohttp
+from Scripts import profiling
+from Scripts.common import fetch_async, sanitize_filename
 
-from Scripts.common import sanitize_filename
+# Heavy and third-party modules are imported where they are used so that
+# importing this module (tests, --help) stays cheap.
+if TYPE_CHECKING:
+    import aiohttp
 
 # ============================================================================
 # CONFIGURATION
@@ -33,19 +30,21 @@ DEFAULT_OUTPUT: Final[str] = "lists/external"
 METADATA_FILE: Final[str] = "lists/sources-metadata.json"
 HEADER_PREFIXES: Final[tuple[str, ...]] = ("! ", "#", "[")
 TIMEOUT: Final[int] = 60
-CHUNK_SIZE: Final[int] = 65536
 MAX_CONCURRENT: Final[int] = 10
 
 # ============================================================================
 # LOGGING
 # ============================================================================
-logging.basicConfig(
-    level=logging.INFO,
-    format="[%(asctime)s] %(levelname)s %(message)s",
-    datefmt="%H:%M:%S",
-)
 logger = logging.getLogger(__name__)
 
+
+def setup_logging() -> None:
+    logging.basicConfig(
+        level=logging.INFO,
+        format="[%(asctime)s] %(levelname)s %(message)s",
+        datefmt="%H:%M:%S",
+    )
+
 # ============================================================================
 # CHECKSUM VALIDATION
 # ============================================================================
@@ -53,6 +52,9 @@ logger = logging.getLogger(__name__)
 
 async def validate_checksum(content: str, name: str = "unknown") -> bool:
     """Validate Adblock Plus checksum header."""
+    import base64
+    import hashlib
+
     match = re.search(
         r"^\s*!\s*checksum[\s\-:]+([\w\+\/=]+).*\n",
         content,
@@ -99,6 +101,8 @@ async def process_downloaded_file(
     skip_checksum: bool = False,
 ) -> Path | None:
     """Process and move temp file to final destination."""
+    import aiofiles
+
     dest_path = output_dir / Path(filename).name
 
     try:
@@ -109,7 +113,7 @@ async def process_downloaded_file(
             is_valid = await validate_checksum(content, filename)
             if not is_valid:
                 logger.warning(f"Checksum validation failed for {url}")
-                # Do not delete temp_path here; the caller's finally block is responsible for cleanup.
+                # temp_path belongs to the download cache; never delete it here.
                 return None
 
         if len(content) < 100:
@@ -128,8 +132,6 @@ async def process_downloaded_file(
 
     except Exception:
         logger.exception(f"Error processing {url}")
-        if temp_path.exists():
-            temp_path.unlink()
         return None
 
 
@@ -139,48 +141,20 @@ async def process_downloaded_file(
 
 
 async def fetch_list(
-    session: aiohttp.ClientSession,
+    session: "aiohttp.ClientSession",
     url: str,
     filename: str,
     output_dir: Path,
     skip_checksum: bool = False,
 ) -> tuple[str, bool]:
-    """Download a single filter list."""
-    try:
-        headers = {
-            "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
-            "Accept": "text/plain,*/*",
-        }
+    """Download a single filter list through the shared download cache."""
+    import aiohttp
 
-        async with session.get(url, timeout=TIMEOUT, headers=headers) as resp:
-            resp.raise_for_status()
-
-            tmp_path = None
-            with tempfile.NamedTemporaryFile(
-                mode="wb",
-                delete=False,
-                suffix=".txt",
-            ) as tmp:
-                tmp_path = Path(tmp.name)
-                # Close immediately, re-open async below
-
-            try:
-                async with aiofiles.open(tmp_path, mode="wb") as f:
-                    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
-                        await f.write(chunk)
-
-                # Only call process once with the correct filename
-                result = await process_downloaded_file(
-                    tmp_path, url, filename, output_dir, skip_checksum
-                )
-                return (url, result is not None)
-            finally:
-                # Ensure cleanup always
-                if tmp_path:
-                    try:
-                        await asyncio.to_thread(tmp_path.unlink)
-                    except FileNotFoundError:
-                        pass
+    try:
+        path = await fetch_async(session, url, headers={"Accept": "text/plain,*/*"}, timeout=TIMEOUT)
+        profiling.count("update.bytes", path.stat().st_size)
+        result = await process_downloaded_file(path, url, filename, output_dir, skip_checksum)
+        return (url, result is not None)
 
     except TimeoutError:
         logger.error(f"✗ Timeout: {url}")
@@ -199,6 +173,10 @@ async def fetch_list(
 
 async def load_sources(config_path: Path) -> dict[str, dict]:
     """Load source URLs configuration."""
+    import json
+
+    import aiofiles
+
     if not config_path.exists():
         logger.warning(f"Config not found: {config_path}, creating template")
         template = {
@@ -241,8 +219,11 @@ async def save_metadata(
     sources: dict, results: dict[str, bool], output_dir: Path
 ) -> None:
     """Save download metadata for tracking."""
+    import json
     from datetime import datetime
 
+    import aiofiles
+
     metadata = {
         "last_updated": datetime.now(UTC).isoformat(),
         "sources": {
@@ -269,8 +250,8 @@ async def save_metadata(
 # ============================================================================
 
 
-async def main() -> int:
-    """Main execution flow."""
+def main() -> int:
+    """Parse arguments and run the update."""
     parser = argparse.ArgumentParser(
         description="Update Ven0m0-Adblock filter lists from remote sources"
     )
@@ -308,11 +289,25 @@ async def main() -> int:
     )
     args = parser.parse_args()
 
+    import asyncio
+
+    setup_logging()
+    return asyncio.run(update(args))
+
+
+async def update(args: argparse.Namespace) -> int:
+    """Main execution flow."""
+    import asyncio
+    import subprocess
+
+    import aiohttp
+
     output_dir: Path = args.output_dir
     output_dir.mkdir(parents=True, exist_ok=True)
 
     logger.info("Loading source configuration...")
-    sources = await load_sources(args.config)
+    with profiling.span("update.load_sources"):
+        sources = await load_sources(args.config)
 
     if args.filter:
         sources = {
@@ -330,41 +325,47 @@ async def main() -> int:
     logger.info(f"Updating {len(sources)} filter lists...")
 
     connector = aiohttp.TCPConnector(limit=args.max_concurrent)
-    async with aiohttp.ClientSession(connector=connector) as session:
-        tasks = [
-            fetch_list(session, url, cfg["filename"], output_dir, cfg["skip_checksum"])
-            for url, cfg in sources.items()
-        ]
-        results = await asyncio.gather(*tasks, return_exceptions=False)
+    with profiling.span("update.fetch", sources=len(sources)):
+        async with aiohttp.ClientSession(connector=connector) as session:
+            tasks = [
+                fetch_list(session, url, cfg["filename"], output_dir, cfg["skip_checksum"])
+                for url, cfg in sources.items()
+            ]
+            results = await asyncio.gather(*tasks, return_exceptions=False)
 
     results_dict = dict(results)
     success_count = sum(1 for success in results_dict.values() if success)
+    profiling.count("update.lists_ok", success_count)
+    profiling.count("update.lists_failed", len(sources) - success_count)
 
-    await save_metadata(sources, results_dict, output_dir)
+    with profiling.span("update.save_metadata"):
+        await save_metadata(sources, results_dict, output_dir)
 
     logger.info(f"✓ Updated {success_count}/{len(sources)} lists successfully")
 
     if args.dedupe and success_count > 0:
         try:
             logger.info("Deduplicating and minifying downloaded lists...")
-            await asyncio.to_thread(
-                subprocess.run,
-                [sys.executable, "-m", "Scripts.deduplicate", str(output_dir)],
-                check=False,
-            )
+            with profiling.span("update.dedupe"):
+                await asyncio.to_thread(
+                    subprocess.run,
+                    [sys.executable, "-m", "Scripts.deduplicate", str(output_dir)],
+                    check=False,
+                )
         except (OSError, subprocess.SubprocessError) as e:
             logger.warning(f"Could not run deduplication: {e}")
 
     if args.validate:
         try:
             logger.info("Running AGLint validation...")
-            result = await asyncio.to_thread(
-                subprocess.run,
-                ["bun", "x", "@adguard/aglint", str(output_dir / "*.txt")],
-                capture_output=True,
-                text=True,
-                check=False,
-            )
+            with profiling.span("update.validate"):
+                result = await asyncio.to_thread(
+                    subprocess.run,
+                    ["bun", "x", "@adguard/aglint", str(output_dir / "*.txt")],
+                    capture_output=True,
+                    text=True,
+                    check=False,
+                )
             if result.returncode != 0:
                 logger.warning("AGLint found issues (non-blocking)")
         except (OSError, subprocess.SubprocessError) as e:
@@ -374,4 +375,4 @@ async def main() -> int:
 
 
 if __name__ == "__main__":
-    sys.exit(asyncio.run(main()))
+    sys.exit(profiling.run("update_lists", main))
@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Hostnames per second through the exclusion engine as the allowlist grows,
+to show the per-hostname cost stays flat with the number of domain entries.
+Usage: python -m benchmarks.bench_exclusions [hostnames] [max_entries]
+"""
+
+import random
+import sys
+import time
+
+from benchmarks.synthetic import synthetic_lines
+from Scripts.common import is_valid_domain
+from Scripts.exclusions import Exclusions
+
+
+def _hostnames(count: int) -> list[str]:
+    hosts = [line for line in synthetic_lines(count * 10) if is_valid_domain(line)]
+    return (hosts * (count // max(len(hosts), 1) + 1))[:count]
+
+
+def _entries(hosts: list[str], count: int, rng: random.Random) -> list[str]:
+    """Mostly domains from the list, with a few wildcards and regexes like real allowlists."""
+    picked = rng.sample(hosts, min(count, len(hosts)))
+    entries = [f"||{host}^" if i % 2 else host for i, host in enumerate(picked)]
+    entries += [f"*.{host}" for host in picked[: count // 100]]
+    entries += [f"ads{i}*.com" for i in range(20)] + [f"/^track{i}[0-9]+\\./" for i in range(20)]
+    return entries
+
+
+def main() -> int:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    max_entries = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    hosts = _hostnames(count)
+    rng = random.Random(0)
+    print(f"{len(hosts):,} hostnames")
+    size = 100
+    while size <= max_entries:
+        start = time.perf_counter()
+        exclusions = Exclusions(_entries(hosts, size, rng))
+        compiled = time.perf_counter() - start
+        start = time.perf_counter()
+        kept = sum(1 for _ in exclusions.filter(hosts))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{len(exclusions):>8,} entries  compile {compiled * 1000:>7.1f} ms  "
+            f"{len(hosts) / elapsed:>10,.0f} hostnames/s  {len(hosts) - kept:>9,} excluded"
+        )
+        size *= 10
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+#!/usr/bin/env python3
+"""
+Lines per second of domain validation: the DOMAIN_PATTERN regex versus
+is_valid_domain and the validate_domains batch API.
+Usage: python -m benchmarks.bench_is_valid_domain [lines]
+"""
+
+import sys
+import time
+from collections.abc import Callable
+
+from benchmarks.synthetic import synthetic_lines
+from Scripts.common import DOMAIN_PATTERN, is_valid_domain, validate_domains
+
+REPEAT = 5
+
+
+def _bench(name: str, func: Callable[[list[str]], list[str]], lines: list[str]) -> None:
+    # Best of REPEAT runs; a single pass is too noisy to compare the three.
+    elapsed = float("inf")
+    for _ in range(REPEAT):
+        start = time.perf_counter()
+        valid = func(lines)
+        elapsed = min(elapsed, time.perf_counter() - start)
+    print(f"{name:<18} {len(lines) / elapsed:>12,.0f} lines/s  {len(valid):>9,} valid")
+
+
+def main() -> int:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    mixed = list(synthetic_lines(count))
+    domains = [line for line in mixed if DOMAIN_PATTERN.match(line)]
+    domains = (domains * (count // max(len(domains), 1) + 1))[:count]
+
+    for label, lines in (("mixed rules", mixed), ("domains only", domains)):
+        print(f"{label}: {len(lines):,} lines")
+        _bench("regex", lambda ls: [s for s in ls if DOMAIN_PATTERN.match(s)], lines)
+        _bench("is_valid_domain", lambda ls: [s for s in ls if is_valid_domain(s)], lines)
+        _bench("validate_domains", validate_domains, lines)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
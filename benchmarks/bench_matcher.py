@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+"""
+Requests per second of the network matcher over the shipped lists (the
+built adblock.txt when present, plus lists/external) and synthetic rules.
+Usage: python -m benchmarks.bench_matcher [requests] [synthetic rules]
+"""
+
+import random
+import sys
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import _domain, synthetic_lines
+from Scripts.matcher import DEFAULT_LISTS, Matcher, Request, evaluate
+from Scripts.rules import parse_file, parse_line
+
+_TYPES = ("script", "image", "xmlhttprequest", "subdocument", "stylesheet", "document", "font", "ping")
+_PATHS = ("ads/banner.js", "static/app.js", "pixel.gif?u=1", "api/v2/track", "img/logo.png", "embed/frame.html")
+
+
+def _requests(count: int, hosts: list[str], seed: int = 1) -> list[Request]:
+    rng = random.Random(seed)
+    requests = []
+    for _ in range(count):
+        # A third of the requests go to hosts the rules name.
+        host = rng.choice(hosts) if hosts and rng.random() < 0.33 else _domain(rng)
+        url = f"https://{host}/{rng.choice(_PATHS)}"
+        requests.append(Request(url, f"https://www.{_domain(rng)}/", rng.choice(_TYPES)))
+    return requests
+
+
+def main() -> int:
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    synthetic = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    paths = [p for p in DEFAULT_LISTS if p.is_file()] + sorted(Path("lists/external").glob("*.txt"))
+
+    start = time.perf_counter()
+    rules = [(rule, path.name) for path in paths for rule in parse_file(path, cache_dir=None)]
+    rules += [(parse_line(line), "synthetic") for line in synthetic_lines(synthetic)]
+    matcher = Matcher.from_rules(rules)
+    print(f"{len(matcher):,} network rules indexed in {time.perf_counter() - start:.2f}s")
+
+    hosts = [rule.hostname for rule, _ in rules if rule.hostname]
+    requests = _requests(count, hosts)
+    start = time.perf_counter()
+    report = evaluate(matcher, requests)
+    elapsed = time.perf_counter() - start
+    print(f"{report.requests:,} requests in {elapsed:.2f}s ({report.requests / elapsed:,.0f}/s)")
+    print(f"  {report.blocked:,} blocked, {report.allowed:,} allowed")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
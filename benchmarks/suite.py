@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Benchmark suite for the filter tooling on synthetic lists of 10k, 100k and 1M rules.
+Each case is timed on fresh caches; the best of --repeat runs is stored as JSON.
+
+Usage:
+  python -m benchmarks.suite run [--sizes 10k,100k,1M] [--repeat 3] [--output results.json]
+  python -m benchmarks.suite compare BASE.json NEW.json [--threshold 0.10]
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from contextlib import redirect_stdout
+from datetime import UTC, datetime
+from functools import partial
+from io import StringIO
+from pathlib import Path
+from typing import Final
+
+from benchmarks.synthetic import synthetic_lines
+
+DEFAULT_SIZES: Final[str] = "10k,100k,1M"
+DEFAULT_THRESHOLD: Final[float] = 0.10
+# Sources build_adblock picks up; the synthetic rules are spread across them.
+ADBLOCK_FILES: Final[tuple[str, ...]] = ("Other.txt", "General.txt", "Reddit.txt", "Youtube.txt")
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    for suffix, factor in (("k", 1_000), ("m", 1_000_000)):
+        if value.endswith(suffix):
+            return int(float(value[:-1]) * factor)
+    return int(value)
+
+
+def _label(size: int) -> str:
+    if size >= 1_000_000 and size % 1_000_000 == 0:
+        return f"{size // 1_000_000}M"
+    if size >= 1_000 and size % 1_000 == 0:
+        return f"{size // 1_000}k"
+    return str(size)
+
+
+class Workspace:
+    """Synthetic adblock sources of one size plus isolated cache and output dirs."""
+
+    def __init__(self, root: Path, size: int) -> None:
+        self.root = root
+        self.lines = list(synthetic_lines(size))
+        self.adblock_dir = root / "adblock"
+        self.out_dir = root / "releases"
+        self.adblock_dir.mkdir()
+        self.files: dict[str, list[str]] = {name: [] for name in ADBLOCK_FILES}
+        for i, line in enumerate(self.lines):
+            self.files[ADBLOCK_FILES[i % len(ADBLOCK_FILES)]].append(line)
+        for name, lines in self.files.items():
+            (self.adblock_dir / name).write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    def reset_caches(self) -> None:
+        from Scripts import rules
+        from Scripts.common import CACHE_DIR
+
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        shutil.rmtree(self.out_dir, ignore_errors=True)
+        rules._memory_cache.clear()
+
+
+def _cases(ws: Workspace) -> dict[str, Callable[[], object]]:
+    from Scripts import build, check_dead_domains, deduplicate, listdiff, move_pure_domains
+
+    build.FILTER_SRC = ws.adblock_dir
+    build.FILTER_OUT = ws.out_dir
+    # Overlapping per-file rule sets, as deduplicate.main collects them.
+    file_rules = {name: lines + ws.lines[: len(lines) // 4] for name, lines in ws.files.items()}
+    # Next release: 1% of the rules dropped, 2% new ones appended.
+    released = ws.lines[len(ws.lines) // 100 :] + list(synthetic_lines(len(ws.lines) // 50, seed=1))
+    list_bytes = sum(len(line) + 1 for line in ws.lines) * 2
+
+    return {
+        "process_content": lambda: deduplicate.process_content(ws.lines),
+        "build_adblock": build.build_adblock,
+        "build_hosts": partial(build.build_hosts, exclusions_config=None),
+        "scan_adblock_files": lambda: move_pure_domains.scan_adblock_files(ws.adblock_dir),
+        "find_cross_file_duplicates": lambda: deduplicate.find_cross_file_duplicates(file_rules),
+        "dead_domain_extract": lambda: check_dead_domains.extract_hostnames(ws.lines),
+        "listdiff": lambda: listdiff.diff(ws.lines, released, list_bytes),
+    }
+
+
+def run_suite(sizes: list[int], repeat: int, only: set[str] | None = None) -> dict:
+    results: dict[str, dict] = {}
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as temp_dir:
+            ws = Workspace(Path(temp_dir), size)
+            for name, case in _cases(ws).items():
+                if only and name not in only:
+                    continue
+                times = []
+                for _ in range(repeat):
+                    ws.reset_caches()
+                    start = time.perf_counter()
+                    with redirect_stdout(StringIO()):
+                        case()
+                    times.append(time.perf_counter() - start)
+                key = f"{name}@{_label(size)}"
+                results[key] = {"case": name, "rules": size, "best": min(times), "mean": sum(times) / len(times)}
+                print(f"{key:<36} {min(times) * 1000:>10.1f} ms", flush=True)
+    return {
+        "meta": {
+            "created": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(base: dict, new: dict, threshold: float) -> list[str]:
+    """Print a comparison table; return the keys that regressed beyond threshold."""
+    regressions = []
+    for key, new_result in new["results"].items():
+        base_result = base["results"].get(key)
+        if base_result is None:
+            print(f"{key:<36} {'':>10} {new_result['best'] * 1000:>10.1f} ms  (new)")
+            continue
+        ratio = new_result["best"] / base_result["best"] if base_result["best"] else 1.0
+        flag = ""
+        if ratio > 1 + threshold:
+            flag = "  REGRESSION"
+            regressions.append(key)
+        print(
+            f"{key:<36} {base_result['best'] * 1000:>10.1f} {new_result['best'] * 1000:>10.1f} ms"
+            f"  {(ratio - 1) * 100:+6.1f}%{flag}"
+        )
+    return regressions
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the filter tooling on synthetic lists")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run_p = sub.add_parser("run", help="Run the benchmarks and write JSON results")
+    run_p.add_argument("--sizes", default=DEFAULT_SIZES, help=f"Comma separated rule counts (default: {DEFAULT_SIZES})")
+    run_p.add_argument("--repeat", type=int, default=3, help="Runs per case; the best is kept")
+    run_p.add_argument("--case", action="append", help="Only run this case (repeatable)")
+    run_p.add_argument("--output", type=Path, help="Write results to this JSON file")
+    cmp_p = sub.add_parser("compare", help="Compare two result files")
+    cmp_p.add_argument("base", type=Path)
+    cmp_p.add_argument("new", type=Path)
+    cmp_p.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Relative slowdown flagged as a regression (default: {DEFAULT_THRESHOLD})",
+    )
+    args = parser.parse_args()
+
+    if args.command == "compare":
+        base = json.loads(args.base.read_text(encoding="utf-8"))
+        new = json.loads(args.new.read_text(encoding="utf-8"))
+        regressions = compare(base, new, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}")
+            return 1
+        return 0
+
+    try:
+        sizes = [parse_size(s) for s in args.sizes.split(",") if s.strip()]
+    except ValueError:
+        parser.error(f"Invalid --sizes: {args.sizes}")
+    with tempfile.TemporaryDirectory() as cache_dir:
+        # Scripts modules read ADBLOCK_CACHE_DIR at import, so set it before importing them.
+        os.environ["ADBLOCK_CACHE_DIR"] = cache_dir
+        report = run_suite(sizes, max(1, args.repeat), set(args.case) if args.case else None)
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n", encoding="utf-8")
+        print(f"Results: {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,66 @@
+"""
+Deterministic synthetic filter lists for benchmarks.
+"""
+
+import random
+from collections.abc import Iterator
+from typing import Final
+
+_WORDS = (
+    "ads",
+    "track",
+    "pixel",
+    "cdn",
+    "static",
+    "metrics",
+    "banner",
+    "promo",
+    "media",
+    "img",
+    "api",
+    "beacon",
+    "stats",
+    "video",
+    "news",
+    "shop",
+    "mail",
+    "cloud",
+    "edge",
+    "data",
+)
+_TLDS = ("com", "net", "org", "io", "co.uk", "de", "jp", "info")
+_SELECTORS = (".ad-banner", "#sponsored", 'div[id^="ad-"]', ".promo > .item", "aside.sidebar-ad")
+
+# Cumulative share of each rule kind; the rest are path rules.
+_COMMENTS: Final[float] = 0.05
+_BLOCKS: Final[float] = 0.40
+_EXCEPTIONS: Final[float] = 0.45
+_OPTION_RULES: Final[float] = 0.60
+_COSMETIC: Final[float] = 0.80
+_PURE_DOMAINS: Final[float] = 0.90
+
+
+def _domain(rng: random.Random) -> str:
+    labels = [f"{rng.choice(_WORDS)}{rng.randrange(10_000)}" for _ in range(rng.randint(1, 3))]
+    return f"{'.'.join(labels)}.{rng.choice(_TLDS)}"
+
+
+def synthetic_lines(count: int, seed: int = 0) -> Iterator[str]:
+    """Yield a realistic mix of comments, network, cosmetic and pure-domain rules."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        kind = rng.random()
+        if kind < _COMMENTS:
+            yield f"! {rng.choice(_WORDS)} section"
+        elif kind < _BLOCKS:
+            yield f"||{_domain(rng)}^"
+        elif kind < _EXCEPTIONS:
+            yield f"@@||{_domain(rng)}^"
+        elif kind < _OPTION_RULES:
+            yield f"||{_domain(rng)}^$third-party,domain={_domain(rng)}|~{_domain(rng)}"
+        elif kind < _COSMETIC:
+            yield f"{_domain(rng)},{_domain(rng)}##{rng.choice(_SELECTORS)}"
+        elif kind < _PURE_DOMAINS:
+            yield _domain(rng)
+        else:
+            yield f"/{rng.choice(_WORDS)}/{rng.choice(_WORDS)}.js$script"